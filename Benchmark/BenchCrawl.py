@@ -0,0 +1,163 @@
+# 对本地模拟接口（Benchmark.MockServer）做端到端的爬取测试，比较线程池（可选对冲请求）和 asyncio 引擎
+# 输出 HTTP 请求数（重试单独计数）、吞吐（请求/秒）、单个请求的延迟 p50/p99 和总耗时
+# 用法：python -m Benchmark.BenchCrawl --max-id 2000 --latency-ms 50 --throttle-rps 400
+#      python -m Benchmark.BenchCrawl --engines thread thread-hedge --tail-probability 0.02 --tail-latency-ms 3000
+import argparse, functools, multiprocessing, threading, time
+from typing import Callable, Dict, List
+
+import requests
+
+import Helper.AsyncCrawler as AsyncCrawler
+import Helper.Get3DMarkScore as Get3DMarkScore
+from Helper.Get3DMarkScore import CPU_TESTSCENE, GPU_TESTSCENE
+from Helper.RateControl import SetRateController
+from Helper.Session import CloseSession
+from Helper.Hedge import Hedger, GetHedger, SetHedger
+from Benchmark.MockServer import AddMockArguments, MockConfigFromArgs, StartMockServer
+
+
+# thread-hedge: 线程池引擎，启用对冲请求
+ENGINES: List[str] = ["thread", "thread-hedge", "async"]
+
+
+def _ServeMock(Args: argparse.Namespace, PortQueue) -> None:
+    # 模拟接口放在单独的进程里，避免和被测的客户端争用 GIL
+    Server, State, BaseUrl = StartMockServer(MockConfigFromArgs(Args), Port=0)
+    PortQueue.put(BaseUrl)
+    threading.Event().wait()
+
+
+class LatencyRecorder:
+    def __init__(self) -> None:
+        self.Lock = threading.Lock()
+        self.Latencies: List[float] = []
+
+    def Wrap(self, Function: Callable) -> Callable:
+        @functools.wraps(Function)
+        def Wrapper(*Args, **Kwargs):
+            StartTime = time.perf_counter()
+            try:
+                return Function(*Args, **Kwargs)
+            finally:
+                with self.Lock:
+                    self.Latencies.append(time.perf_counter() - StartTime)
+
+        return Wrapper
+
+    def WrapAsync(self, Function: Callable) -> Callable:
+        @functools.wraps(Function)
+        async def Wrapper(*Args, **Kwargs):
+            StartTime = time.perf_counter()
+            try:
+                return await Function(*Args, **Kwargs)
+            finally:
+                self.Latencies.append(time.perf_counter() - StartTime)
+
+        return Wrapper
+
+    def Percentile(self, Percent: float) -> float:
+        if len(self.Latencies) == 0:
+            return 0.0
+        Sorted = sorted(self.Latencies)
+        return Sorted[min(len(Sorted) - 1, int(len(Sorted) * Percent / 100))]
+
+
+def RunEngine(Engine: str, IsCpu: bool, TestSceneList: List, MaxId: int, Workers: int, bRateControl: bool) -> Dict[str, float]:
+    # 每次测试前重置全局的 Session 和限速器
+    CloseSession()
+    SetRateController(None)
+    Recorder = LatencyRecorder()
+
+    # 只统计 HTTP 请求本身，不含限速和并发上限的排队时间
+    StartTime = time.perf_counter()
+    if Engine.startswith("thread"):
+        from Main import GetAllDeviceInfo
+
+        if Engine == "thread-hedge":
+            SetHedger(Hedger(MaxWorkers=Workers))
+        OriginalGet = requests.Session.get
+        requests.Session.get = Recorder.Wrap(OriginalGet)
+        try:
+            Data = GetAllDeviceInfo(
+                IsCpu,
+                TestSceneList,
+                1,
+                MaxId,
+                MaxWorkers=Workers,
+                bRateControl=bRateControl,
+                GapIndexPath=None,
+                AvailabilityPath=None,
+                # 与 asyncio 引擎一致，只做立即重试
+                RetryPasses=0,
+            )
+        finally:
+            requests.Session.get = OriginalGet
+            if GetHedger() is not None:
+                print(GetHedger().FormatSummary(Workers))
+                GetHedger().Close()
+                SetHedger(None)
+    else:
+        import httpx
+
+        OriginalGet = httpx.AsyncClient.get
+        httpx.AsyncClient.get = Recorder.WrapAsync(OriginalGet)
+        try:
+            Data = AsyncCrawler.GetAllDeviceInfoAsync(
+                IsCpu,
+                TestSceneList,
+                1,
+                MaxId,
+                Concurrency=Workers,
+                bRateControl=bRateControl,
+                GapIndexPath=None,
+                AvailabilityPath=None,
+            )
+        finally:
+            httpx.AsyncClient.get = OriginalGet
+    WallTime = time.perf_counter() - StartTime
+
+    return {
+        "Devices": len(Data),
+        "Requests": len(Recorder.Latencies),
+        "WallTime": WallTime,
+        "Rps": len(Recorder.Latencies) / WallTime,
+        "P50": Recorder.Percentile(50) * 1000,
+        "P99": Recorder.Percentile(99) * 1000,
+    }
+
+
+def Bench(Args: argparse.Namespace) -> None:
+    PortQueue = multiprocessing.Queue()
+    ServerProcess = multiprocessing.Process(target=_ServeMock, args=(Args, PortQueue), daemon=True)
+    ServerProcess.start()
+    try:
+        Get3DMarkScore.SetBaseUrl(PortQueue.get(timeout=10))
+        IsCpu = Args.Device == "cpu"
+        TestSceneList = list(CPU_TESTSCENE if IsCpu else GPU_TESTSCENE)[: Args.SceneCount]
+
+        Results: Dict[str, Dict[str, float]] = {}
+        for Engine in Args.Engines:
+            Results[Engine] = RunEngine(
+                Engine, IsCpu, TestSceneList, Args.MaxIdToCrawl, Args.Workers, Args.bRateControl
+            )
+
+        print(f"\n{'Engine':>12} {'Devices':>8} {'Requests':>9} {'Seconds':>9} {'Req/s':>9} {'p50 ms':>9} {'p99 ms':>9}")
+        for Engine, Result in Results.items():
+            print(
+                f"{Engine:>12} {Result['Devices']:>8} {Result['Requests']:>9} {Result['WallTime']:>9.2f}"
+                f" {Result['Rps']:>9.0f} {Result['P50']:>9.1f} {Result['P99']:>9.1f}"
+            )
+    finally:
+        ServerProcess.terminate()
+
+
+if __name__ == "__main__":
+    Parser = argparse.ArgumentParser(description="本地端到端爬取测试")
+    Parser.add_argument("--device", dest="Device", choices=["cpu", "gpu"], default="gpu")
+    Parser.add_argument("--max-id", dest="MaxIdToCrawl", type=int, default=1000)
+    Parser.add_argument("--scene-count", dest="SceneCount", type=int, default=3)
+    Parser.add_argument("--workers", dest="Workers", type=int, default=32)
+    Parser.add_argument("--engines", dest="Engines", nargs="+", choices=ENGINES, default=ENGINES)
+    Parser.add_argument("--no-rate-control", dest="bRateControl", action="store_false")
+    AddMockArguments(Parser)
+    Bench(Parser.parse_args())
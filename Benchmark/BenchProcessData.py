@@ -0,0 +1,49 @@
+# 测试 BuildDataFrame 随行数增长的耗时
+# 用法：python -m Benchmark.BenchProcessData [行数 ...]
+import sys, time, random
+from typing import List
+
+from Main import BuildDataFrame, DATA_TYPE
+from Helper.ProcessDeviceName import ClearParseCache
+
+
+VENDORS: List[str] = ["NVIDIA GeForce RTX", "NVIDIA GeForce GTX", "AMD Radeon RX", "Intel Arc"]
+SUFFIXES: List[str] = ["", " Ti", " SUPER", " XT", " Laptop GPU", " 8GB", " 12 GB", " Max-Q"]
+DEFAULT_ROW_COUNTS: List[int] = [1_000, 10_000, 100_000, 300_000]
+
+
+def MakeData(RowCount: int, UniqueNames: int = 3000, Seed: int = 0) -> DATA_TYPE:
+    # 合并多个快照后的数据：大量重复的型号名
+    Random = random.Random(Seed)
+    Names = [
+        f"{Random.choice(VENDORS)} {Random.randint(100, 9999)}{Random.choice(SUFFIXES)}"
+        for _ in range(UniqueNames)
+    ]
+    return {
+        Id: {
+            "GPU ID": Id,
+            "GPU Name": Random.choice(Names),
+            "3DMark Time Spy": Random.randint(-1, 40000),
+            "3DMark Port Royal": Random.randint(-1, 25000),
+            "3DMark Speed Way": Random.randint(-1, 10000),
+        }
+        for Id in range(1, RowCount + 1)
+    }
+
+
+def Bench(RowCounts: List[int]) -> None:
+    # 预热，排除 pandas 首次调用的开销
+    BuildDataFrame(MakeData(100), IsCpu=False)
+    print(f"{'Rows':>10} {'Seconds':>10} {'Rows/s':>12}")
+    for RowCount in RowCounts:
+        Data = MakeData(RowCount)
+        # 清空解析缓存，计入首次解析的开销
+        ClearParseCache()
+        StartTime = time.perf_counter()
+        BuildDataFrame(Data, IsCpu=False)
+        Elapsed = time.perf_counter() - StartTime
+        print(f"{RowCount:>10} {Elapsed:>10.3f} {RowCount / Elapsed:>12.0f}")
+
+
+if __name__ == "__main__":
+    Bench([int(Arg) for Arg in sys.argv[1:]] or DEFAULT_ROW_COUNTS)
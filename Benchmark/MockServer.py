@@ -0,0 +1,197 @@
+# 本地模拟的 3DMark 接口，用于在不访问 www.3dmark.com 的情况下测量爬取性能
+# 实现 /proxycon/ajax/search/{cpu,gpu}id 和 /proxycon/ajax/medianscore
+# 用法：python -m Benchmark.MockServer --port 8765 --latency-ms 50 --error-rate 0.01
+import argparse, json, random, threading, time, zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+from urllib.parse import parse_qs, urlparse
+
+
+class MockConfig:
+    def __init__(
+        self,
+        MaxId: int = 4000,
+        Density: float = 0.4,
+        SceneDensity: float = 0.7,
+        LatencyMs: float = 50.0,
+        LatencySigma: float = 0.5,
+        TailProbability: float = 0.0,
+        TailLatencyMs: float = 3000.0,
+        ErrorRate: float = 0.0,
+        ThrottleRps: float = 0.0,
+        RetryAfter: int = 1,
+        Seed: int = 0,
+    ) -> None:
+        # id 空间：1~MaxId 中约 Density 比例的 id 有设备
+        self.MaxId: int = MaxId
+        self.Density: float = Density
+        # 每个 (设备, 测试项目) 有分数的概率，没有时 median 为 null
+        self.SceneDensity: float = SceneDensity
+        # 延迟为对数正态分布，中位数 LatencyMs；另有 TailProbability 的请求耗时 TailLatencyMs
+        self.LatencyMs: float = LatencyMs
+        self.LatencySigma: float = LatencySigma
+        self.TailProbability: float = TailProbability
+        self.TailLatencyMs: float = TailLatencyMs
+        # 随机返回 500 的比例
+        self.ErrorRate: float = ErrorRate
+        # 超过该速率（每秒请求数）时返回 429，0 表示不限流
+        self.ThrottleRps: float = ThrottleRps
+        self.RetryAfter: int = RetryAfter
+        self.Seed: int = Seed
+
+
+def _Hash01(*Keys: object) -> float:
+    # 由 key 决定的 [0, 1) 伪随机数，保证每次运行（包括不同进程）数据一致
+    return zlib.crc32(repr(Keys).encode()) / 0x100000000
+
+
+class MockState:
+    def __init__(self, Config: MockConfig) -> None:
+        self.Config: MockConfig = Config
+        self.Random = random.Random(Config.Seed)
+        self.Lock = threading.Lock()
+        self.Requests: int = 0
+        self.StatusCounts: Dict[int, int] = {}
+        self._WindowStart: float = time.monotonic()
+        self._WindowCount: int = 0
+
+    def GetName(self, Device: str, Id: int) -> str:
+        Config = self.Config
+        if Id < 1 or Id > Config.MaxId or _Hash01(Config.Seed, Device, Id) >= Config.Density:
+            return ""
+        Prefix = "Intel Core i7-" if Device == "cpu" else "NVIDIA GeForce RTX "
+        return f"{Prefix}{1000 + Id}"
+
+    def GetMedian(self, Id: int, Test: str) -> Optional[int]:
+        if _Hash01(self.Config.Seed, Id, Test) >= self.Config.SceneDensity:
+            return None
+        return 1000 + Id * 7 + len(Test)
+
+    def NextLatency(self) -> float:
+        Config = self.Config
+        with self.Lock:
+            if self.Random.random() < Config.TailProbability:
+                return Config.TailLatencyMs / 1000
+            return self.Random.lognormvariate(0, Config.LatencySigma) * Config.LatencyMs / 1000
+
+    def CheckThrottle(self) -> bool:
+        # 固定 1 秒窗口计数，超过 ThrottleRps 返回 True
+        if self.Config.ThrottleRps <= 0:
+            return False
+        with self.Lock:
+            Now = time.monotonic()
+            if Now - self._WindowStart >= 1.0:
+                self._WindowStart = Now
+                self._WindowCount = 0
+            self._WindowCount += 1
+            return self._WindowCount > self.Config.ThrottleRps
+
+    def Count(self, StatusCode: int) -> None:
+        with self.Lock:
+            self.Requests += 1
+            self.StatusCounts[StatusCode] = self.StatusCounts.get(StatusCode, 0) + 1
+
+
+def _MakeHandler(State: MockState) -> type:
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        # 响应头和响应体分两次写出，长连接上不关闭 Nagle 时每个响应都要等待对方的延迟 ACK
+        disable_nagle_algorithm = True
+
+        def log_message(self, *Args) -> None:
+            pass
+
+        def _Send(self, StatusCode: int, Body: Optional[Dict], Headers: Dict[str, str] = {}) -> None:
+            Data = json.dumps(Body).encode() if Body is not None else b""
+            self.send_response(StatusCode)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(Data)))
+            for Key, Value in Headers.items():
+                self.send_header(Key, Value)
+            self.end_headers()
+            self.wfile.write(Data)
+            State.Count(StatusCode)
+
+        def do_GET(self) -> None:
+            Url = urlparse(self.path)
+            Query = parse_qs(Url.query, keep_blank_values=True)
+
+            if State.CheckThrottle():
+                self._Send(429, None, {"Retry-After": str(State.Config.RetryAfter)})
+                return
+            time.sleep(State.NextLatency())
+            if State.Random.random() < State.Config.ErrorRate:
+                self._Send(500, None)
+                return
+
+            try:
+                if Url.path in ("/proxycon/ajax/search/cpuid", "/proxycon/ajax/search/gpuid"):
+                    Device = "cpu" if Url.path.endswith("cpuid") else "gpu"
+                    Id = int(Query["id"][0])
+                    self._Send(200, {f"{Device}Name": State.GetName(Device, Id)})
+                elif Url.path == "/proxycon/ajax/medianscore":
+                    Id = int(Query["cpuId"][0] or Query["gpuId"][0])
+                    Test = Query["test"][0] + Query["scoreType"][0]
+                    self._Send(200, {"median": State.GetMedian(Id, Test)})
+                else:
+                    self._Send(404, None)
+            except (KeyError, ValueError):
+                self._Send(400, None)
+
+    return Handler
+
+
+def StartMockServer(
+    Config: Optional[MockConfig] = None, Host: str = "127.0.0.1", Port: int = 0
+):
+    # 在后台线程启动，返回 (server, state, base url)；Port 为 0 时自动选择端口
+    State = MockState(Config or MockConfig())
+    Server = ThreadingHTTPServer((Host, Port), _MakeHandler(State))
+    Server.daemon_threads = True
+    threading.Thread(target=Server.serve_forever, daemon=True).start()
+    return Server, State, f"http://{Host}:{Server.server_address[1]}"
+
+
+def AddMockArguments(Parser: argparse.ArgumentParser) -> None:
+    Parser.add_argument("--mock-max-id", dest="MaxId", type=int, default=4000)
+    Parser.add_argument("--density", dest="Density", type=float, default=0.4)
+    Parser.add_argument("--scene-density", dest="SceneDensity", type=float, default=0.7)
+    Parser.add_argument("--latency-ms", dest="LatencyMs", type=float, default=50.0)
+    Parser.add_argument("--latency-sigma", dest="LatencySigma", type=float, default=0.5)
+    Parser.add_argument("--tail-probability", dest="TailProbability", type=float, default=0.0)
+    Parser.add_argument("--tail-latency-ms", dest="TailLatencyMs", type=float, default=3000.0)
+    Parser.add_argument("--error-rate", dest="ErrorRate", type=float, default=0.0)
+    Parser.add_argument("--throttle-rps", dest="ThrottleRps", type=float, default=0.0)
+    Parser.add_argument("--retry-after", dest="RetryAfter", type=int, default=1)
+    Parser.add_argument("--seed", dest="Seed", type=int, default=0)
+
+
+def MockConfigFromArgs(Args: argparse.Namespace) -> MockConfig:
+    return MockConfig(
+        MaxId=Args.MaxId,
+        Density=Args.Density,
+        SceneDensity=Args.SceneDensity,
+        LatencyMs=Args.LatencyMs,
+        LatencySigma=Args.LatencySigma,
+        TailProbability=Args.TailProbability,
+        TailLatencyMs=Args.TailLatencyMs,
+        ErrorRate=Args.ErrorRate,
+        ThrottleRps=Args.ThrottleRps,
+        RetryAfter=Args.RetryAfter,
+        Seed=Args.Seed,
+    )
+
+
+if __name__ == "__main__":
+    Parser = argparse.ArgumentParser(description="本地模拟的 3DMark 接口")
+    Parser.add_argument("--host", dest="Host", default="127.0.0.1")
+    Parser.add_argument("--port", dest="Port", type=int, default=8765)
+    AddMockArguments(Parser)
+    Args = Parser.parse_args()
+    Server, State, BaseUrl = StartMockServer(MockConfigFromArgs(Args), Args.Host, Args.Port)
+    print(f"Mock 3DMark server listening on {BaseUrl}")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        Server.shutdown()
@@ -0,0 +1,430 @@
+import asyncio, time
+from typing import List, Optional, Tuple
+from tenacity import retry, retry_if_exception_type, retry_if_result
+from tqdm import tqdm
+
+from Helper.Cache import CacheMissError
+from Helper.Get3DMarkScore import (
+    GetCache,
+    GetUrl,
+    GetNameEndpoint,
+    Get3DMarkUrlParameters,
+    ENDPOINT_MEDIANSCORE,
+    ParseName,
+    ParseMedianScore,
+    NewDeviceItem,
+    SetScore,
+    SetMaxAttempts,
+    DEFAULT_MAX_ATTEMPTS,
+    ErrorCallback,
+    FetchError,
+    IsRetryableResponse,
+    StopRetrying,
+    WaitBeforeRetry,
+    GetRequestLabels,
+    RecordRetry,
+    TESTSCENE_TYPE,
+    DATA_TYPE,
+)
+from Helper.RateControl import (
+    RateController,
+    GetRateController,
+    SetRateController,
+    ParseRetryAfter,
+)
+from Helper.Metrics import GetMetrics
+from Helper.GapIndex import GapIndex, DEFAULT_REVERIFY_INTERVAL
+from Helper.Availability import (
+    AvailabilityStore,
+    DEFAULT_RECHECK_INTERVAL,
+    SKIPPED_SCORE,
+)
+from Helper.DeadLetter import (
+    DeadLetterFile,
+    DEFAULT_RETRY_PASSES,
+    DEFAULT_RETRY_DELAY,
+    DEFERRED_MAX_ATTEMPTS,
+)
+from Helper.Shard import GetShardIds
+from Helper.IdDiscovery import (
+    DiscoverMaxId,
+    GetDenseRanges,
+    FormatRanges,
+    DEFAULT_MISS_RUN,
+)
+
+
+DEFAULT_CONCURRENCY: int = 256
+
+
+def _IsHttp2Available() -> bool:
+    try:
+        import h2  # noqa: F401
+
+        return True
+    except ImportError:
+        return False
+
+
+def _CreateClient(Concurrency: int):
+    try:
+        import httpx
+    except ImportError as e:
+        raise ImportError(
+            "asyncio 引擎需要 httpx，请执行 pip install 'httpx[http2]'"
+        ) from e
+
+    return httpx.AsyncClient(
+        http2=_IsHttp2Available(),
+        headers={"Accept": "application/json"},
+        limits=httpx.Limits(
+            max_connections=Concurrency, max_keepalive_connections=Concurrency
+        ),
+        timeout=10,
+    )
+
+
+@retry(
+    stop=StopRetrying,
+    wait=WaitBeforeRetry,
+    retry=retry_if_exception_type() | retry_if_result(IsRetryableResponse),
+    retry_error_callback=ErrorCallback,
+    before_sleep=RecordRetry,
+)
+async def _Get(Client, Semaphore: asyncio.Semaphore, Url: str):
+    async with Semaphore:
+        Controller = GetRateController()
+        if Controller is None:
+            return await _ClientGet(Client, Url)
+
+        async with Controller.AcquireAsync() as Slot:
+            Response = await _ClientGet(Client, Url)
+            Slot.SetResult(
+                Response.status_code,
+                ParseRetryAfter(Response.headers.get("Retry-After")),
+            )
+        return Response
+
+
+async def _ClientGet(Client, Url: str):
+    # 与 Get3DMarkScore._SessionGet 相同的统计
+    Metrics = GetMetrics()
+    if Metrics is None:
+        return await Client.get(Url)
+
+    Metrics.BeginRequest()
+    StartTime = time.perf_counter()
+    StatusCode: Optional[int] = None
+    Bytes: int = 0
+    try:
+        Response = await Client.get(Url)
+        # 实际传输的字节数（解压前）
+        StatusCode, Bytes = Response.status_code, Response.num_bytes_downloaded
+        return Response
+    finally:
+        Endpoint, Scene = GetRequestLabels(Url)
+        Metrics.EndRequest(Endpoint, Scene, time.perf_counter() - StartTime, StatusCode, Bytes)
+
+
+async def _FetchText(
+    Client, Semaphore: asyncio.Semaphore, Endpoint: str, UrlParameters: str
+) -> str:
+    # 与 Get3DMarkScore.FetchText 相同的缓存逻辑
+    Cache = GetCache()
+    if Cache is not None:
+        Text = Cache.Get(Endpoint, UrlParameters)
+        if Text is not None:
+            if GetMetrics() is not None:
+                GetMetrics().ObserveCacheHit()
+            return Text
+        if Cache.bOffline:
+            raise CacheMissError(f"{Endpoint}?{UrlParameters}")
+
+    Url = GetUrl(Endpoint, UrlParameters)
+    Metrics = GetMetrics()
+    StartTime = time.perf_counter()
+    try:
+        Response = await _Get(Client, Semaphore, Url)
+        if not Response.is_success:
+            raise FetchError(f"HTTP {Response.status_code}: {Url}")
+    except Exception as e:
+        if Metrics is not None:
+            Metrics.ObserveError(Endpoint, e)
+        raise
+    finally:
+        if Metrics is not None:
+            Metrics.ObserveCall(Endpoint, GetRequestLabels(Url)[1], time.perf_counter() - StartTime)
+    if Cache is not None:
+        Cache.Set(Endpoint, UrlParameters, Response.text)
+    return Response.text
+
+
+# 失败的请求 (测试项目, id, 错误)，测试项目为 None 表示查询型号失败
+FAILED_TYPE = List[Tuple[Optional[TESTSCENE_TYPE], int, str]]
+
+
+async def _CrawlScore(
+    Client,
+    Semaphore: asyncio.Semaphore,
+    Id: int,
+    IsCpu: bool,
+    TestScene: TESTSCENE_TYPE,
+    IdToDeviceInfo: DATA_TYPE,
+    ScoreProgressBar: tqdm,
+    Availability: Optional[AvailabilityStore],
+    Failed: FAILED_TYPE,
+) -> None:
+    try:
+        Text = await _FetchText(
+            Client,
+            Semaphore,
+            ENDPOINT_MEDIANSCORE,
+            Get3DMarkUrlParameters(TestScene, Id),
+        )
+        Score = ParseMedianScore(Text)
+        SetScore(IdToDeviceInfo[Id], TestScene, Score)
+        if Availability:
+            Availability.Record(IsCpu, Id, TestScene, Score)
+    except CacheMissError:
+        pass
+    except Exception as e:
+        # 分数保留 -1，由调用方延迟重试
+        Failed.append((TestScene, Id, repr(e)))
+    finally:
+        ScoreProgressBar.update()
+
+
+async def _CrawlDevice(
+    Client,
+    Semaphore: asyncio.Semaphore,
+    Id: int,
+    IsCpu: bool,
+    TestSceneList: List[TESTSCENE_TYPE],
+    IdToDeviceInfo: DATA_TYPE,
+    NameProgressBar: tqdm,
+    ScoreProgressBar: tqdm,
+    Gaps: Optional[GapIndex],
+    Availability: Optional[AvailabilityStore],
+    Failed: FAILED_TYPE,
+) -> None:
+    DEVICE: str = "CPU" if IsCpu else "GPU"
+    try:
+        Text = await _FetchText(Client, Semaphore, GetNameEndpoint(IsCpu), f"id={Id}")
+        Name: str = ParseName(Text, IsCpu)
+        if Gaps:
+            Gaps.Record(IsCpu, Id, Name)
+    except CacheMissError:
+        return
+    except Exception as e:
+        Failed.append((None, Id, repr(e)))
+        return
+    finally:
+        NameProgressBar.update()
+
+    if Name == "":
+        return
+
+    IdToDeviceInfo[Id] = NewDeviceItem(IsCpu, Id, Name, TestSceneList)
+    NameProgressBar.set_description_str(f"Names... Current {DEVICE}:{Name:^35}")
+
+    # 之前多次没有分数的测试项目记为 SKIPPED_SCORE，不请求
+    QueryScenes: List[TESTSCENE_TYPE] = []
+    for TestScene in TestSceneList:
+        if Availability and not Availability.ShouldQuery(IsCpu, Id, TestScene):
+            IdToDeviceInfo[Id][TestScene.value[2]] = SKIPPED_SCORE
+        else:
+            QueryScenes.append(TestScene)
+
+    # 型号拿到后立即并发请求该设备的所有测试项目
+    ScoreProgressBar.total += len(QueryScenes)
+    ScoreProgressBar.refresh()
+
+    await asyncio.gather(
+        *(
+            _CrawlScore(
+                Client,
+                Semaphore,
+                Id,
+                IsCpu,
+                TestScene,
+                IdToDeviceInfo,
+                ScoreProgressBar,
+                Availability,
+                Failed,
+            )
+            for TestScene in QueryScenes
+        )
+    )
+
+
+async def _GetAllDeviceInfoAsync(
+    IsCpu: bool,
+    TestSceneList: List[TESTSCENE_TYPE],
+    IdList: List[int],
+    Concurrency: int,
+    Gaps: Optional[GapIndex],
+    Availability: Optional[AvailabilityStore],
+    RetryPasses: int,
+    RetryDelay: float,
+    DeadLetter: Optional[DeadLetterFile],
+) -> DATA_TYPE:
+    # 与 IterDeviceScores 相同：失败的请求在全部请求结束后再重试 RetryPasses 轮，
+    # 第 n 轮前等待 RetryDelay * 2^(n-1) 秒，仍然失败的写入 DeadLetter，分数保留 -1
+    IdToDeviceInfo: DATA_TYPE = {}
+    # 单线程内的全局并发上限
+    Semaphore = asyncio.Semaphore(Concurrency)
+
+    async with _CreateClient(Concurrency) as Client:
+        with tqdm(
+            total=len(IdList), desc="Names...", unit="tasks", position=0
+        ) as NameProgressBar, tqdm(
+            total=0, desc="Scores...", unit="tasks", position=1
+        ) as ScoreProgressBar:
+
+            def CrawlDevice(Id: int, Failed: FAILED_TYPE):
+                return _CrawlDevice(
+                    Client,
+                    Semaphore,
+                    Id,
+                    IsCpu,
+                    TestSceneList,
+                    IdToDeviceInfo,
+                    NameProgressBar,
+                    ScoreProgressBar,
+                    Gaps,
+                    Availability,
+                    Failed,
+                )
+
+            def CrawlScore(TestScene: TESTSCENE_TYPE, Id: int, Failed: FAILED_TYPE):
+                return _CrawlScore(
+                    Client,
+                    Semaphore,
+                    Id,
+                    IsCpu,
+                    TestScene,
+                    IdToDeviceInfo,
+                    ScoreProgressBar,
+                    Availability,
+                    Failed,
+                )
+
+            Failed: FAILED_TYPE = []
+            await asyncio.gather(*(CrawlDevice(Id, Failed) for Id in IdList))
+
+            Pass: int = 0
+            while Failed and Pass < RetryPasses:
+                Pass += 1
+                Delay = RetryDelay * 2 ** (Pass - 1)
+                NameProgressBar.write(
+                    f"Retry pass {Pass}/{RetryPasses}: {len(Failed)} failed requests in {Delay:g}s"
+                )
+                await asyncio.sleep(Delay)
+                Deferred, Failed = Failed, []
+                NameIds = [Id for TestScene, Id, _ in Deferred if TestScene is None]
+                NameProgressBar.total += len(NameIds)
+                ScoreProgressBar.total += len(Deferred) - len(NameIds)
+                await asyncio.gather(
+                    *(
+                        CrawlDevice(Id, Failed)
+                        if TestScene is None
+                        else CrawlScore(TestScene, Id, Failed)
+                        for TestScene, Id, _ in Deferred
+                    )
+                )
+
+    for TestScene, Id, Error in Failed:
+        print(f"====== An Exception Raised! ======\n{Error}")
+        if DeadLetter:
+            DeadLetter.Record(TestScene, Id, Error)
+    return IdToDeviceInfo
+
+
+def GetAllDeviceInfoAsync(
+    IsCpu: bool,
+    TestSceneList: List[TESTSCENE_TYPE],
+    *Args: int,
+    Concurrency: Optional[int] = None,
+    bDiscoverIds: bool = False,
+    MissRun: int = DEFAULT_MISS_RUN,
+    bRateControl: bool = True,
+    GapIndexPath: Optional[str] = None,
+    GapReverifyInterval: Optional[float] = DEFAULT_REVERIFY_INTERVAL,
+    AvailabilityPath: Optional[str] = None,
+    AvailabilityRecheckInterval: float = DEFAULT_RECHECK_INTERVAL,
+    Shard: Optional[Tuple[int, int]] = None,
+    RetryPasses: int = DEFAULT_RETRY_PASSES,
+    RetryDelay: float = DEFAULT_RETRY_DELAY,
+    DeadLetterPath: Optional[str] = None,
+) -> DATA_TYPE:
+    # RetryPasses / RetryDelay / DeadLetterPath: 同 IterAllDeviceInfo
+    DEVICE: str = "CPU" if IsCpu else "GPU"
+    MinId: int = 1
+    MaxId: int = 4000 if IsCpu else 2000
+    if len(Args) > 0:
+        MinId = Args[0]
+    if len(Args) > 1:
+        MaxId = Args[1]
+    elif bDiscoverIds:
+        MaxId = DiscoverMaxId(IsCpu, MinId, MissRun=MissRun)
+    Concurrency = Concurrency or DEFAULT_CONCURRENCY
+    if bRateControl and GetRateController() is None:
+        # 并发从较低值开始，慢启动逐步增长到 Concurrency
+        SetRateController(
+            RateController(
+                Concurrency=min(32, Concurrency), MaxConcurrency=Concurrency
+            )
+        )
+
+    print("------------------------------------------")
+    print(
+        f"Get {DEVICE} Name And Scores From ID ({MinId} To {MaxId}), asyncio, concurrency {Concurrency}"
+    )
+    IdList: List[int] = list(range(MinId, MaxId + 1))
+    if Shard:
+        IdList = GetShardIds(IdList, *Shard)
+    IdCount: int = len(IdList)
+    Gaps: Optional[GapIndex] = (
+        GapIndex(GapIndexPath, GapReverifyInterval) if GapIndexPath else None
+    )
+    if Gaps:
+        IdList = Gaps.FilterIds(IsCpu, IdList)
+        print(f"Skip {IdCount - len(IdList)} known empty {DEVICE} IDs ({GapIndexPath})")
+    Availability: Optional[AvailabilityStore] = (
+        AvailabilityStore(AvailabilityPath, RecheckInterval=AvailabilityRecheckInterval)
+        if AvailabilityPath
+        else None
+    )
+    DeadLetter: Optional[DeadLetterFile] = (
+        DeadLetterFile(DeadLetterPath, IsCpu, TestSceneList) if DeadLetterPath else None
+    )
+    # 启用延迟重试时减少立即重试的次数
+    SetMaxAttempts(DEFERRED_MAX_ATTEMPTS if RetryPasses > 0 else DEFAULT_MAX_ATTEMPTS)
+    try:
+        IdToDeviceInfo = asyncio.run(
+            _GetAllDeviceInfoAsync(
+                IsCpu,
+                TestSceneList,
+                IdList,
+                Concurrency,
+                Gaps,
+                Availability,
+                RetryPasses,
+                RetryDelay,
+                DeadLetter,
+            )
+        )
+    finally:
+        if Gaps:
+            Gaps.Save()
+        if Availability:
+            Availability.Save()
+        if DeadLetter:
+            DeadLetter.Save()
+        SetMaxAttempts(DEFAULT_MAX_ATTEMPTS)
+    if DeadLetter and DeadLetter.GetCount():
+        print(f"{DeadLetter.GetCount()} requests failed after all retries ({DeadLetter.Path})")
+    print(f"Dense {DEVICE} ID ranges: {FormatRanges(GetDenseRanges(IdToDeviceInfo))}")
+    if GetRateController() is not None:
+        print(f"Rate control: {GetRateController()}")
+    return IdToDeviceInfo
@@ -0,0 +1,90 @@
+import json, os, time
+from typing import Dict, List, Optional, Tuple
+
+from Helper.Get3DMarkScore import TESTSCENE_TYPE
+from Helper.SharedFile import LockFile, WriteJsonAtomic
+
+
+DEFAULT_AVAILABILITY_PATH: str = "3DMarkAvailability.json"
+# 连续这么多次爬取都没有分数，才认为该设备没有这个测试项目的数据
+DEFAULT_MIN_ZERO_RUNS: int = 3
+# 没有数据的 (设备, 测试项目) 超过这个时间（秒）后重新请求一次
+DEFAULT_RECHECK_INTERVAL: float = 14 * 24 * 3600
+# 因之前多次没有分数而跳过请求的分数，与没取到的 -1、确实没有成绩的 0 区分
+SKIPPED_SCORE: int = -2
+_FORMAT_VERSION: int = 1
+
+
+class AvailabilityStore:
+    # 记录每个 (设备, 测试项目) 连续返回 0 分的次数和最后一次请求的时间
+    # 老显卡没有 Speed Way、移动端显卡没有 Fire Strike Ultra 等，这些组合只按较慢的周期重新请求
+    def __init__(
+        self,
+        Path: str = DEFAULT_AVAILABILITY_PATH,
+        MinZeroRuns: int = DEFAULT_MIN_ZERO_RUNS,
+        RecheckInterval: float = DEFAULT_RECHECK_INTERVAL,
+    ) -> None:
+        self.Path: str = Path
+        self.MinZeroRuns: int = MinZeroRuns
+        self.RecheckInterval: float = RecheckInterval
+        # 设备类型 -> 测试项目成员名 -> {id: (连续 0 分次数, 最后请求时间)}
+        self._ZeroRuns: Dict[str, Dict[str, Dict[int, Tuple[int, int]]]] = {
+            "CPU": {},
+            "GPU": {},
+        }
+        # 本进程未保存的修改：(设备类型, 测试项目成员名, id) -> 新的记录，None 表示清除
+        # 保存时合并到文件中的最新内容上，多个分片进程共用一个文件时不会互相覆盖
+        self._Changes: Dict[Tuple[str, str, int], Optional[Tuple[int, int]]] = {}
+        if os.path.exists(Path):
+            self._Load()
+
+    def _Load(self) -> None:
+        with open(self.Path, "r", encoding="utf-8") as File:
+            RawData = json.load(File)
+        for Device in self._ZeroRuns:
+            self._ZeroRuns[Device] = {}
+            for SceneName, Items in RawData.get(Device, {}).items():
+                self._ZeroRuns[Device][SceneName] = {
+                    int(Id): (Count, CheckTime) for Id, (Count, CheckTime) in Items.items()
+                }
+
+    def Save(self) -> None:
+        # 加锁后重新读取文件，把本进程的修改合并上去再写回
+        with LockFile(self.Path):
+            if os.path.exists(self.Path):
+                self._Load()
+            for (Device, SceneName, Id), Entry in self._Changes.items():
+                Items = self._ZeroRuns[Device].setdefault(SceneName, {})
+                if Entry is None:
+                    Items.pop(Id, None)
+                else:
+                    Items[Id] = Entry
+            self._Changes.clear()
+            WriteJsonAtomic({"Version": _FORMAT_VERSION, **self._ZeroRuns}, self.Path)
+
+    def ShouldQuery(
+        self, IsCpu: bool, Id: int, TestScene: TESTSCENE_TYPE, Now: Optional[float] = None
+    ) -> bool:
+        Device: str = "CPU" if IsCpu else "GPU"
+        Entry = self._ZeroRuns[Device].get(TestScene.name, {}).get(Id)
+        if Entry is None or Entry[0] < self.MinZeroRuns:
+            return True
+        Now = Now if Now is not None else time.time()
+        return Now - Entry[1] > self.RecheckInterval
+
+    def FilterIds(
+        self, IsCpu: bool, TestScene: TESTSCENE_TYPE, IdList: List[int]
+    ) -> List[int]:
+        Now = time.time()
+        return [Id for Id in IdList if self.ShouldQuery(IsCpu, Id, TestScene, Now)]
+
+    def Record(self, IsCpu: bool, Id: int, TestScene: TESTSCENE_TYPE, Score: int) -> None:
+        # 有分数时清除记录，0 分时累加次数；负数表示没取到，不记录
+        Device: str = "CPU" if IsCpu else "GPU"
+        Items = self._ZeroRuns[Device].setdefault(TestScene.name, {})
+        if Score > 0:
+            Items.pop(Id, None)
+            self._Changes[(Device, TestScene.name, Id)] = None
+        elif Score == 0:
+            Count = Items.get(Id, (0, 0))[0]
+            Items[Id] = self._Changes[(Device, TestScene.name, Id)] = (Count + 1, int(time.time()))
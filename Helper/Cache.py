@@ -0,0 +1,153 @@
+import sqlite3, threading, time
+from typing import Dict, Optional, Tuple
+
+
+DEFAULT_CACHE_PATH: str = "3DMarkCache.sqlite"
+DEFAULT_MAX_ENTRIES: int = 500000
+# 新响应最多攒多久写入一次（秒），进程被强制结束时最多丢失这段时间内的缓存
+DEFAULT_COMMIT_INTERVAL: float = 5.0
+# 各 endpoint 的默认过期时间（秒），None 表示永不过期
+# 设备名几乎不会变化，中位数分数变化较慢
+DEFAULT_TTL: Dict[str, Optional[float]] = {
+    "search/cpuid": 30 * 24 * 3600,
+    "search/gpuid": 30 * 24 * 3600,
+    "medianscore": 24 * 3600,
+}
+
+
+class CacheMissError(Exception):
+    pass
+
+
+class ResponseCache:
+    def __init__(
+        self,
+        Path: str = DEFAULT_CACHE_PATH,
+        Ttl: Optional[Dict[str, Optional[float]]] = None,
+        MaxEntries: int = DEFAULT_MAX_ENTRIES,
+        bOffline: bool = False,
+    ) -> None:
+        self.Path: str = Path
+        self.Ttl: Dict[str, Optional[float]] = dict(DEFAULT_TTL)
+        if Ttl:
+            self.Ttl.update(Ttl)
+        self.MaxEntries: int = MaxEntries
+        # 离线模式：只读缓存，未命中时抛出 CacheMissError，不会访问网络
+        self.bOffline: bool = bOffline
+        self.Hits: int = 0
+        self.Misses: int = 0
+
+        self._Lock = threading.Lock()
+        self._InsertsSinceEvict: int = 0
+        # 未写入数据库的新响应和访问时间，攒成一批后在一个短事务中写入；
+        # 不在两次写入之间保持打开的事务，多个分片进程共用缓存时不会长时间占着写锁
+        self._Pending: Dict[Tuple[str, str], Tuple[str, float]] = {}
+        self._Touched: Dict[Tuple[str, str], float] = {}
+        self._LastFlush: float = time.time()
+        self._bClosed: bool = False
+        # 其他进程正在写入时最多等待这么久
+        self._Connection = sqlite3.connect(Path, timeout=30, check_same_thread=False)
+        self._Connection.execute("PRAGMA journal_mode=WAL")
+        self._Connection.execute("PRAGMA synchronous=NORMAL")
+        self._Connection.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "endpoint TEXT NOT NULL, "
+            "parameters TEXT NOT NULL, "
+            "body TEXT NOT NULL, "
+            "created REAL NOT NULL, "
+            "accessed REAL NOT NULL, "
+            "PRIMARY KEY (endpoint, parameters))"
+        )
+        self._Connection.execute(
+            "CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)"
+        )
+        self._Connection.commit()
+
+    def Get(self, Endpoint: str, Parameters: str) -> Optional[str]:
+        Now = time.time()
+        Key = (Endpoint, Parameters)
+        with self._Lock:
+            Pending = self._Pending.get(Key)
+            if Pending is not None:
+                self.Hits += 1
+                return Pending[0]
+
+            Row = self._Connection.execute(
+                "SELECT body, created FROM responses WHERE endpoint=? AND parameters=?",
+                Key,
+            ).fetchone()
+            Ttl = self.Ttl.get(Endpoint)
+            # 离线模式下忽略过期时间，有什么用什么
+            if Row is None or (
+                not self.bOffline and Ttl is not None and Now - Row[1] > Ttl
+            ):
+                self.Misses += 1
+                return None
+
+            self._Touched[Key] = Now
+            self.Hits += 1
+            self._FlushIfDue(Now)
+            return Row[0]
+
+    def Set(self, Endpoint: str, Parameters: str, Body: str) -> None:
+        Now = time.time()
+        with self._Lock:
+            self._Pending[(Endpoint, Parameters)] = (Body, Now)
+            self._FlushIfDue(Now)
+
+    def _FlushIfDue(self, Now: float) -> None:
+        if (
+            len(self._Pending) + len(self._Touched) >= 100
+            or Now - self._LastFlush >= DEFAULT_COMMIT_INTERVAL
+        ):
+            self._Flush()
+
+    def _Flush(self) -> None:
+        self._LastFlush = time.time()
+        if not self._Pending and not self._Touched:
+            return
+        with self._Connection:
+            self._Connection.executemany(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?)",
+                [
+                    (Endpoint, Parameters, Body, Created, Created)
+                    for (Endpoint, Parameters), (Body, Created) in self._Pending.items()
+                ],
+            )
+            self._Connection.executemany(
+                "UPDATE responses SET accessed=? WHERE endpoint=? AND parameters=?",
+                [(Accessed, *Key) for Key, Accessed in self._Touched.items()],
+            )
+            self._InsertsSinceEvict += len(self._Pending)
+            self._Pending.clear()
+            self._Touched.clear()
+            # 按访问时间淘汰，分批检查以减少 COUNT 开销
+            if self._InsertsSinceEvict >= 1000:
+                self._Evict()
+
+    def _Evict(self) -> None:
+        self._InsertsSinceEvict = 0
+        (Count,) = self._Connection.execute("SELECT COUNT(*) FROM responses").fetchone()
+        if Count > self.MaxEntries:
+            self._Connection.execute(
+                "DELETE FROM responses WHERE rowid IN ("
+                "SELECT rowid FROM responses ORDER BY accessed LIMIT ?)",
+                (Count - self.MaxEntries,),
+            )
+
+    def Close(self) -> None:
+        # 写入未写入的响应，可以重复调用
+        with self._Lock:
+            if self._bClosed:
+                return
+            self._bClosed = True
+            self._Flush()
+            with self._Connection:
+                self._Evict()
+            self._Connection.close()
+
+    def __enter__(self) -> "ResponseCache":
+        return self
+
+    def __exit__(self, *Args) -> None:
+        self.Close()
@@ -0,0 +1,221 @@
+import os, time
+from collections import deque
+from typing import Deque, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+from concurrent.futures import ThreadPoolExecutor, Future, wait, FIRST_COMPLETED
+
+from Helper.Session import EnsurePoolSize
+from Helper.Cache import CacheMissError
+from Helper.RateControl import GetRateController
+from Helper.Hedge import GetHedger
+from Helper.Journal import CrawlJournal
+from Helper.GapIndex import GapIndex
+from Helper.Availability import AvailabilityStore, SKIPPED_SCORE
+from Helper.DeadLetter import DeadLetterFile, DEFAULT_RETRY_DELAY
+from Helper.Get3DMarkScore import (
+    GetNameFromId,
+    GetMedianScoreFromId,
+    NewDeviceItem,
+    SetScore,
+    TESTSCENE_TYPE,
+    DATA_TYPE,
+)
+
+
+def IterDeviceScores(
+    IsCpu: bool,
+    TestSceneList: List[TESTSCENE_TYPE],
+    IdList: Iterable[int],
+    MaxWorkers: int = os.cpu_count(),
+    Window: Optional[int] = None,
+    Items: Optional[DATA_TYPE] = None,
+    ExtraScoreIds: Optional[Dict[TESTSCENE_TYPE, List[int]]] = None,
+    Journal: Optional[CrawlJournal] = None,
+    Gaps: Optional[GapIndex] = None,
+    Availability: Optional[AvailabilityStore] = None,
+    RetryPasses: int = 0,
+    RetryDelay: float = DEFAULT_RETRY_DELAY,
+    DeadLetter: Optional[DeadLetterFile] = None,
+    bProgress: bool = True,
+) -> Iterator[Tuple[int, Dict[str, Union[int, str]]]]:
+    # 查询 IdList 中每个 id 的型号，有设备时再取所有测试项目的分数，
+    # 一个设备的所有请求完成后立即产出 (id, 记录)，不会保留已产出的记录
+    # IdList 按需读取，在途请求不超过 Window（默认为线程数的两倍），内存占用与 id 范围无关
+    # Items / ExtraScoreIds: 已有设备的记录，以及每个测试项目中需要重新请求分数的已有设备
+    # Journal / Gaps / Availability / DeadLetter: 记录每个请求的结果，由调用方负责保存和关闭
+    # RetryPasses: 失败的请求放入延迟队列，主循环结束后再重试这么多轮，第 n 轮前等待 RetryDelay * 2^(n-1) 秒
+    #   仍然失败的写入 DeadLetter，分数保留 -1（与没有成绩的 0 分区分），设备等到最后一轮后才产出
+    DEVICE: str = "CPU" if IsCpu else "GPU"
+    Items = Items if Items is not None else {}
+    Window = Window or MaxWorkers * 2
+
+    # 连接池至少与线程数一致，每个线程都能复用一条长连接；对冲请求需要额外的连接
+    EnsurePoolSize(MaxWorkers * 2 if GetHedger() else MaxWorkers)
+
+    # 待提交的分数任务，优先于型号任务提交，型号一旦取到就立即开始取分数
+    ScoreQueue: Deque[Tuple[TESTSCENE_TYPE, int]] = deque()
+    # 设备 id -> 未完成的分数任务数，为 0 时产出
+    Remaining: Dict[int, int] = {}
+    SkippedScores: int = 0
+    for TestScene in TestSceneList:
+        for Id in (ExtraScoreIds or {}).get(TestScene, []):
+            if Availability and not Availability.ShouldQuery(IsCpu, Id, TestScene):
+                SkippedScores += 1
+                continue
+            ScoreQueue.append((TestScene, Id))
+            Remaining[Id] = Remaining.get(Id, 0) + 1
+
+    NameIter: Iterator[int] = iter(IdList)
+    # 延迟重试的型号任务，优先于 NameIter 提交
+    NameQueue: Deque[int] = deque()
+    # 失败等待延迟重试的任务 (测试项目, id, 错误)，型号任务的测试项目为 None
+    Deferred: List[Tuple[Optional[TESTSCENE_TYPE], int, str]] = []
+    # Future -> (测试项目, id)，型号任务的测试项目为 None
+    Pending: Dict[Future, Tuple[Optional[TESTSCENE_TYPE], int]] = {}
+
+    from tqdm import tqdm
+
+    NameProgressBar = tqdm(
+        total=len(IdList) if hasattr(IdList, "__len__") else None,
+        desc=f"{DEVICE} Name",
+        unit="tasks",
+        disable=not bProgress,
+    )
+    SceneProgressBars: Dict[TESTSCENE_TYPE, tqdm] = {
+        TestScene: tqdm(
+            total=sum(1 for Scene, _ in ScoreQueue if Scene == TestScene),
+            desc=TestScene.value[2],
+            unit="tasks",
+            position=Index + 1,
+            disable=not bProgress,
+        )
+        for Index, TestScene in enumerate(TestSceneList)
+    }
+
+    ThreadPool = ThreadPoolExecutor(max_workers=MaxWorkers)
+
+    def FillWindow() -> None:
+        while len(Pending) < Window:
+            if ScoreQueue:
+                TestScene, Id = ScoreQueue.popleft()
+                Pending[ThreadPool.submit(GetMedianScoreFromId, TestScene, Id)] = (
+                    TestScene,
+                    Id,
+                )
+                continue
+            Id = NameQueue.popleft() if NameQueue else next(NameIter, None)
+            if Id is None:
+                break
+            Pending[ThreadPool.submit(GetNameFromId, Id, IsCpu)] = (None, Id)
+
+    def OnName(Thread: Future) -> bool:
+        # 返回是否为不需要取分数、可以直接产出的设备
+        nonlocal SkippedScores
+        Result: Tuple[int, str] = Thread.result()
+        if Journal:
+            Journal.RecordName(*Result)
+        if Gaps:
+            Gaps.Record(IsCpu, *Result)
+        if Result[1] == "":
+            return False
+        Id: int = Result[0]
+        Name: str = Result[1]
+        Items[Id] = NewDeviceItem(IsCpu, Id, Name, TestSceneList)
+        Remaining[Id] = 0
+        for TestScene in TestSceneList:
+            if Availability and not Availability.ShouldQuery(IsCpu, Id, TestScene):
+                # 之前多次没有分数，记为 SKIPPED_SCORE 且不记录获取时间，增量更新时仍视为缺失
+                SkippedScores += 1
+                Items[Id][TestScene.value[2]] = SKIPPED_SCORE
+                continue
+            ScoreQueue.append((TestScene, Id))
+            Remaining[Id] += 1
+            SceneProgressBars[TestScene].total += 1
+            SceneProgressBars[TestScene].refresh()
+        NameProgressBar.set_description_str(f"{DEVICE} Name:{Name:^35}")
+        return Remaining[Id] == 0
+
+    def OnScore(Thread: Future, TestScene: TESTSCENE_TYPE) -> None:
+        Result: Tuple[int, int] = Thread.result()
+        Id: int = Result[0]
+        MedianScore: int = Result[1]
+        UpdateTime: int = int(time.time())
+        SetScore(Items[Id], TestScene, MedianScore, UpdateTime)
+        if Journal:
+            Journal.RecordScore(Id, TestScene, MedianScore, UpdateTime)
+        if Availability:
+            Availability.Record(IsCpu, Id, TestScene, MedianScore)
+
+    try:
+        # 已有设备中所有分数都被跳过的，直接产出
+        for Id in [Id for Id, Item in Items.items() if Id not in Remaining]:
+            yield Id, Items.pop(Id)
+
+        Pass: int = 0
+        while True:
+            FillWindow()
+            while Pending:
+                Done, _ = wait(Pending, return_when=FIRST_COMPLETED)
+                Finished: List[int] = []
+                for Thread in Done:
+                    TestScene, Id = Pending.pop(Thread)
+                    bFailed: bool = False
+                    try:
+                        if TestScene is None:
+                            if OnName(Thread):
+                                Finished.append(Id)
+                        else:
+                            OnScore(Thread, TestScene)
+                    except CacheMissError:
+                        pass
+                    except Exception as e:
+                        if Pass < RetryPasses:
+                            # 放入延迟队列，设备等重试完成后再产出
+                            bFailed = True
+                            Deferred.append((TestScene, Id, repr(e)))
+                        else:
+                            print(f"====== An Exception Raised! ======\n{e}")
+                            if DeadLetter:
+                                DeadLetter.Record(TestScene, Id, repr(e))
+                    finally:
+                        if TestScene is None:
+                            NameProgressBar.update()
+                        elif not bFailed:
+                            SceneProgressBars[TestScene].update()
+                            # 最终失败的分数任务同样计为完成，记录中保留 -1
+                            Remaining[Id] -= 1
+                            if Remaining[Id] == 0:
+                                Finished.append(Id)
+                if GetRateController() is not None:
+                    NameProgressBar.set_postfix_str(str(GetRateController()), False)
+                FillWindow()
+                # 先补满窗口再产出，消费方处理记录时请求仍在进行
+                for Id in Finished:
+                    del Remaining[Id]
+                    yield Id, Items.pop(Id)
+
+            if not Deferred:
+                break
+            # 主循环（或上一轮）结束后统一重试失败的请求，等待时间逐轮加倍
+            Pass += 1
+            Delay = RetryDelay * 2 ** (Pass - 1)
+            NameProgressBar.write(
+                f"Retry pass {Pass}/{RetryPasses}: {len(Deferred)} failed requests in {Delay:g}s"
+            )
+            time.sleep(Delay)
+            for TestScene, Id, _ in Deferred:
+                if TestScene is None:
+                    NameQueue.append(Id)
+                    NameProgressBar.total += 1
+                else:
+                    ScoreQueue.append((TestScene, Id))
+            Deferred = []
+    finally:
+        # 正常结束、中断或消费方提前停止迭代时，取消尚未开始的请求
+        ThreadPool.shutdown(wait=False, cancel_futures=True)
+        NameProgressBar.close()
+        for ProgressBar in SceneProgressBars.values():
+            ProgressBar.close()
+        if Availability:
+            print(f"Skipped {SkippedScores} scores without results")
+        if DeadLetter and DeadLetter.GetCount():
+            print(f"{DeadLetter.GetCount()} requests failed after all retries ({DeadLetter.Path})")
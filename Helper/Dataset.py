@@ -0,0 +1,143 @@
+import json, os
+from typing import Dict, Iterable, List, Tuple, Union
+
+from Helper.Get3DMarkScore import UPDATE_TIME_PREFIX, DATA_TYPE
+
+
+# 列式数据文件（Arrow IPC）的扩展名
+ARROW_EXTENSIONS = (".arrow", ".feather", ".ipc")
+DATASET_FILE_TYPES = [("Json File", ".json"), ("Arrow File", ".arrow")]
+_FORMAT_VERSION: bytes = b"1"
+
+
+def LoadJsonData(FilePath: str) -> DATA_TYPE:
+    with open(FilePath, "r", encoding="utf-8") as File:
+        RawData: Dict[str, Dict] = json.load(File)
+    # json 的 key 只能是字符串，读回时转回 int
+    return {int(Id): Item for Id, Item in RawData.items()}
+
+
+def SaveJsonData(Data: DATA_TYPE, FilePath: str) -> None:
+    with open(FilePath, "w", encoding="utf-8") as File:
+        json.dump(Data, File)
+
+
+def SaveJsonRecords(
+    Records: Iterable[Tuple[int, Dict[str, Union[int, str]]]], FilePath: str
+) -> int:
+    # 逐条写入，不需要把所有记录保存在内存中，结果与 SaveJsonData 相同；返回记录数
+    # 先写入临时文件，中途出错时不会覆盖已有的数据文件
+    TempPath = f"{FilePath}.tmp"
+    Count: int = 0
+    with open(TempPath, "w", encoding="utf-8") as File:
+        File.write("{")
+        for Id, Item in Records:
+            File.write(f"{', ' if Count else ''}{json.dumps(str(Id))}: {json.dumps(Item)}")
+            Count += 1
+        File.write("}")
+    os.replace(TempPath, FilePath)
+    return Count
+
+
+def ImportPyarrow():
+    try:
+        import pyarrow, pyarrow.ipc
+    except ImportError as e:
+        raise ImportError("列式数据文件需要 pyarrow，请执行 pip install pyarrow") from e
+    return pyarrow
+
+
+def _GetColumnType(pa, Column: str):
+    # id 和分数为 int32，获取时间为 int64，型号为字符串
+    if Column.endswith(" Name"):
+        return pa.string()
+    if Column.startswith(UPDATE_TIME_PREFIX):
+        return pa.int64()
+    return pa.int32()
+
+
+def DataToTable(Data: DATA_TYPE):
+    pa = ImportPyarrow()
+    # 所有记录中出现过的列，按首次出现的顺序；记录中没有的列为 null
+    Columns: Dict[str, None] = {}
+    for Item in Data.values():
+        Columns.update(dict.fromkeys(Item))
+    Items = list(Data.values())
+    Arrays = [
+        pa.array([Item.get(Column) for Item in Items], type=_GetColumnType(pa, Column))
+        for Column in Columns
+    ]
+    Device = next((Column.split(" ")[0] for Column in Columns if Column.endswith(" ID")), "")
+    Schema = pa.schema(
+        [pa.field(Column, Array.type) for Column, Array in zip(Columns, Arrays)],
+        metadata={b"3DMarkScoreScraper": _FORMAT_VERSION, b"Device": Device.encode()},
+    )
+    return pa.Table.from_arrays(Arrays, schema=Schema)
+
+
+def TableToData(Table) -> DATA_TYPE:
+    IdColumn = next(Column for Column in Table.column_names if Column.endswith(" ID"))
+    ColumnValues: Dict[str, List] = {
+        Column: Table.column(Column).to_pylist() for Column in Table.column_names
+    }
+    Data: DATA_TYPE = {}
+    for Index, Id in enumerate(ColumnValues[IdColumn]):
+        Data[Id] = {
+            Column: Values[Index]
+            for Column, Values in ColumnValues.items()
+            if Values[Index] is not None
+        }
+    return Data
+
+
+def LoadArrowTable(FilePath: str):
+    # 内存映射读取，列数据不会被复制到内存中
+    pa = ImportPyarrow()
+    with pa.memory_map(FilePath, "r") as Source:
+        return pa.ipc.open_file(Source).read_all()
+
+
+def LoadArrowData(FilePath: str) -> DATA_TYPE:
+    return TableToData(LoadArrowTable(FilePath))
+
+
+def LoadDatasetFrame(FilePath: str):
+    # 读成 DataFrame（每行一个设备），用于合并和导出；Arrow 文件直接按列转换，不经过 dict
+    # split_blocks 让没有缺失值的列尽量不复制内存映射的数据
+    if IsArrowFile(FilePath):
+        return LoadArrowTable(FilePath).to_pandas(split_blocks=True)
+
+    import pandas as pd
+
+    return pd.DataFrame.from_records(list(LoadJsonData(FilePath).values()))
+
+
+def SaveArrowData(Data: DATA_TYPE, FilePath: str) -> None:
+    pa = ImportPyarrow()
+    Table = DataToTable(Data)
+    with pa.OSFile(FilePath, "wb") as Sink:
+        with pa.ipc.new_file(Sink, Table.schema) as Writer:
+            Writer.write_table(Table)
+
+
+def IsArrowFile(FilePath: str) -> bool:
+    return os.path.splitext(FilePath)[1].lower() in ARROW_EXTENSIONS
+
+
+def LoadDataset(FilePath: str) -> DATA_TYPE:
+    # 按扩展名读取 json 或 Arrow 文件
+    if IsArrowFile(FilePath):
+        return LoadArrowData(FilePath)
+    return LoadJsonData(FilePath)
+
+
+def SaveDataset(Data: DATA_TYPE, FilePath: str) -> None:
+    if IsArrowFile(FilePath):
+        SaveArrowData(Data, FilePath)
+    else:
+        SaveJsonData(Data, FilePath)
+
+
+def ConvertDataset(InputPath: str, OutputPath: str) -> None:
+    # json <-> Arrow 互相转换
+    SaveDataset(LoadDataset(InputPath), OutputPath)
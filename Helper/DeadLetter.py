@@ -0,0 +1,122 @@
+import json, os, threading, time
+from typing import Dict, List, NamedTuple, Optional
+
+from Helper.Get3DMarkScore import CPU_TESTSCENE, GPU_TESTSCENE, TESTSCENE_TYPE
+from Helper.SharedFile import LockFile, OpenAtomic
+
+
+# 主循环结束后延迟重试的轮数，以及第一轮前的等待时间（秒），之后每轮翻倍
+DEFAULT_RETRY_PASSES: int = 3
+DEFAULT_RETRY_DELAY: float = 2.0
+# 启用延迟重试时每个请求立即重试的次数
+DEFERRED_MAX_ATTEMPTS: int = 2
+
+
+class DeadLetters(NamedTuple):
+    IsCpu: bool
+    # 爬取时的全部测试项目，重新查询型号的设备需要请求这些测试项目
+    TestSceneList: List[TESTSCENE_TYPE]
+    # 查询型号失败的 id
+    NameIds: List[int]
+    # 每个测试项目中请求分数失败的 id
+    ScoreIds: Dict[TESTSCENE_TYPE, List[int]]
+
+
+def GetDeadLetterPath(IsCpu: bool) -> str:
+    return f"{'CPU' if IsCpu else 'GPU'}.deadletter.jsonl"
+
+
+class DeadLetterFile:
+    # 延迟重试后仍然失败的请求，每行一条（JSONL），之后可以用 replay 单独重新请求
+    # 只在 Save 时整体写入（加锁，临时文件 + 替换）：默认追加到已有的记录之后，没有失败的请求时不修改文件
+    # bReplace: 只保留本次的记录，没有失败的请求时删除文件（replay 时使用，已重新请求的记录不再保留）
+    def __init__(
+        self,
+        Path: str,
+        IsCpu: bool,
+        TestSceneList: List[TESTSCENE_TYPE],
+        bReplace: bool = False,
+    ) -> None:
+        self.Path: str = Path
+        self.IsCpu: bool = IsCpu
+        self.TestSceneList: List[TESTSCENE_TYPE] = TestSceneList
+        self.bReplace: bool = bReplace
+        self._Lock = threading.Lock()
+        self._Records: List[Dict] = []
+
+    def Record(self, TestScene: Optional[TESTSCENE_TYPE], Id: int, Error: str) -> None:
+        # TestScene 为 None 表示查询型号失败
+        Record: Dict = {"Type": "Name" if TestScene is None else "Score", "Id": Id}
+        if TestScene is not None:
+            Record["Scene"] = TestScene.name
+        Record.update({"Error": Error, "Time": int(time.time())})
+        with self._Lock:
+            self._Records.append(Record)
+
+    def GetCount(self) -> int:
+        return len(self._Records)
+
+    def Save(self) -> int:
+        # 返回本次写入的记录数
+        if not self._Records and not self.bReplace:
+            return 0
+        with self._Lock, LockFile(self.Path):
+            bExists = os.path.exists(self.Path)
+            if not self._Records:
+                if self.bReplace and bExists:
+                    os.remove(self.Path)
+                return 0
+
+            SceneNames: List[str] = [TestScene.name for TestScene in self.TestSceneList]
+            Records: List[Dict] = []
+            if bExists and not self.bReplace:
+                with open(self.Path, "r", encoding="utf-8") as File:
+                    for Line in File:
+                        Record = json.loads(Line)
+                        if Record.get("Type") != "Header":
+                            Records.append(Record)
+                            continue
+                        if Record["IsCpu"] != self.IsCpu:
+                            raise ValueError(f"{self.Path} 不是 {'CPU' if self.IsCpu else 'GPU'} 的死信文件")
+                        # 测试项目取并集，重新查询型号的设备请求所有出现过的测试项目
+                        SceneNames = Record["Scenes"] + [
+                            Name for Name in SceneNames if Name not in Record["Scenes"]
+                        ]
+            Records += self._Records
+
+            Header = {
+                "Type": "Header",
+                "IsCpu": self.IsCpu,
+                "Scenes": SceneNames,
+                "Time": int(time.time()),
+            }
+            with OpenAtomic(self.Path) as File:
+                for Record in [Header, *Records]:
+                    File.write(json.dumps(Record, ensure_ascii=False) + "\n")
+            return len(self._Records)
+
+
+def LoadDeadLetters(Path: str) -> DeadLetters:
+    IsCpu: bool = False
+    SceneNames: List[str] = []
+    NameIds: List[int] = []
+    ScoreIds: Dict[str, List[int]] = {}
+    with open(Path, "r", encoding="utf-8") as File:
+        for Line in File:
+            Record = json.loads(Line)
+            Type = Record.get("Type")
+            if Type == "Header":
+                IsCpu = Record["IsCpu"]
+                SceneNames = Record["Scenes"]
+            elif Type == "Name":
+                NameIds.append(Record["Id"])
+            elif Type == "Score":
+                ScoreIds.setdefault(Record["Scene"], []).append(Record["Id"])
+    SceneEnum = CPU_TESTSCENE if IsCpu else GPU_TESTSCENE
+    # 多次追加的文件中同一个请求可能出现多次
+    return DeadLetters(
+        IsCpu,
+        [SceneEnum[Name] for Name in SceneNames],
+        list(dict.fromkeys(NameIds)),
+        {SceneEnum[Name]: list(dict.fromkeys(Ids)) for Name, Ids in ScoreIds.items()},
+    )
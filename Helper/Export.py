@@ -0,0 +1,136 @@
+import os
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+
+EXPORT_FORMATS: Tuple[str, ...] = ("xlsx", "csv", "parquet", "feather")
+# 保存对话框中的文件类型
+EXPORT_FILE_TYPES: List[Tuple[str, str]] = [
+    ("Excel", ".xlsx"),
+    ("CSV", ".csv"),
+    ("Parquet", ".parquet"),
+    ("Feather", ".feather"),
+]
+# Excel 工作表名最长 31 个字符
+_MAX_SHEET_NAME: int = 31
+
+
+def GetExportFormat(FilePath: str, Format: Optional[str] = None) -> str:
+    # 未指定格式时按扩展名判断，.xls 也按 xlsx 写出
+    if Format:
+        Format = Format.lower()
+    else:
+        Format = os.path.splitext(FilePath)[1].lower().lstrip(".")
+        Format = {"xls": "xlsx", "pq": "parquet", "arrow": "feather"}.get(Format, Format)
+    if Format not in EXPORT_FORMATS:
+        raise ValueError(f"不支持的导出格式：{Format}，可选：{', '.join(EXPORT_FORMATS)}")
+    return Format
+
+
+# 合并同型号后的表：xlsx 中的工作表名，其他格式的文件名后缀
+DEDUP_SHEET_NAME: str = "Dedup"
+DEDUP_SUFFIX: str = ".dedup"
+
+
+def GetDedupPath(FilePath: str) -> str:
+    Base, Extension = os.path.splitext(FilePath)
+    return f"{Base}{DEDUP_SUFFIX}{Extension}"
+
+
+def _IterSheets(
+    Df, ScoreColumns: List[str], bPerSceneSheets: bool, DedupDf=None
+) -> Iterator[Tuple[str, object]]:
+    yield "Sheet1", Df
+    if DedupDf is not None:
+        yield DEDUP_SHEET_NAME, DedupDf
+    if not bPerSceneSheets:
+        return
+    # 每个测试项目一张表：只保留该项目的分数，剔除无分数的设备并按分数排序
+    OtherColumns = [Column for Column in Df.columns if Column not in ScoreColumns]
+    for ScoreColumn in ScoreColumns:
+        SceneDf = Df.loc[Df[ScoreColumn] > 0, OtherColumns + [ScoreColumn]]
+        SceneDf = SceneDf.sort_values(ScoreColumn, ascending=False, kind="stable")
+        yield ScoreColumn.replace("3DMark ", "")[:_MAX_SHEET_NAME], SceneDf
+
+
+def _ToCell(Value: object) -> object:
+    # numpy 数值转成 Python 类型，缺失值写成空单元格
+    if Value is None or Value != Value:
+        return None
+    if hasattr(Value, "item"):
+        return Value.item()
+    return Value
+
+
+def _IterRows(Df) -> Iterable[list]:
+    for Row in Df.itertuples(index=False, name=None):
+        yield [_ToCell(Value) for Value in Row]
+
+
+def _WriteXlsx(
+    Df, FilePath: str, ScoreColumns: List[str], bPerSceneSheets: bool, DedupDf=None
+) -> None:
+    # 流式写入，内存占用与行数无关：优先用 xlsxwriter 的 constant_memory 模式，
+    # 没有安装时退回到 openpyxl 的 write_only 模式
+    try:
+        import xlsxwriter
+    except ImportError:
+        xlsxwriter = None
+
+    if xlsxwriter is not None:
+        Workbook = xlsxwriter.Workbook(FilePath, {"constant_memory": True})
+        try:
+            for SheetName, SheetDf in _IterSheets(Df, ScoreColumns, bPerSceneSheets, DedupDf):
+                Worksheet = Workbook.add_worksheet(SheetName)
+                Worksheet.write_row(0, 0, [str(Column) for Column in SheetDf.columns])
+                for RowIndex, Row in enumerate(_IterRows(SheetDf), start=1):
+                    Worksheet.write_row(RowIndex, 0, Row)
+        finally:
+            Workbook.close()
+        return
+
+    from openpyxl import Workbook as OpenpyxlWorkbook
+
+    Workbook = OpenpyxlWorkbook(write_only=True)
+    for SheetName, SheetDf in _IterSheets(Df, ScoreColumns, bPerSceneSheets, DedupDf):
+        Worksheet = Workbook.create_sheet(SheetName)
+        Worksheet.append([str(Column) for Column in SheetDf.columns])
+        for Row in _IterRows(SheetDf):
+            Worksheet.append(Row)
+    Workbook.save(FilePath)
+
+
+def ExportDataFrame(
+    Df,
+    FilePath: str,
+    Format: Optional[str] = None,
+    bPerSceneSheets: bool = False,
+    DedupDf=None,
+) -> str:
+    # 按格式导出，返回实际使用的格式；bPerSceneSheets 只对 xlsx 有效
+    # DedupDf: 合并同型号后的表，xlsx 中写在 Dedup 工作表，其他格式写到 <文件名>.dedup.<扩展名>
+    Format = GetExportFormat(FilePath, Format)
+    ScoreColumns = [Column for Column in Df.columns if "3DMark" in Column]
+
+    if Format == "xlsx":
+        _WriteXlsx(Df, FilePath, ScoreColumns, bPerSceneSheets, DedupDf)
+        return Format
+
+    _WriteTable(Df, FilePath, Format)
+    if DedupDf is not None:
+        _WriteTable(DedupDf, GetDedupPath(FilePath), Format)
+    return Format
+
+
+def _WriteTable(Df, FilePath: str, Format: str) -> None:
+    if Format == "csv":
+        # utf-8-sig 让 Excel 打开时能正确识别编码
+        Df.to_csv(FilePath, index=False, encoding="utf-8-sig")
+        return
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError as e:
+        raise ImportError(f"导出 {Format} 需要 pyarrow，请执行 pip install pyarrow") from e
+    if Format == "parquet":
+        Df.to_parquet(FilePath, index=False)
+    else:
+        Df.to_feather(FilePath)
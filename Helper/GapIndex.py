@@ -0,0 +1,105 @@
+import json, os, time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from Helper.SharedFile import LockFile, WriteJsonAtomic
+
+
+DEFAULT_GAP_INDEX_PATH: str = "3DMarkGaps.json"
+# 空 id 超过这个时间（秒）后重新确认一次
+DEFAULT_REVERIFY_INTERVAL: float = 30 * 24 * 3600
+_FORMAT_VERSION: int = 1
+
+
+class GapIndex:
+    # 已确认没有设备的 id，按设备类型保存为区间列表：[起始 id, 结束 id, 确认时间]
+    # 只记录已知最大设备 id 以下的空 id，更大的 id 可能是还没分配的新设备
+    def __init__(
+        self,
+        Path: str = DEFAULT_GAP_INDEX_PATH,
+        ReverifyInterval: Optional[float] = DEFAULT_REVERIFY_INTERVAL,
+    ) -> None:
+        self.Path: str = Path
+        # None 表示永不重新确认
+        self.ReverifyInterval: Optional[float] = ReverifyInterval
+        # 设备类型 -> {id: 确认时间}
+        self._Gaps: Dict[str, Dict[int, int]] = {"CPU": {}, "GPU": {}}
+        # 设备类型 -> 见过的最大设备 id
+        self._MaxFoundId: Dict[str, int] = {"CPU": 0, "GPU": 0}
+        # 本进程未保存的修改：设备类型 -> {id: 确认时间，None 表示找到了设备}
+        # 保存时合并到文件中的最新内容上，多个分片进程共用一个索引时不会互相覆盖
+        self._Changes: Dict[str, Dict[int, Optional[int]]] = {"CPU": {}, "GPU": {}}
+        if os.path.exists(Path):
+            self._Load()
+
+    def _Load(self) -> None:
+        with open(self.Path, "r", encoding="utf-8") as File:
+            RawData = json.load(File)
+        for Device in self._Gaps:
+            self._Gaps[Device] = {}
+            self._MaxFoundId[Device] = RawData.get("MaxFoundId", {}).get(Device, 0)
+            for Start, End, VerifyTime in RawData.get(Device, []):
+                for Id in range(Start, End + 1):
+                    self._Gaps[Device][Id] = VerifyTime
+
+    @staticmethod
+    def _ToRanges(Gaps: Dict[int, int], MaxFoundId: int) -> List[Tuple[int, int, int]]:
+        # 连续的 id 合并为一个区间，确认时间取最早的
+        Ranges: List[List[int]] = []
+        for Id in sorted(Gaps):
+            if Id > MaxFoundId:
+                break
+            if Ranges and Id == Ranges[-1][1] + 1:
+                Ranges[-1][1] = Id
+                Ranges[-1][2] = min(Ranges[-1][2], Gaps[Id])
+            else:
+                Ranges.append([Id, Id, Gaps[Id]])
+        return [tuple(Range) for Range in Ranges]
+
+    def Save(self) -> None:
+        # 加锁后重新读取文件，把本进程的修改合并上去再写回（先写临时文件再替换，中断时不会留下损坏的索引）
+        with LockFile(self.Path):
+            MaxFoundId = dict(self._MaxFoundId)
+            if os.path.exists(self.Path):
+                self._Load()
+            for Device, Changes in self._Changes.items():
+                self._MaxFoundId[Device] = max(self._MaxFoundId[Device], MaxFoundId[Device])
+                for Id, VerifyTime in Changes.items():
+                    if VerifyTime is None:
+                        self._Gaps[Device].pop(Id, None)
+                    else:
+                        self._Gaps[Device][Id] = VerifyTime
+                Changes.clear()
+
+            RawData = {"Version": _FORMAT_VERSION, "MaxFoundId": self._MaxFoundId}
+            for Device, Gaps in self._Gaps.items():
+                RawData[Device] = self._ToRanges(Gaps, self._MaxFoundId[Device])
+            WriteJsonAtomic(RawData, self.Path)
+
+    def IsKnownGap(self, IsCpu: bool, Id: int, Now: Optional[float] = None) -> bool:
+        Device: str = "CPU" if IsCpu else "GPU"
+        VerifyTime = self._Gaps[Device].get(Id)
+        if VerifyTime is None or Id > self._MaxFoundId[Device]:
+            return False
+        if self.ReverifyInterval is None:
+            return True
+        Now = Now if Now is not None else time.time()
+        return Now - VerifyTime <= self.ReverifyInterval
+
+    def FilterIds(self, IsCpu: bool, IdList: Iterable[int]) -> List[int]:
+        # 去掉已确认为空且未到重新确认时间的 id
+        Now = time.time()
+        return [Id for Id in IdList if not self.IsKnownGap(IsCpu, Id, Now)]
+
+    def Record(self, IsCpu: bool, Id: int, Name: str) -> None:
+        # 记录一次成功的型号查询结果（请求失败不应记录）
+        Device: str = "CPU" if IsCpu else "GPU"
+        if Name == "":
+            self._Gaps[Device][Id] = self._Changes[Device][Id] = int(time.time())
+        else:
+            self._Gaps[Device].pop(Id, None)
+            self._Changes[Device][Id] = None
+            self._MaxFoundId[Device] = max(self._MaxFoundId[Device], Id)
+
+    def GetGapCount(self, IsCpu: bool) -> int:
+        Device: str = "CPU" if IsCpu else "GPU"
+        return sum(1 for Id in self._Gaps[Device] if Id <= self._MaxFoundId[Device])
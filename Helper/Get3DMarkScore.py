@@ -1,8 +1,29 @@
-import requests
+import json, time
 from requests import Response
-from typing import Dict, Tuple, List, Literal, Union
+from typing import Dict, Tuple, List, Literal, Optional, Union
 from enum import Enum
-from tenacity import retry, stop_after_attempt, RetryCallState
+from tenacity import (
+    retry,
+    retry_if_exception_type,
+    retry_if_result,
+    wait_random_exponential,
+    RetryCallState,
+)
+
+from Helper.Session import GetSession
+from Helper.Cache import ResponseCache, CacheMissError
+from Helper.RateControl import GetRateController, ParseRetryAfter, MAX_RETRY_WAIT
+from Helper.Metrics import GetMetrics
+from Helper.Hedge import GetHedger
+
+
+BASE_URL: str = "https://www.3dmark.com"
+
+DATA_TYPE = Dict[int, Dict[str, Union[int, str]]]
+
+ENDPOINT_MEDIANSCORE: str = "medianscore"
+# 记录每个测试项目分数的获取时间（unix 秒），供增量更新判断是否过期
+UPDATE_TIME_PREFIX: str = "Update Time "
 
 
 class CPU_TESTSCENE(Enum):
@@ -61,20 +82,130 @@ TESTSCENE_TYPE = Literal[
 ]
 
 
-def ErrorCallback(CallState: RetryCallState) -> None:
+# (test, scoreType) -> 测试项目成员名，用于给请求的统计打标签
+_SCENE_BY_PARAMETERS: Dict[Tuple[str, str], str] = {
+    (TestScene.value[0], TestScene.value[1]): TestScene.name
+    for TestScene in [*CPU_TESTSCENE, *GPU_TESTSCENE]
+}
+
+
+# 这些状态码说明请求可以重试（限流或服务器暂时故障）
+RETRY_STATUS: Tuple[int, ...] = (429, 500, 502, 503, 504)
+# 每个请求立即重试的总次数；启用延迟重试时可以调小，失败的请求不再长时间占用线程
+DEFAULT_MAX_ATTEMPTS: int = 5
+_MaxAttempts: int = DEFAULT_MAX_ATTEMPTS
+
+
+class FetchError(Exception):
+    # 重试次数用完后仍然没有成功的响应（状态码不是 2xx），与"没有分数"（0 分）区分
+    pass
+
+
+def SetMaxAttempts(MaxAttempts: int) -> None:
+    global _MaxAttempts
+    _MaxAttempts = max(1, MaxAttempts)
+
+
+def StopRetrying(CallState: RetryCallState) -> bool:
+    # tenacity 的 stop 回调，按当前设置的次数停止
+    return CallState.attempt_number >= _MaxAttempts
+
+
+def ErrorCallback(CallState: RetryCallState) -> Optional[Response]:
     print(
         f"Original function arguments: args={CallState.args}, kwargs={CallState.kwargs}"
     )
     Outcome = CallState.outcome
     if Outcome and Outcome.failed:
         raise Outcome.exception()
+    # 重试次数用完时返回最后一次的响应，由调用方判断状态码
+    return Outcome.result() if Outcome else None
+
+
+def IsRetryableResponse(Response) -> bool:
+    return Response is not None and Response.status_code in RETRY_STATUS
+
+
+def GetRequestLabels(Url: str) -> Tuple[str, str]:
+    # 由 url 得到 (endpoint, 测试项目成员名)，查询型号的请求测试项目为空
+    Path, _, Query = Url.partition("?")
+    Endpoint = Path.split("/proxycon/ajax/", 1)[-1]
+    Params = dict(Param.partition("=")[::2] for Param in Query.split("&"))
+    Scene = _SCENE_BY_PARAMETERS.get((Params.get("test", ""), Params.get("scoreType", "")), "")
+    return Endpoint, Scene
+
+
+def RecordRetry(CallState: RetryCallState) -> None:
+    # tenacity 的 before_sleep 回调，url 是被重试函数的最后一个位置参数
+    Metrics = GetMetrics()
+    if Metrics is not None and CallState.args:
+        Metrics.ObserveRetry(GetRequestLabels(CallState.args[-1])[0])
+
+
+_WaitBackoff = wait_random_exponential(multiplier=0.5, max=MAX_RETRY_WAIT)
+
+
+def WaitBeforeRetry(CallState: RetryCallState) -> float:
+    # 有 Retry-After 时按服务器要求等待，否则指数退避 + 随机抖动
+    Outcome = CallState.outcome
+    if Outcome and not Outcome.failed:
+        RetryAfter = ParseRetryAfter(Outcome.result().headers.get("Retry-After"))
+        if RetryAfter is not None:
+            return RetryAfter
+    return _WaitBackoff(CallState)
 
 
 @retry(
-    stop=stop_after_attempt(max_attempt_number=5), retry_error_callback=ErrorCallback
+    stop=StopRetrying,
+    wait=WaitBeforeRetry,
+    retry=retry_if_exception_type() | retry_if_result(IsRetryableResponse),
+    retry_error_callback=ErrorCallback,
+    before_sleep=RecordRetry,
 )
 def Get(Url: str) -> Response:
-    return requests.get(Url, headers={"Accept": "application/json"}, timeout=10)
+    Controller = GetRateController()
+    if Controller is None:
+        return _HedgedGet(Url)
+
+    # 所有线程共享的限速器，并根据状态码/延迟调整速率
+    with Controller.Acquire() as Slot:
+        Response = _HedgedGet(Url)
+        Slot.SetResult(
+            Response.status_code, ParseRetryAfter(Response.headers.get("Retry-After"))
+        )
+    return Response
+
+
+def _HedgedGet(Url: str) -> Response:
+    # 启用对冲时只对冲查询分数的请求（长尾主要出现在这里），对冲请求不经过限速器，由预算限制数量
+    Hedger = GetHedger()
+    if Hedger is None or GetRequestLabels(Url)[0] != ENDPOINT_MEDIANSCORE:
+        return _SessionGet(Url)
+    return Hedger.Call(_SessionGet, Url, IsFailure=_IsFailedResponse)
+
+
+def _IsFailedResponse(Response: Response) -> bool:
+    return not Response.ok
+
+
+def _SessionGet(Url: str) -> Response:
+    Metrics = GetMetrics()
+    if Metrics is None:
+        return GetSession().get(Url, timeout=10)
+
+    # 只统计 HTTP 请求本身的耗时，不含限速排队
+    Metrics.BeginRequest()
+    StartTime = time.perf_counter()
+    StatusCode: Optional[int] = None
+    Bytes: int = 0
+    try:
+        Response = GetSession().get(Url, timeout=10)
+        # raw.tell() 为实际传输的字节数（gzip/br 解压前），len(content) 是解压后的大小
+        StatusCode, Bytes = Response.status_code, Response.raw.tell()
+        return Response
+    finally:
+        Endpoint, Scene = GetRequestLabels(Url)
+        Metrics.EndRequest(Endpoint, Scene, time.perf_counter() - StartTime, StatusCode, Bytes)
 
 
 def Get3DMarkUrlParameters(
@@ -111,35 +242,129 @@ def Get3DMarkUrlParameters(
     return "&".join(UrlParametersList)
 
 
+def GetNameEndpoint(IsCpu: bool) -> str:
+    Device: str = "cpu" if IsCpu else "gpu"
+    return f"search/{Device}id"
+
+
+def SetBaseUrl(BaseUrl: str) -> None:
+    # 指向其他服务器，如 Benchmark.MockServer 启动的本地模拟接口
+    global BASE_URL
+    BASE_URL = BaseUrl.rstrip("/")
+
+
+def GetUrl(Endpoint: str, UrlParameters: str) -> str:
+    return f"{BASE_URL}/proxycon/ajax/{Endpoint}?{UrlParameters}"
+
+
+def GetMedianScoreUrl(TestScene: TESTSCENE_TYPE, Id: int) -> str:
+    return GetUrl(ENDPOINT_MEDIANSCORE, Get3DMarkUrlParameters(TestScene, Id))
+
+
+def GetNameUrl(Id: int, IsCpu: bool) -> str:
+    return GetUrl(GetNameEndpoint(IsCpu), f"id={Id}")
+
+
+_Cache: Optional[ResponseCache] = None
+
+
+def SetCache(Cache: Optional[ResponseCache]) -> None:
+    global _Cache
+    _Cache = Cache
+
+
+def GetCache() -> Optional[ResponseCache]:
+    return _Cache
+
+
+def FetchText(Endpoint: str, UrlParameters: str) -> str:
+    # 先查本地缓存，未命中再请求，只缓存成功的响应
+    if _Cache is not None:
+        Text = _Cache.Get(Endpoint, UrlParameters)
+        if Text is not None:
+            if GetMetrics() is not None:
+                GetMetrics().ObserveCacheHit()
+            return Text
+        if _Cache.bOffline:
+            raise CacheMissError(f"{Endpoint}?{UrlParameters}")
+
+    Url = GetUrl(Endpoint, UrlParameters)
+    Metrics = GetMetrics()
+    StartTime = time.perf_counter()
+    try:
+        Response = Get(Url)
+        if not Response.ok:
+            raise FetchError(f"HTTP {Response.status_code}: {Url}")
+    except Exception as e:
+        if Metrics is not None:
+            Metrics.ObserveError(Endpoint, e)
+        raise
+    finally:
+        if Metrics is not None:
+            Metrics.ObserveCall(Endpoint, GetRequestLabels(Url)[1], time.perf_counter() - StartTime)
+
+    if _Cache is not None:
+        _Cache.Set(Endpoint, UrlParameters, Response.text)
+    return Response.text
+
+
+def ParseMedianScore(Text: str) -> int:
+    # median 为空表示该设备没有这个测试项目的成绩，记为 0；响应无法解析时抛出异常，由调用方按失败处理
+    Median = json.loads(Text).get("median")
+    return int(Median) if Median is not None else 0
+
+
+def ParseName(Text: str, IsCpu: bool) -> str:
+    Device: str = "cpu" if IsCpu else "gpu"
+    return json.loads(Text)[f"{Device}Name"]
+
+
+def NewDeviceItem(
+    IsCpu: bool, Id: int, Name: str, TestSceneList: List[TESTSCENE_TYPE]
+) -> Dict[str, Union[int, str]]:
+    DEVICE: str = "CPU" if IsCpu else "GPU"
+    Item: Dict[str, Union[int, str]] = {
+        f"{DEVICE} ID": Id,
+        f"{DEVICE} Name": Name,
+    }
+    for TestScene in TestSceneList:
+        Item[TestScene.value[2]] = -1
+    return Item
+
+
+def GetUpdateTimeKey(TestScene: TESTSCENE_TYPE) -> str:
+    return f"{UPDATE_TIME_PREFIX}{TestScene.name}"
+
+
+def SetScore(
+    Item: Dict[str, Union[int, str]],
+    TestScene: TESTSCENE_TYPE,
+    Score: int,
+    UpdateTime: Optional[float] = None,
+) -> None:
+    Item[TestScene.value[2]] = Score
+    Item[GetUpdateTimeKey(TestScene)] = int(
+        UpdateTime if UpdateTime is not None else time.time()
+    )
+
+
 def GetMedianScoreFromId(
     TestScene: TESTSCENE_TYPE,
     Id: int,
 ) -> Tuple[int, int]:
-    UrlParameters: str = Get3DMarkUrlParameters(TestScene, Id)
-    Url: str = f"https://www.3dmark.com/proxycon/ajax/medianscore?{UrlParameters}"
-    Response = Get(Url)
-    try:
-        return Id, int(Response.json()["median"])
-    except:
-        return Id, 0
+    Text = FetchText(ENDPOINT_MEDIANSCORE, Get3DMarkUrlParameters(TestScene, Id))
+    return Id, ParseMedianScore(Text)
 
 
 def GetNameFromId(Id: int, IsCpu: bool) -> Tuple[int, str]:
-    Device: str = "cpu" if IsCpu else "gpu"
-    Url: str = f"https://www.3dmark.com/proxycon/ajax/search/{Device}id?id={Id}"
-    Response = Get(Url)
-    return Id, Response.json()[f"{Device}Name"]
+    Text = FetchText(GetNameEndpoint(IsCpu), f"id={Id}")
+    return Id, ParseName(Text, IsCpu)
 
 
 def Test():
     # 4090 TimeSpy
-    UrlParameters: str = Get3DMarkUrlParameters(GPU_TESTSCENE.TimeSpy, 1509)
-    Url: str = f"https://www.3dmark.com/proxycon/ajax/medianscore?{UrlParameters}"
-    Response = Get(Url)
-    try:
-        return int(Response.json()["median"])
-    except:
-        return 0
+    Response = Get(GetMedianScoreUrl(GPU_TESTSCENE.TimeSpy, 1509))
+    return ParseMedianScore(Response.text)
 
 
 if __name__ == "__main__":
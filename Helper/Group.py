@@ -0,0 +1,100 @@
+from typing import Dict, List, Mapping, Optional
+
+from Helper.ProcessDeviceName import CPUName, GPUName
+
+
+COL_VARIANTS: str = "Variants"
+COL_VARIANT_IDS: str = "Variant IDs"
+# 解析不出型号的名字不参与合并，否则不同的设备会被当成同一个
+_UNKNOWN_MODEL: str = "Unknown"
+
+
+def GroupNames(Names: List[str], IsCpu: bool) -> List[int]:
+    # 每个型号名所属的分组序号，(Vendor, Model, Features) 相同的名字分到同一组
+    # 以解析结果为 key 的哈希索引，分组序号按首次出现的顺序
+    Parsed = (CPUName if IsCpu else GPUName).ParseMany(Names)
+    Index: Dict[object, int] = {}
+    Groups: List[int] = []
+    for Name, Obj in zip(Names, Parsed):
+        Key = Name if Obj.Model == _UNKNOWN_MODEL else Obj
+        Groups.append(Index.setdefault(Key, len(Index)))
+    return Groups
+
+
+def _GroupMedian(Keys, Values, Weights=None):
+    # 按 Keys 分组求中位数，返回 (分组 key, 中位数)
+    # Weights 为空时为普通中位数；否则取组内按分数排序后累计权重首次达到一半的值（加权中位数）
+    import numpy as np
+    import pandas as pd
+
+    if Weights is None:
+        Median = pd.Series(Values).groupby(Keys, sort=False).median().round()
+        return Median.index.to_numpy(), Median.to_numpy()
+    Order = np.lexsort((Values, Keys))
+    Keys, Values = Keys[Order], Values[Order]
+    Grouped = pd.Series(Weights[Order]).groupby(Keys, sort=False)
+    bReached = (Grouped.cumsum() >= Grouped.transform("sum") / 2).to_numpy()
+    # 已按 key 排序，每组第一个达到一半的位置
+    UniqueKeys, First = np.unique(Keys[bReached], return_index=True)
+    return UniqueKeys, Values[bReached][First]
+
+
+def BuildDedupDataFrame(Df, IsCpu: bool, Weights: Optional[Mapping[int, float]] = None):
+    # 输入为 BuildDataFrame 的结果，同一型号的多个 id 合并为一行：
+    # 每个测试项目取各 id 分数的中位数（忽略缺失的 -1/0），型号名取主分数最高的 id
+    # Weights: id -> 权重，为空时各 id 权重相同
+    import numpy as np
+    import pandas as pd
+
+    COL_NAME = "CPU Name" if IsCpu else "GPU Name"
+    COL_ID = "CPU ID" if IsCpu else "GPU ID"
+    COL_SCORES = [Column for Column in Df.columns if "3DMark" in Column]
+    if len(Df) == 0:
+        return Df.assign(
+            **{COL_VARIANTS: pd.Series(dtype="int32"), COL_VARIANT_IDS: pd.Series(dtype=str)}
+        )
+
+    # 每个不同的型号名只分组一次，再映射回每一行；分组序号按首次出现的顺序，即 Df 原有的顺序（主分数降序）
+    NameCodes, UniqueNames = pd.factorize(Df[COL_NAME].astype(str))
+    GroupCodes = np.asarray(GroupNames(list(UniqueNames), IsCpu), dtype=np.int64)[NameCodes]
+    GroupCount = int(GroupCodes.max()) + 1
+
+    Result = Df.groupby(GroupCodes, sort=False).head(1).reset_index(drop=True)
+    # 按 id 升序一次遍历，收集每组的 id
+    Ids = Df[COL_ID].to_numpy()
+    IdOrder = np.argsort(Ids, kind="stable")
+    VariantIds: List[List[str]] = [[] for _ in range(GroupCount)]
+    for Code, Id in zip(GroupCodes[IdOrder].tolist(), Ids[IdOrder].tolist()):
+        VariantIds[Code].append(str(Id))
+    Position = Result.columns.get_loc(COL_ID) + 1
+    Result.insert(
+        Position, COL_VARIANTS, np.bincount(GroupCodes, minlength=GroupCount).astype("int32")
+    )
+    Result.insert(Position + 1, COL_VARIANT_IDS, [",".join(Group) for Group in VariantIds])
+    Result[COL_ID] = Result[COL_ID].astype("int32")
+
+    # 没有有效分数的组保留最大值（-1/0/-2 中较大的）；其余组取有效分数的中位数
+    Scores = Df[COL_SCORES].to_numpy(dtype=np.int64)
+    Aggregated = (
+        pd.DataFrame(Scores)
+        .groupby(GroupCodes, sort=True)
+        .max()
+        .to_numpy(dtype=np.int64, copy=True)
+    )
+    # 所有测试项目一起分组，key 为 分组序号 * 测试项目数 + 测试项目序号
+    Rows, SceneIndexes = np.nonzero(Scores > 0)
+    if len(Rows):
+        Keys, Medians = _GroupMedian(
+            GroupCodes[Rows] * len(COL_SCORES) + SceneIndexes,
+            Scores[Rows, SceneIndexes],
+            Df[COL_ID].map(Weights).fillna(1.0).to_numpy(dtype=float)[Rows]
+            if Weights is not None
+            else None,
+        )
+        Aggregated.reshape(-1)[Keys] = Medians
+    for SceneIndex, Column in enumerate(COL_SCORES):
+        Result[Column] = Aggregated[:, SceneIndex].astype(Df[Column].dtype)
+
+    Result.sort_values(COL_SCORES[0], ascending=False, inplace=True, kind="stable")
+    Result.reset_index(drop=True, inplace=True)
+    return Result
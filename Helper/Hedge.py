@@ -0,0 +1,167 @@
+import threading, time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, Future, wait, FIRST_COMPLETED
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+
+
+# 请求超过最近延迟的这个分位数仍未返回时，再发一个相同的请求
+DEFAULT_HEDGE_QUANTILE: float = 0.95
+# 对冲请求数不超过普通请求数的这个比例
+DEFAULT_HEDGE_BUDGET: float = 0.05
+# 按最近多少个请求的延迟计算分位数，样本不足时不对冲
+_LATENCY_WINDOW: int = 1000
+_MIN_SAMPLES: int = 50
+# 每观察到这么多个新的延迟重新计算一次分位数
+_UPDATE_EVERY: int = 20
+
+
+def _Quantile(Values: List[float], Q: float) -> float:
+    Sorted = sorted(Values)
+    return Sorted[min(len(Sorted) - 1, int(len(Sorted) * Q))]
+
+
+class Hedger:
+    # 对冲请求：请求在 p95（动态统计）内没有返回时再发一个相同的请求，取先成功的结果
+    # 慢请求多为服务器端的偶发长尾，重发的请求通常会很快返回；预算限制额外请求的比例
+    # 首个请求在后台继续执行，返回后记录其耗时，用来估计不对冲时的 p99
+    def __init__(
+        self,
+        Quantile: float = DEFAULT_HEDGE_QUANTILE,
+        Budget: float = DEFAULT_HEDGE_BUDGET,
+        MaxWorkers: int = 32,
+    ) -> None:
+        self.Quantile: float = Quantile
+        self.Budget: float = Budget
+        self._Lock = threading.Lock()
+        self._Pool = ThreadPoolExecutor(max_workers=MaxWorkers * 2, thread_name_prefix="Hedge")
+        self._Recent: Deque[float] = deque(maxlen=_LATENCY_WINDOW)
+        self._SinceUpdate: int = 0
+        self._Delay: Optional[float] = None
+        self.Calls: int = 0
+        self.Hedges: int = 0
+        self.HedgeWins: int = 0
+        # 每次调用的 (实际耗时, 不对冲时的耗时即首个请求的耗时)
+        self._Outcomes: List[Tuple[float, float]] = []
+
+    def GetDelay(self) -> Optional[float]:
+        return self._Delay
+
+    def _Observe(self, Latency: float) -> None:
+        with self._Lock:
+            self._Recent.append(Latency)
+            self._SinceUpdate += 1
+            if len(self._Recent) >= _MIN_SAMPLES and self._SinceUpdate >= _UPDATE_EVERY:
+                self._SinceUpdate = 0
+                self._Delay = _Quantile(list(self._Recent), self.Quantile)
+
+    def _Timed(self, Function: Callable, Args: tuple):
+        StartTime = time.perf_counter()
+        try:
+            return Function(*Args)
+        finally:
+            self._Observe(time.perf_counter() - StartTime)
+
+    def _TryAcquireBudget(self) -> bool:
+        with self._Lock:
+            # +1 允许最开始的请求也能对冲
+            if self.Hedges >= self.Budget * self.Calls + 1:
+                return False
+            self.Hedges += 1
+            return True
+
+    def _RecordOutcome(self, Actual: float, WithoutHedge: float) -> None:
+        with self._Lock:
+            self._Outcomes.append((Actual, WithoutHedge))
+
+    def Call(self, Function: Callable, *Args, IsFailure: Optional[Callable] = None):
+        # 调用 Function(*Args)，需要时对冲；IsFailure(结果) 为真的结果（如 5xx 响应）不会被优先采用
+        StartTime = time.perf_counter()
+        with self._Lock:
+            self.Calls += 1
+        Delay = self._Delay
+        if Delay is None:
+            try:
+                return self._Timed(Function, Args)
+            finally:
+                Elapsed = time.perf_counter() - StartTime
+                self._RecordOutcome(Elapsed, Elapsed)
+
+        Primary: Future = self._Pool.submit(self._Timed, Function, Args)
+        Done, _ = wait([Primary], timeout=Delay)
+        if Done or not self._TryAcquireBudget():
+            try:
+                return Primary.result()
+            finally:
+                Elapsed = time.perf_counter() - StartTime
+                self._RecordOutcome(Elapsed, Elapsed)
+
+        Hedge: Future = self._Pool.submit(self._Timed, Function, Args)
+        Futures = [Primary, Hedge]
+        Winner: Optional[Future] = None
+        while Futures:
+            Done, _ = wait(Futures, return_when=FIRST_COMPLETED)
+            # 两个同时完成时优先取首个请求
+            for Thread in sorted(Done, key=lambda Thread: Thread is not Primary):
+                Futures.remove(Thread)
+                if Winner is None and not Thread.exception() and not (
+                    IsFailure and IsFailure(Thread.result())
+                ):
+                    Winner = Thread
+            if Winner is not None:
+                break
+        Actual = time.perf_counter() - StartTime
+
+        if Winner is Hedge:
+            with self._Lock:
+                self.HedgeWins += 1
+        # 首个请求完成后才知道不对冲时的耗时
+        Primary.add_done_callback(
+            lambda _: self._RecordOutcome(Actual, time.perf_counter() - StartTime)
+        )
+        # 都失败时按首个请求的结果处理（抛出异常或返回失败的响应，由外层重试）
+        return (Winner or Primary).result()
+
+    def Summary(self) -> Dict[str, float]:
+        with self._Lock:
+            Outcomes = list(self._Outcomes)
+            Summary: Dict[str, float] = {
+                "calls": self.Calls,
+                "hedges": self.Hedges,
+                "hedge_wins": self.HedgeWins,
+                "delay": self._Delay or 0.0,
+            }
+        if Outcomes:
+            Summary["p99"] = _Quantile([Actual for Actual, _ in Outcomes], 0.99)
+            Summary["p99_without_hedging"] = _Quantile([Without for _, Without in Outcomes], 0.99)
+            Summary["saved_seconds"] = sum(Without - Actual for Actual, Without in Outcomes)
+        return Summary
+
+    def FormatSummary(self, Workers: int) -> str:
+        # 节省的请求耗时按线程数折算为墙钟时间，只是估计值
+        Summary = self.Summary()
+        Text = (
+            f"Hedging: {Summary['hedges']} hedged of {Summary['calls']} calls, "
+            f"{Summary['hedge_wins']} won, delay {Summary['delay'] * 1000:.0f}ms"
+        )
+        if "p99" in Summary:
+            Text += (
+                f"; p99 {Summary['p99_without_hedging'] * 1000:.0f}ms -> {Summary['p99'] * 1000:.0f}ms"
+                f", {Summary['saved_seconds']:.1f} request-seconds saved"
+                f" (~{Summary['saved_seconds'] / max(1, Workers):.1f}s wall time)"
+            )
+        return Text
+
+    def Close(self) -> None:
+        self._Pool.shutdown(wait=False, cancel_futures=True)
+
+
+_Hedger: Optional[Hedger] = None
+
+
+def SetHedger(Instance: Optional[Hedger]) -> None:
+    global _Hedger
+    _Hedger = Instance
+
+
+def GetHedger() -> Optional[Hedger]:
+    return _Hedger
@@ -0,0 +1,196 @@
+import sqlite3, threading, time
+from typing import Iterable, List, Optional, Tuple
+
+from Helper.Get3DMarkScore import CPU_TESTSCENE, GPU_TESTSCENE, TESTSCENE_TYPE, DATA_TYPE
+from Helper.Incremental import MISSING_SCORES
+from Helper.ProcessDeviceName import CPUName, GPUName
+
+
+DEFAULT_HISTORY_PATH: str = "3DMarkHistory.sqlite"
+_INSERT_BATCH_SIZE: int = 5000
+
+
+class HistoryStore:
+    # 每次爬取的结果保存为一个快照，可以查询某个设备/测试项目随时间的变化
+    # snapshots: 快照（设备类型、时间、来源）
+    # devices: 设备 id -> 最新的型号名和解析出的 Vendor/Model
+    # scores: 每个快照中每个 (设备, 测试项目) 的分数，冗余保存快照时间以便按时间查询
+    def __init__(self, Path: str = DEFAULT_HISTORY_PATH) -> None:
+        self.Path: str = Path
+        self._Lock = threading.Lock()
+        self._Connection = sqlite3.connect(Path, check_same_thread=False)
+        self._Connection.execute("PRAGMA journal_mode=WAL")
+        self._Connection.execute("PRAGMA synchronous=NORMAL")
+        self._Connection.executescript(
+            "CREATE TABLE IF NOT EXISTS snapshots ("
+            "snapshot INTEGER PRIMARY KEY AUTOINCREMENT, "
+            "device TEXT NOT NULL, "
+            "taken_at INTEGER NOT NULL, "
+            "source TEXT NOT NULL DEFAULT '');"
+            "CREATE TABLE IF NOT EXISTS devices ("
+            "device TEXT NOT NULL, "
+            "id INTEGER NOT NULL, "
+            "name TEXT NOT NULL, "
+            "vendor TEXT NOT NULL, "
+            "model TEXT NOT NULL, "
+            "PRIMARY KEY (device, id));"
+            "CREATE TABLE IF NOT EXISTS scores ("
+            "snapshot INTEGER NOT NULL REFERENCES snapshots (snapshot), "
+            "device TEXT NOT NULL, "
+            "id INTEGER NOT NULL, "
+            "scene TEXT NOT NULL, "
+            "score INTEGER NOT NULL, "
+            "taken_at INTEGER NOT NULL);"
+            "CREATE INDEX IF NOT EXISTS scores_device ON scores (device, id, scene, taken_at);"
+            "CREATE INDEX IF NOT EXISTS scores_scene ON scores (device, scene, taken_at);"
+            "CREATE INDEX IF NOT EXISTS scores_snapshot ON scores (snapshot);"
+            "CREATE INDEX IF NOT EXISTS snapshots_time ON snapshots (device, taken_at);"
+            "CREATE INDEX IF NOT EXISTS devices_model ON devices (device, vendor, model);"
+        )
+        self._Connection.commit()
+
+    def AddSnapshot(
+        self,
+        Data: DATA_TYPE,
+        IsCpu: bool,
+        TakenAt: Optional[float] = None,
+        Source: str = "",
+    ) -> int:
+        # 在一个事务中写入整个快照，返回快照编号；缺失的分数（-1/0）不写入
+        DEVICE: str = "CPU" if IsCpu else "GPU"
+        TakenAt = int(TakenAt if TakenAt is not None else time.time())
+        TestSceneList: List[TESTSCENE_TYPE] = list(CPU_TESTSCENE if IsCpu else GPU_TESTSCENE)
+        Items = [Item for Item in Data.values() if Item.get(f"{DEVICE} Name")]
+        Parsed = (CPUName if IsCpu else GPUName).ParseMany(
+            Item[f"{DEVICE} Name"] for Item in Items
+        )
+
+        with self._Lock, self._Connection:
+            Cursor = self._Connection.execute(
+                "INSERT INTO snapshots (device, taken_at, source) VALUES (?, ?, ?)",
+                (DEVICE, TakenAt, Source),
+            )
+            Snapshot: int = Cursor.lastrowid
+            self._Connection.executemany(
+                "INSERT OR REPLACE INTO devices VALUES (?, ?, ?, ?, ?)",
+                (
+                    (DEVICE, Item[f"{DEVICE} ID"], Item[f"{DEVICE} Name"], Name.Vendor, Name.Model)
+                    for Item, Name in zip(Items, Parsed)
+                ),
+            )
+            Rows: List[Tuple] = []
+            for Item in Items:
+                for TestScene in TestSceneList:
+                    Score = Item.get(TestScene.value[2])
+                    if Score is None or Score in MISSING_SCORES:
+                        continue
+                    Rows.append(
+                        (Snapshot, DEVICE, Item[f"{DEVICE} ID"], TestScene.name, Score, TakenAt)
+                    )
+                    if len(Rows) >= _INSERT_BATCH_SIZE:
+                        self._InsertScores(Rows)
+                        Rows = []
+            self._InsertScores(Rows)
+        return Snapshot
+
+    def _InsertScores(self, Rows: List[Tuple]) -> None:
+        self._Connection.executemany("INSERT INTO scores VALUES (?, ?, ?, ?, ?, ?)", Rows)
+
+    def _Query(self, Sql: str, Parameters: Iterable):
+        import pandas as pd
+
+        with self._Lock:
+            return pd.read_sql_query(Sql, self._Connection, params=list(Parameters))
+
+    def ListSnapshots(self, IsCpu: Optional[bool] = None):
+        Sql = (
+            "SELECT snapshots.snapshot AS Snapshot, snapshots.device AS Device, "
+            "datetime(taken_at, 'unixepoch') AS \"Taken At\", source AS Source, "
+            "(SELECT COUNT(*) FROM scores WHERE scores.snapshot = snapshots.snapshot) AS Scores "
+            "FROM snapshots"
+        )
+        Parameters: List = []
+        if IsCpu is not None:
+            Sql += " WHERE device = ?"
+            Parameters.append("CPU" if IsCpu else "GPU")
+        return self._Query(Sql + " ORDER BY taken_at", Parameters)
+
+    def GetTimeSeries(
+        self,
+        IsCpu: bool,
+        Ids: Optional[List[int]] = None,
+        NamePattern: Optional[str] = None,
+        TestSceneList: Optional[List[TESTSCENE_TYPE]] = None,
+        Since: Optional[float] = None,
+        Until: Optional[float] = None,
+    ):
+        # 长表：每行为 (快照时间, 设备, 测试项目, 分数)
+        # NamePattern 为 SQL LIKE 模式（不区分大小写），如 "%4090%"
+        DEVICE: str = "CPU" if IsCpu else "GPU"
+        Conditions: List[str] = ["scores.device = ?"]
+        Parameters: List = [DEVICE]
+        if Ids:
+            Conditions.append(f"scores.id IN ({', '.join('?' * len(Ids))})")
+            Parameters += Ids
+        if NamePattern:
+            Conditions.append("devices.name LIKE ?")
+            Parameters.append(NamePattern)
+        if TestSceneList:
+            Conditions.append(f"scores.scene IN ({', '.join('?' * len(TestSceneList))})")
+            Parameters += [TestScene.name for TestScene in TestSceneList]
+        if Since is not None:
+            Conditions.append("scores.taken_at >= ?")
+            Parameters.append(int(Since))
+        if Until is not None:
+            Conditions.append("scores.taken_at <= ?")
+            Parameters.append(int(Until))
+
+        Df = self._Query(
+            "SELECT scores.taken_at AS \"Taken At\", scores.id AS \"" + DEVICE + " ID\", "
+            "devices.name AS \"" + DEVICE + " Name\", devices.vendor AS Vendor, "
+            "devices.model AS Model, scores.scene AS Scene, scores.score AS Score "
+            "FROM scores JOIN devices ON devices.device = scores.device AND devices.id = scores.id "
+            f"WHERE {' AND '.join(Conditions)} "
+            "ORDER BY scores.id, scores.scene, scores.taken_at",
+            Parameters,
+        )
+        import pandas as pd
+
+        Df["Taken At"] = pd.to_datetime(Df["Taken At"], unit="s")
+        return Df
+
+    def GetLatestSnapshot(
+        self, IsCpu: bool, TestSceneList: Optional[List[TESTSCENE_TYPE]] = None
+    ):
+        # 宽表：最新一个快照中每个设备一行，每个测试项目一列（列名与导出的表格相同）
+        DEVICE: str = "CPU" if IsCpu else "GPU"
+        TestSceneList = TestSceneList or list(CPU_TESTSCENE if IsCpu else GPU_TESTSCENE)
+        Df = self._Query(
+            "SELECT scores.id AS \"" + DEVICE + " ID\", devices.name AS \"" + DEVICE + " Name\", "
+            "devices.vendor AS Vendor, devices.model AS Model, scores.scene AS Scene, "
+            "scores.score AS Score "
+            "FROM scores JOIN devices ON devices.device = scores.device AND devices.id = scores.id "
+            "WHERE scores.snapshot = ("
+            "SELECT snapshot FROM snapshots WHERE device = ? ORDER BY taken_at DESC, snapshot DESC LIMIT 1)",
+            [DEVICE],
+        )
+        Index = [f"{DEVICE} ID", f"{DEVICE} Name", "Vendor", "Model"]
+        Wide = Df.pivot_table(index=Index, columns="Scene", values="Score", aggfunc="first")
+        SceneColumns = {
+            TestScene.name: TestScene.value[2]
+            for TestScene in TestSceneList
+            if TestScene.name in Wide.columns
+        }
+        Wide = Wide[list(SceneColumns)].rename(columns=SceneColumns)
+        Wide.columns.name = None
+        return Wide.fillna(-1).astype("int32").reset_index()
+
+    def Close(self) -> None:
+        with self._Lock:
+            self._Connection.close()
+
+    def __enter__(self) -> "HistoryStore":
+        return self
+
+    def __exit__(self, *Args) -> None:
+        self.Close()
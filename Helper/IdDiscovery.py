@@ -0,0 +1,97 @@
+import os
+from typing import Iterable, List, Tuple
+from concurrent.futures import ThreadPoolExecutor
+
+from Helper.Get3DMarkScore import GetNameFromId
+
+
+DEFAULT_MISS_RUN: int = 200
+DEFAULT_PROBE_WIDTH: int = 16
+DEFAULT_DENSE_GAP: int = 50
+
+
+def _ProbeIds(
+    ThreadPool: ThreadPoolExecutor, IdList: Iterable[int], IsCpu: bool
+) -> List[int]:
+    # 返回有设备名的 id（请求失败视为空）
+    def Probe(Id: int) -> Tuple[int, str]:
+        try:
+            return GetNameFromId(Id, IsCpu)
+        except Exception:
+            return Id, ""
+
+    return sorted(
+        Id for Id, Name in ThreadPool.map(Probe, IdList) if Name != ""
+    )
+
+
+def DiscoverMaxId(
+    IsCpu: bool,
+    MinId: int = 1,
+    MissRun: int = DEFAULT_MISS_RUN,
+    ProbeWidth: int = DEFAULT_PROBE_WIDTH,
+    MaxWorkers: int = os.cpu_count(),
+) -> int:
+    # 探测 id 空间的真实上界：
+    # 1) 指数探测：以 ProbeWidth 宽的窗口检查 Hi，每次翻倍，直到窗口内全空
+    # 2) 二分：在最后一个有数据的窗口和第一个全空的窗口之间收缩
+    # 3) 线性确认：从找到的位置向后扫描，连续 MissRun 个空 id 后停止
+    DEVICE: str = "CPU" if IsCpu else "GPU"
+    ProbeWidth = max(1, ProbeWidth)
+
+    with ThreadPoolExecutor(max_workers=MaxWorkers) as ThreadPool:
+
+        def IsAlive(Id: int) -> bool:
+            return len(_ProbeIds(ThreadPool, range(Id, Id + ProbeWidth), IsCpu)) > 0
+
+        Lo: int = MinId
+        Hi: int = max(MinId * 2, 64)
+        while IsAlive(Hi):
+            Lo = Hi
+            Hi *= 2
+        print(f"Discover {DEVICE} ID: exponential probe stopped at {Hi}")
+
+        while Hi - Lo > ProbeWidth:
+            Mid = (Lo + Hi) // 2
+            if IsAlive(Mid):
+                Lo = Mid
+            else:
+                Hi = Mid
+
+        LastHit: int = MinId - 1
+        Current: int = Lo
+        Misses: int = 0
+        while Misses < MissRun:
+            Chunk = range(Current, Current + MaxWorkers * 4)
+            Hits = _ProbeIds(ThreadPool, Chunk, IsCpu)
+            for Id in Chunk:
+                if Hits and Id == Hits[0]:
+                    Hits.pop(0)
+                    LastHit = Id
+                    Misses = 0
+                else:
+                    Misses += 1
+                    if Misses >= MissRun:
+                        break
+            Current = Chunk.stop
+
+    MaxId: int = max(LastHit, MinId)
+    print(f"Discover {DEVICE} ID: max id {MaxId} (after {MissRun} consecutive misses)")
+    return MaxId
+
+
+def GetDenseRanges(
+    IdList: Iterable[int], MaxGap: int = DEFAULT_DENSE_GAP
+) -> List[Tuple[int, int]]:
+    # 把有数据的 id 合并成区间，相邻 id 间隔不超过 MaxGap 视为同一区间
+    Ranges: List[Tuple[int, int]] = []
+    for Id in sorted(IdList):
+        if Ranges and Id - Ranges[-1][1] <= MaxGap:
+            Ranges[-1] = (Ranges[-1][0], Id)
+        else:
+            Ranges.append((Id, Id))
+    return Ranges
+
+
+def FormatRanges(Ranges: Iterable[Tuple[int, int]]) -> str:
+    return ", ".join(f"{Start}-{End}" for Start, End in Ranges)
@@ -0,0 +1,50 @@
+import time
+from typing import Dict, List, Optional, Tuple
+
+from Helper.Get3DMarkScore import (
+    GetUpdateTimeKey,
+    TESTSCENE_TYPE,
+    DATA_TYPE,
+)
+from Helper.Availability import SKIPPED_SCORE
+
+
+# 默认分数超过 7 天视为过期
+DEFAULT_MAX_AGE: float = 7 * 24 * 3600
+# -1 表示没取到，0 表示没有数据，-2 表示之前多次没有数据而跳过了请求，都需要重新请求
+MISSING_SCORES: Tuple[int, ...] = (-1, 0, SKIPPED_SCORE)
+
+
+def GetNewIds(
+    OldData: DATA_TYPE, MinId: int, MaxId: int, bReprobeGaps: bool = True
+) -> List[int]:
+    # 需要重新查询型号的 id：已知最大 id 之后的 id，以及（可选）已知范围内的空缺 id
+    KnownIds = set(OldData.keys())
+    MaxKnownId = max(KnownIds, default=MinId - 1)
+    return [
+        Id
+        for Id in range(MinId, MaxId + 1)
+        if Id not in KnownIds and (bReprobeGaps or Id > MaxKnownId)
+    ]
+
+
+def GetStaleIds(
+    OldData: DATA_TYPE,
+    TestSceneList: List[TESTSCENE_TYPE],
+    MaxAge: float = DEFAULT_MAX_AGE,
+    FallbackTime: Optional[float] = None,
+    Now: Optional[float] = None,
+) -> Dict[TESTSCENE_TYPE, List[int]]:
+    # 每个测试项目中需要重新请求分数的设备 id：分数缺失，或者获取时间早于 Now - MaxAge
+    # 旧数据没有记录获取时间时，使用 FallbackTime（一般为文件修改时间）
+    Now = Now if Now is not None else time.time()
+    FallbackTime = FallbackTime if FallbackTime is not None else 0
+    StaleIds: Dict[TESTSCENE_TYPE, List[int]] = {}
+    for TestScene in TestSceneList:
+        StaleIds[TestScene] = [
+            Id
+            for Id, Item in OldData.items()
+            if Item.get(TestScene.value[2], -1) in MISSING_SCORES
+            or Now - Item.get(GetUpdateTimeKey(TestScene), FallbackTime) > MaxAge
+        ]
+    return StaleIds
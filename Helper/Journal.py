@@ -0,0 +1,107 @@
+import json, os, threading, time
+from typing import Dict, List, NamedTuple, Tuple
+
+from Helper.Get3DMarkScore import TESTSCENE_TYPE
+
+
+# 距上次 fsync 超过该时间（秒）时强制落盘
+FSYNC_INTERVAL: float = 1.0
+
+
+class JournalState(NamedTuple):
+    IsCpu: bool
+    # id -> 型号，空字符串表示该 id 没有设备
+    Names: Dict[int, str]
+    # (id, 测试项目名) -> (分数, 获取时间)
+    Scores: Dict[Tuple[int, str], Tuple[int, int]]
+
+
+def GetJournalPath(IsCpu: bool, TestSceneList: List[TESTSCENE_TYPE]) -> str:
+    return f"{'CPU' if IsCpu else 'GPU'}_{'_'.join([TestScene.name for TestScene in TestSceneList])}.journal.jsonl"
+
+
+def ReplayJournal(FilePath: str) -> JournalState:
+    IsCpu: bool = False
+    Names: Dict[int, str] = {}
+    Scores: Dict[Tuple[int, str], Tuple[int, int]] = {}
+    with open(FilePath, "r", encoding="utf-8") as File:
+        for Line in File:
+            try:
+                Record = json.loads(Line)
+            except ValueError:
+                # 崩溃时最后一行可能只写了一半
+                continue
+            Type = Record.get("Type")
+            if Type == "Header":
+                IsCpu = Record["IsCpu"]
+            elif Type == "Name":
+                Names[Record["Id"]] = Record["Name"]
+            elif Type == "Score":
+                Scores[(Record["Id"], Record["Scene"])] = (
+                    Record["Score"],
+                    Record["Time"],
+                )
+    return JournalState(IsCpu, Names, Scores)
+
+
+def _EndsWithPartialLine(FilePath: str) -> bool:
+    with open(FilePath, "rb") as File:
+        File.seek(0, os.SEEK_END)
+        if File.tell() == 0:
+            return False
+        File.seek(-1, os.SEEK_END)
+        return File.read(1) != b"\n"
+
+
+class CrawlJournal:
+    # 追加写入的 JSONL 日志，每完成一个请求写一行，用于崩溃后恢复
+    def __init__(self, FilePath: str, IsCpu: bool, bResume: bool = False) -> None:
+        self.FilePath: str = FilePath
+        self._Lock = threading.Lock()
+        self._LastSync: float = time.time()
+        bNewFile = not (bResume and os.path.exists(FilePath))
+        bPartialLine = not bNewFile and _EndsWithPartialLine(FilePath)
+        self._File = open(FilePath, "w" if bNewFile else "a", encoding="utf-8")
+        if bPartialLine:
+            # 上次崩溃留下的半行单独成行，避免和新记录粘在一起
+            self._File.write("\n")
+        if bNewFile:
+            self._Write({"Type": "Header", "IsCpu": IsCpu, "Time": int(time.time())})
+
+    def _Write(self, Record: Dict) -> None:
+        with self._Lock:
+            self._File.write(json.dumps(Record, ensure_ascii=False) + "\n")
+            self._File.flush()
+            Now = time.time()
+            if Now - self._LastSync > FSYNC_INTERVAL:
+                os.fsync(self._File.fileno())
+                self._LastSync = Now
+
+    def RecordName(self, Id: int, Name: str) -> None:
+        self._Write({"Type": "Name", "Id": Id, "Name": Name})
+
+    def RecordScore(
+        self, Id: int, TestScene: TESTSCENE_TYPE, Score: int, UpdateTime: int
+    ) -> None:
+        self._Write(
+            {
+                "Type": "Score",
+                "Id": Id,
+                "Scene": TestScene.name,
+                "Score": Score,
+                "Time": UpdateTime,
+            }
+        )
+
+    def Close(self) -> None:
+        with self._Lock:
+            if not self._File.closed:
+                self._File.flush()
+                os.fsync(self._File.fileno())
+                self._File.close()
+
+    def __enter__(self) -> "CrawlJournal":
+        return self
+
+    def __exit__(self, *Args) -> None:
+        self.Close()
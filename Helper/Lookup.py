@@ -0,0 +1,257 @@
+import glob, heapq, json, os, statistics, threading, time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, unquote, urlparse
+
+from Helper.Get3DMarkScore import UPDATE_TIME_PREFIX, DATA_TYPE
+from Helper.Dataset import LoadDataset
+from Helper.Incremental import MISSING_SCORES
+from Helper.ProcessDeviceName import CPUName, GPUName, NormalizeName
+
+
+DEFAULT_LOOKUP_PORT: int = 8790
+# 检查数据文件是否更新的间隔（秒）
+DEFAULT_RELOAD_INTERVAL: float = 5.0
+DEFAULT_SEARCH_LIMIT: int = 10
+# 模糊匹配的最低相似度（三元组的 Dice 系数）
+DEFAULT_MIN_SIMILARITY: float = 0.3
+
+
+def _Trigrams(Text: str) -> List[str]:
+    # 首尾补空格，短名字和词首也能产生三元组
+    Text = f"  {Text} "
+    return list({Text[i : i + 3] for i in range(len(Text) - 2)})
+
+
+class DeviceIndex:
+    # 一个数据文件的只读索引，建好后不再修改，热更新时整体替换
+    # ById: id -> 记录（不含获取时间）
+    # ByIdentity: 解析结果 (Vendor, Model, Features) -> id 列表
+    # Trigrams: 规范化型号名的三元组 -> 型号名序号，模糊查询时只统计命中的型号名
+    def __init__(self, Data: DATA_TYPE, IsCpu: bool, Path: str = "") -> None:
+        DEVICE: str = "CPU" if IsCpu else "GPU"
+        self.IsCpu: bool = IsCpu
+        self.Path: str = Path
+        self.LoadedAt: float = time.time()
+        self.NameKey: str = f"{DEVICE} Name"
+        self.ById: Dict[int, Dict] = {
+            Id: {Key: Value for Key, Value in Item.items() if not Key.startswith(UPDATE_TIME_PREFIX)}
+            for Id, Item in Data.items()
+            if Item.get(self.NameKey)
+        }
+
+        self.Parser = CPUName if IsCpu else GPUName
+        self.ByIdentity: Dict[object, List[int]] = {}
+        self.Names: List[str] = []
+        self.NameIds: List[List[int]] = []
+        self.NameTrigramCounts: List[int] = []
+        self.Trigrams: Dict[str, List[int]] = {}
+        NameIndex: Dict[str, int] = {}
+        for Id, Item in self.ById.items():
+            Name: str = Item[self.NameKey]
+            self.ByIdentity.setdefault(self.Parser(Name), []).append(Id)
+            Normalized = NormalizeName(Name)
+            Index = NameIndex.get(Normalized)
+            if Index is None:
+                Index = NameIndex[Normalized] = len(self.Names)
+                self.Names.append(Normalized)
+                self.NameIds.append([])
+                Trigrams = _Trigrams(Normalized)
+                self.NameTrigramCounts.append(len(Trigrams))
+                for Trigram in Trigrams:
+                    self.Trigrams.setdefault(Trigram, []).append(Index)
+            self.NameIds[Index].append(Id)
+
+    def GetById(self, Id: int) -> Optional[Dict]:
+        return self.ById.get(Id)
+
+    def GetByIdentity(self, Name: str) -> Dict:
+        # 与 Name 解析结果相同的所有设备，以及每个测试项目在这些设备间的中位数
+        try:
+            Identity = self.Parser(Name)
+        except Exception as e:
+            raise ValueError(f"cannot parse name {Name!r}") from e
+        Items = [self.ById[Id] for Id in self.ByIdentity.get(Identity, [])]
+        Scores: Dict[str, List[int]] = {}
+        for Item in Items:
+            for Key, Value in Item.items():
+                if "3DMark" in Key and Value not in MISSING_SCORES:
+                    Scores.setdefault(Key, []).append(Value)
+        return {
+            "identity": {
+                "vendor": Identity.Vendor,
+                "model": Identity.Model,
+                "features": sorted(Identity.Features),
+            },
+            "median": {Key: int(statistics.median(Values)) for Key, Values in Scores.items()},
+            "devices": Items,
+        }
+
+    def Search(
+        self,
+        Query: str,
+        Limit: int = DEFAULT_SEARCH_LIMIT,
+        MinSimilarity: float = DEFAULT_MIN_SIMILARITY,
+    ) -> List[Tuple[float, Dict]]:
+        # 按三元组的 Dice 系数排序，返回 [(相似度, 记录)]
+        QueryTrigrams = _Trigrams(NormalizeName(Query))
+        if not QueryTrigrams:
+            return []
+        Hits: Dict[int, int] = {}
+        for Trigram in QueryTrigrams:
+            for Index in self.Trigrams.get(Trigram, ()):
+                Hits[Index] = Hits.get(Index, 0) + 1
+        Scored = (
+            (2 * Count / (len(QueryTrigrams) + self.NameTrigramCounts[Index]), Index)
+            for Index, Count in Hits.items()
+        )
+        Result: List[Tuple[float, Dict]] = []
+        for Similarity, Index in heapq.nlargest(Limit, Scored):
+            if Similarity < MinSimilarity or len(Result) >= Limit:
+                break
+            for Id in self.NameIds[Index]:
+                Result.append((round(Similarity, 4), self.ById[Id]))
+        return Result[:Limit]
+
+
+def LoadDeviceIndex(Path: str) -> DeviceIndex:
+    Data = LoadDataset(Path)
+    IsCpu = any("CPU Name" in Item for Item in Data.values())
+    return DeviceIndex(Data, IsCpu, Path)
+
+
+class LookupService:
+    # 每个 Pattern（文件路径或通配符）对应一个数据集，使用匹配到的最新文件
+    # 后台线程定期检查，出现更新的文件或文件被修改时重新建立索引并原子替换，查询不会被阻塞
+    def __init__(
+        self, Patterns: List[str], ReloadInterval: float = DEFAULT_RELOAD_INTERVAL
+    ) -> None:
+        self.Patterns: List[str] = Patterns
+        self.ReloadInterval: float = ReloadInterval
+        # 设备类型 ("cpu"/"gpu") -> 索引
+        self.Indexes: Dict[str, DeviceIndex] = {}
+        # Pattern -> (文件路径, 修改时间)
+        self._Loaded: Dict[str, Tuple[str, float]] = {}
+        self._Stop = threading.Event()
+        self.Reload()
+
+    @staticmethod
+    def _FindLatest(Pattern: str) -> Optional[Tuple[str, float]]:
+        Paths = glob.glob(Pattern)
+        if not Paths:
+            return None
+        Path = max(Paths, key=os.path.getmtime)
+        return Path, os.path.getmtime(Path)
+
+    def Reload(self) -> bool:
+        # 返回是否有数据集被重新加载
+        bReloaded: bool = False
+        for Pattern in self.Patterns:
+            Latest = self._FindLatest(Pattern)
+            if Latest is None or Latest == self._Loaded.get(Pattern):
+                continue
+            try:
+                Index = LoadDeviceIndex(Latest[0])
+            except Exception as e:
+                # 文件可能还在写入中，下次再试
+                print(f"Failed to load {Latest[0]}: {e}")
+                continue
+            self.Indexes = {**self.Indexes, "cpu" if Index.IsCpu else "gpu": Index}
+            self._Loaded[Pattern] = Latest
+            bReloaded = True
+            print(f"Loaded {len(Index.ById)} devices from {Latest[0]}")
+        return bReloaded
+
+    def _Watch(self) -> None:
+        while not self._Stop.wait(self.ReloadInterval):
+            self.Reload()
+
+    def StartWatching(self) -> None:
+        threading.Thread(target=self._Watch, daemon=True).start()
+
+    def StopWatching(self) -> None:
+        self._Stop.set()
+
+    def GetStatus(self) -> Dict:
+        return {
+            Device: {
+                "path": Index.Path,
+                "devices": len(Index.ById),
+                "loaded_at": int(Index.LoadedAt),
+            }
+            for Device, Index in self.Indexes.items()
+        }
+
+
+def _MakeHandler(Service: LookupService) -> type:
+    # /health
+    # /{cpu,gpu}/id/<id>
+    # /{cpu,gpu}/identity?name=<型号名>
+    # /{cpu,gpu}/search?q=<型号名>&limit=<数量>
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        # 响应头和响应体分两次写出，长连接上不关闭 Nagle 时每个响应都要等待对方的延迟 ACK
+        disable_nagle_algorithm = True
+
+        def log_message(self, *Args) -> None:
+            pass
+
+        def _Send(self, StatusCode: int, Body: object) -> None:
+            Data = json.dumps(Body, ensure_ascii=False).encode()
+            self.send_response(StatusCode)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(Data)))
+            self.end_headers()
+            self.wfile.write(Data)
+
+        def do_GET(self) -> None:
+            Url = urlparse(self.path)
+            Query = parse_qs(Url.query)
+            Parts = [unquote(Part) for Part in Url.path.strip("/").split("/")]
+
+            if Parts == ["health"]:
+                self._Send(200, Service.GetStatus())
+                return
+            # 整体替换的索引，本次查询中始终使用同一个
+            Index = Service.Indexes.get(Parts[0]) if Parts else None
+            if Index is None or len(Parts) < 2:
+                self._Send(404, {"error": "not found"})
+                return
+
+            try:
+                if Parts[1] == "id" and len(Parts) == 3:
+                    Item = Index.GetById(int(Parts[2]))
+                    if Item is None:
+                        self._Send(404, {"error": f"id {Parts[2]} not found"})
+                    else:
+                        self._Send(200, Item)
+                elif Parts[1] == "identity":
+                    self._Send(200, Index.GetByIdentity(Query["name"][0]))
+                elif Parts[1] == "search":
+                    Limit = int(Query.get("limit", [DEFAULT_SEARCH_LIMIT])[0])
+                    self._Send(
+                        200,
+                        [
+                            {"similarity": Similarity, **Item}
+                            for Similarity, Item in Index.Search(Query["q"][0], Limit)
+                        ],
+                    )
+                else:
+                    self._Send(404, {"error": "not found"})
+            except (KeyError, ValueError) as e:
+                self._Send(400, {"error": f"bad request: {e}"})
+            except Exception as e:
+                # 不让异常断开连接，客户端总能收到 JSON 响应
+                self._Send(500, {"error": f"internal error: {e!r}"})
+
+    return Handler
+
+
+def StartLookupServer(
+    Service: LookupService, Host: str = "127.0.0.1", Port: int = DEFAULT_LOOKUP_PORT
+):
+    # 在后台线程启动，返回 (server, base url)；Port 为 0 时自动选择端口
+    Server = ThreadingHTTPServer((Host, Port), _MakeHandler(Service))
+    Server.daemon_threads = True
+    threading.Thread(target=Server.serve_forever, daemon=True).start()
+    return Server, f"http://{Host}:{Server.server_address[1]}"
@@ -0,0 +1,159 @@
+import os
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+from Helper.Get3DMarkScore import (
+    CPU_TESTSCENE,
+    GPU_TESTSCENE,
+    UPDATE_TIME_PREFIX,
+    GetUpdateTimeKey,
+)
+from Helper.Dataset import LoadDatasetFrame
+from Helper.Incremental import MISSING_SCORES
+
+
+# newest: 取获取时间最新的有效分数
+# max: 取最大的分数
+# nonmissing: 只填补缺失的分数，先读入的文件优先
+MERGE_POLICIES: Tuple[str, ...] = ("newest", "max", "nonmissing")
+
+# 测试项目名（Item 中的列名） -> 获取时间的列名
+_SCENE_TO_UPDATE_TIME_KEY: Dict[str, str] = {
+    TestScene.value[2]: GetUpdateTimeKey(TestScene)
+    for TestScene in [*CPU_TESTSCENE, *GPU_TESTSCENE]
+}
+
+
+def _IsMissing(Value: object) -> bool:
+    return Value is None or Value in MISSING_SCORES
+
+
+def _ShouldReplace(
+    Policy: str, Current: object, CurrentTime: float, New: object, NewTime: float
+) -> bool:
+    if Current is None:
+        return True
+    if _IsMissing(New):
+        return False
+    if _IsMissing(Current):
+        return True
+    if Policy == "newest":
+        return NewTime >= CurrentTime
+    if Policy == "max":
+        return New > Current
+    return False
+
+
+def MergeRecord(
+    Target: Dict[str, Union[int, str]],
+    Item: Dict[str, Union[int, str]],
+    Policy: str,
+    FallbackTime: float,
+) -> None:
+    # 按 (设备, 测试项目) 逐列合并，Target 为合并结果
+    for Key, Value in Item.items():
+        if Key.startswith(UPDATE_TIME_PREFIX):
+            continue
+        if Key.endswith(" Name"):
+            # 型号取最后一个非空值
+            if Value or Key not in Target:
+                Target[Key] = Value
+            continue
+        UpdateTimeKey = _SCENE_TO_UPDATE_TIME_KEY.get(Key)
+        if UpdateTimeKey is None:
+            Target.setdefault(Key, Value)
+            continue
+
+        NewTime = Item.get(UpdateTimeKey, FallbackTime)
+        if _ShouldReplace(
+            Policy,
+            Target.get(Key),
+            Target.get(UpdateTimeKey, FallbackTime),
+            Value,
+            NewTime,
+        ):
+            Target[Key] = Value
+            Target[UpdateTimeKey] = NewTime
+
+
+def _PickRows(All, Mask, IdColumn: str, SortColumns: List[str], Ascending: List[bool], Keep: str):
+    # Mask 选中的行按 SortColumns 稳定排序后，每个 id 保留一行，返回以 id 为索引的 DataFrame
+    # All 只包含需要的几列，避免每次复制整张表
+    Rows = All.loc[Mask]
+    if SortColumns:
+        Rows = Rows.sort_values(SortColumns, ascending=Ascending, kind="stable")
+    return Rows.drop_duplicates(IdColumn, keep=Keep).set_index(IdColumn)
+
+
+def MergeDatasets(
+    FilePaths: Iterable[str],
+    Policy: str = "newest",
+    FallbackTimes: Optional[Dict[str, float]] = None,
+):
+    # 按列合并多个文件，返回 DataFrame（每行一个设备，id 按首次出现的顺序），结果与逐条 MergeRecord 相同
+    # Arrow 文件内存映射后直接按列处理，不会转换成 dict；没有记录获取时间的旧数据以文件修改时间为准
+    import pandas as pd
+
+    if Policy not in MERGE_POLICIES:
+        raise ValueError(f"未知的合并策略：{Policy}，可选：{', '.join(MERGE_POLICIES)}")
+
+    Frames = []
+    for Order, FilePath in enumerate(FilePaths):
+        Df = LoadDatasetFrame(FilePath)
+        if len(Df) == 0:
+            continue
+        FallbackTime = (FallbackTimes or {}).get(FilePath, os.path.getmtime(FilePath))
+        Frames.append(Df.assign(_Order=Order, _FallbackTime=int(FallbackTime)))
+    if not Frames:
+        return pd.DataFrame()
+    All = pd.concat(Frames, ignore_index=True)
+    All["_Row"] = range(len(All))
+
+    # 各文件中出现过的列，按首次出现的顺序
+    Columns: List[str] = list(
+        dict.fromkeys(
+            Column for Df in Frames for Column in Df.columns if not Column.startswith("_")
+        )
+    )
+    IdColumn = next(Column for Column in Columns if Column.endswith(" ID"))
+    Ids = pd.unique(All[IdColumn])
+    Result = pd.DataFrame(index=pd.Index(Ids, name=IdColumn))
+
+    for Column in Columns:
+        if Column.startswith(UPDATE_TIME_PREFIX) or Column == IdColumn:
+            continue
+        Values = All[[IdColumn, Column, "_Row"]]
+        NonNull = Values[Column].notna()
+        UpdateTimeKey = _SCENE_TO_UPDATE_TIME_KEY.get(Column)
+        if Column.endswith(" Name"):
+            # 型号取最后一个非空值，都为空时取第一个
+            Named = _PickRows(Values, NonNull & (Values[Column] != ""), IdColumn, [], [], "last")
+            First = _PickRows(Values, NonNull, IdColumn, [], [], "first")
+            Result[Column] = Named[Column].combine_first(First[Column])
+            continue
+        if UpdateTimeKey is None:
+            Result[Column] = _PickRows(Values, NonNull, IdColumn, [], [], "first")[Column]
+            continue
+
+        Values = Values.assign(
+            _Time=All[UpdateTimeKey].fillna(All["_FallbackTime"])
+            if UpdateTimeKey in All
+            else All["_FallbackTime"]
+        )
+        Valid = NonNull & ~Values[Column].isin(MISSING_SCORES)
+        if Policy == "newest":
+            # 获取时间最新的有效分数，时间相同时取后读入的文件
+            Picked = _PickRows(Values, Valid, IdColumn, ["_Time", "_Row"], [True, True], "last")
+        elif Policy == "max":
+            # 最大的有效分数，相同时取先读入的文件
+            Picked = _PickRows(Values, Valid, IdColumn, [Column, "_Row"], [True, False], "last")
+        else:
+            Picked = _PickRows(Values, Valid, IdColumn, [], [], "first")
+        # 没有有效分数时保留第一个值（-1/0）
+        First = _PickRows(Values, NonNull, IdColumn, [], [], "first")
+        Result[Column] = Picked[Column].combine_first(First[Column])
+        Result[UpdateTimeKey] = Picked["_Time"].combine_first(First["_Time"])
+
+    Result.reset_index(inplace=True)
+    # 与数据文件相同的列顺序，文件中没有的获取时间列放在最后
+    Ordered = [Column for Column in Columns if Column in Result.columns]
+    return Result[Ordered + [Column for Column in Result.columns if Column not in Ordered]]
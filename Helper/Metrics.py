@@ -0,0 +1,225 @@
+import json, os, threading, time
+from typing import Dict, List, Optional, Tuple
+
+
+# 延迟直方图的桶上限（秒），与 Prometheus 的 le 标签一致
+LATENCY_BUCKETS: Tuple[float, ...] = (
+    0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0,
+)
+_METRIC_PREFIX: str = "threedmark"
+
+
+class LatencyHistogram:
+    def __init__(self, Buckets: Tuple[float, ...] = LATENCY_BUCKETS) -> None:
+        self.Buckets: Tuple[float, ...] = Buckets
+        # 最后一个为 +Inf
+        self.Counts: List[int] = [0] * (len(Buckets) + 1)
+        self.Count: int = 0
+        self.Sum: float = 0.0
+        self.Max: float = 0.0
+
+    def Observe(self, Value: float) -> None:
+        Index = 0
+        while Index < len(self.Buckets) and Value > self.Buckets[Index]:
+            Index += 1
+        self.Counts[Index] += 1
+        self.Count += 1
+        self.Sum += Value
+        self.Max = max(self.Max, Value)
+
+    def Merge(self, Other: "LatencyHistogram") -> None:
+        for Index, Count in enumerate(Other.Counts):
+            self.Counts[Index] += Count
+        self.Count += Other.Count
+        self.Sum += Other.Sum
+        self.Max = max(self.Max, Other.Max)
+
+    def Quantile(self, Q: float) -> float:
+        # 在所在的桶内线性插值，与 Prometheus 的 histogram_quantile 相同
+        if self.Count == 0:
+            return 0.0
+        Rank = Q * self.Count
+        Cumulative = 0
+        for Index, Count in enumerate(self.Counts):
+            if Cumulative + Count >= Rank and Count > 0:
+                Lower = self.Buckets[Index - 1] if Index > 0 else 0.0
+                Upper = self.Buckets[Index] if Index < len(self.Buckets) else self.Max
+                return min(self.Max, Lower + (Upper - Lower) * (Rank - Cumulative) / Count)
+            Cumulative += Count
+        return self.Max
+
+    def Summary(self) -> Dict[str, float]:
+        return {
+            "count": self.Count,
+            "mean": self.Sum / self.Count if self.Count else 0.0,
+            "p50": self.Quantile(0.5),
+            "p90": self.Quantile(0.9),
+            "p99": self.Quantile(0.99),
+            "max": self.Max,
+        }
+
+
+class CrawlMetrics:
+    # 爬取过程中的统计，所有线程/协程共享
+    # request: 单次 HTTP 请求（服务器 + 网络耗时），每次重试单独计入
+    # call: 一次 FetchText（含限速排队、重试等待、缓存），与 request 的差值即本地开销
+    def __init__(self) -> None:
+        self.StartTime: float = time.time()
+        self.RequestLatency: Dict[Tuple[str, str], LatencyHistogram] = {}
+        self.CallLatency: Dict[Tuple[str, str], LatencyHistogram] = {}
+        self.StatusCounts: Dict[str, int] = {}
+        self.Retries: Dict[str, int] = {}
+        self.Errors: Dict[str, int] = {}
+        # 每个 endpoint 实际传输的响应字节数（压缩后，不含响应头）
+        self.Bytes: Dict[str, int] = {}
+        self.CacheHits: int = 0
+        self.InFlight: int = 0
+        self.MaxInFlight: int = 0
+        self._Lock = threading.Lock()
+
+    def BeginRequest(self) -> None:
+        with self._Lock:
+            self.InFlight += 1
+            self.MaxInFlight = max(self.MaxInFlight, self.InFlight)
+
+    def EndRequest(
+        self,
+        Endpoint: str,
+        Scene: str,
+        Latency: float,
+        StatusCode: Optional[int],
+        Bytes: int = 0,
+    ) -> None:
+        # StatusCode 为 None 表示请求抛出了异常（超时、连接失败等）
+        Status = str(StatusCode) if StatusCode is not None else "error"
+        with self._Lock:
+            self.InFlight -= 1
+            Histogram = self.RequestLatency.get((Endpoint, Scene))
+            if Histogram is None:
+                Histogram = self.RequestLatency[(Endpoint, Scene)] = LatencyHistogram()
+            Histogram.Observe(Latency)
+            self.StatusCounts[Status] = self.StatusCounts.get(Status, 0) + 1
+            self.Bytes[Endpoint] = self.Bytes.get(Endpoint, 0) + Bytes
+
+    def ObserveCall(self, Endpoint: str, Scene: str, Latency: float) -> None:
+        with self._Lock:
+            Histogram = self.CallLatency.get((Endpoint, Scene))
+            if Histogram is None:
+                Histogram = self.CallLatency[(Endpoint, Scene)] = LatencyHistogram()
+            Histogram.Observe(Latency)
+
+    def ObserveRetry(self, Endpoint: str) -> None:
+        with self._Lock:
+            self.Retries[Endpoint] = self.Retries.get(Endpoint, 0) + 1
+
+    def ObserveError(self, Endpoint: str, Error: BaseException) -> None:
+        Key = f"{Endpoint}:{Error.__class__.__name__}"
+        with self._Lock:
+            self.Errors[Key] = self.Errors.get(Key, 0) + 1
+
+    def ObserveCacheHit(self) -> None:
+        with self._Lock:
+            self.CacheHits += 1
+
+    def _SummarizeBy(
+        self, Histograms: Dict[Tuple[str, str], LatencyHistogram], Index: int
+    ) -> Dict[str, Dict[str, float]]:
+        # 按 endpoint（Index 0）或测试项目（Index 1）汇总
+        Merged: Dict[str, LatencyHistogram] = {}
+        for Labels, Histogram in Histograms.items():
+            if Labels[Index] == "":
+                continue
+            Target = Merged.get(Labels[Index])
+            if Target is None:
+                Target = Merged[Labels[Index]] = LatencyHistogram()
+            Target.Merge(Histogram)
+        return {Key: Histogram.Summary() for Key, Histogram in sorted(Merged.items())}
+
+    def GetSummary(self) -> Dict:
+        with self._Lock:
+            Elapsed = time.time() - self.StartTime
+            RequestCount = sum(Histogram.Count for Histogram in self.RequestLatency.values())
+            RequestTime = sum(Histogram.Sum for Histogram in self.RequestLatency.values())
+            CallTime = sum(Histogram.Sum for Histogram in self.CallLatency.values())
+            return {
+                "elapsed_seconds": Elapsed,
+                "requests": RequestCount,
+                "requests_per_second": RequestCount / Elapsed if Elapsed > 0 else 0.0,
+                "request_latency_by_endpoint": self._SummarizeBy(self.RequestLatency, 0),
+                "request_latency_by_scene": self._SummarizeBy(self.RequestLatency, 1),
+                "call_latency_by_endpoint": self._SummarizeBy(self.CallLatency, 0),
+                "call_latency_by_scene": self._SummarizeBy(self.CallLatency, 1),
+                # 所有调用耗时之和中不属于 HTTP 请求的部分：限速排队、退避等待等
+                "local_overhead_seconds": max(0.0, CallTime - RequestTime),
+                "status_counts": dict(sorted(self.StatusCounts.items())),
+                "retries": dict(self.Retries),
+                "errors": dict(self.Errors),
+                "bytes": dict(self.Bytes),
+                "cache_hits": self.CacheHits,
+                "in_flight": self.InFlight,
+                "max_in_flight": self.MaxInFlight,
+            }
+
+    def _FormatHistogram(
+        self, Name: str, Histograms: Dict[Tuple[str, str], LatencyHistogram]
+    ) -> List[str]:
+        Lines = [f"# TYPE {Name} histogram"]
+        for (Endpoint, Scene), Histogram in sorted(Histograms.items()):
+            Labels = f'endpoint="{Endpoint}",scene="{Scene}"'
+            Cumulative = 0
+            for Index, Count in enumerate(Histogram.Counts):
+                Cumulative += Count
+                Le = f"{Histogram.Buckets[Index]}" if Index < len(Histogram.Buckets) else "+Inf"
+                Lines.append(f'{Name}_bucket{{{Labels},le="{Le}"}} {Cumulative}')
+            Lines.append(f"{Name}_sum{{{Labels}}} {Histogram.Sum}")
+            Lines.append(f"{Name}_count{{{Labels}}} {Histogram.Count}")
+        return Lines
+
+    def ToPrometheus(self) -> str:
+        # Prometheus 文本格式，可交给 node_exporter 的 textfile collector
+        P = _METRIC_PREFIX
+        with self._Lock:
+            Lines: List[str] = []
+            Lines += self._FormatHistogram(f"{P}_request_duration_seconds", self.RequestLatency)
+            Lines += self._FormatHistogram(f"{P}_call_duration_seconds", self.CallLatency)
+            Lines.append(f"# TYPE {P}_responses_total counter")
+            for Status, Count in sorted(self.StatusCounts.items()):
+                Lines.append(f'{P}_responses_total{{status="{Status}"}} {Count}')
+            Lines.append(f"# TYPE {P}_retries_total counter")
+            for Endpoint, Count in sorted(self.Retries.items()):
+                Lines.append(f'{P}_retries_total{{endpoint="{Endpoint}"}} {Count}')
+            Lines.append(f"# TYPE {P}_errors_total counter")
+            for Key, Count in sorted(self.Errors.items()):
+                Endpoint, Error = Key.split(":", 1)
+                Lines.append(f'{P}_errors_total{{endpoint="{Endpoint}",type="{Error}"}} {Count}')
+            Lines.append(f"# TYPE {P}_response_bytes_total counter")
+            for Endpoint, Count in sorted(self.Bytes.items()):
+                Lines.append(f'{P}_response_bytes_total{{endpoint="{Endpoint}"}} {Count}')
+            Lines.append(f"# TYPE {P}_cache_hits_total counter")
+            Lines.append(f"{P}_cache_hits_total {self.CacheHits}")
+            Lines.append(f"# TYPE {P}_in_flight gauge")
+            Lines.append(f"{P}_in_flight {self.InFlight}")
+            Lines.append(f"# TYPE {P}_max_in_flight gauge")
+            Lines.append(f"{P}_max_in_flight {self.MaxInFlight}")
+        return "\n".join(Lines) + "\n"
+
+    def Save(self, FilePath: str) -> str:
+        # FilePath 为 json 汇总，同名的 .prom 为 Prometheus 文本，返回 .prom 的路径
+        with open(FilePath, "w", encoding="utf-8") as File:
+            json.dump(self.GetSummary(), File, indent=2)
+        PromPath = os.path.splitext(FilePath)[0] + ".prom"
+        with open(PromPath, "w", encoding="utf-8") as File:
+            File.write(self.ToPrometheus())
+        return PromPath
+
+
+_Metrics: Optional[CrawlMetrics] = None
+
+
+def SetMetrics(Metrics: Optional[CrawlMetrics]) -> None:
+    global _Metrics
+    _Metrics = Metrics
+
+
+def GetMetrics() -> Optional[CrawlMetrics]:
+    return _Metrics
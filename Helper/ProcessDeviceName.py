@@ -1,5 +1,34 @@
 import re
-from typing import Set, List, Literal, Tuple
+from abc import ABC, abstractmethod
+from functools import lru_cache
+from typing import Dict, FrozenSet, Iterable, List, Literal, Pattern, Tuple
+
+
+# 解析结果缓存的条目数，同一个原始型号名只解析一次
+PARSE_CACHE_SIZE: int = 1 << 16
+
+# 规范化时去掉的特殊符号，(), * 等
+SPECIAL_CHAR_PATTERN: str = r"[^a-zA-Z0-9- ]+"
+
+# 预编译的正则表达式
+_PATTERN_SPECIAL_CHAR = re.compile(SPECIAL_CHAR_PATTERN)
+_CPU_PATTERN_NOISE = re.compile(r"^CPU$|^FOR$|^\d+TH$|^GEN$|^PROCESSOR|\d+-CORES$")
+_CPU_PATTERN_MODEL = re.compile(r"\d{2,}")
+_GPU_PATTERN_LAPTOP = re.compile(r"^MOBILE$|^LAPTOP$|^NOTEBOOK$")
+_GPU_PATTERN_MAXQ = re.compile(r"^MAX-?Q$")
+# 功耗, Desktop, Graphics, GA10x, GPU, for 13th gen Processors, 50th Anniversary 等标识
+_GPU_PATTERN_NOISE = re.compile(
+    r"^\d+(\.\d+)?W$|^DESKTOP$|^GRAPHICS$|^GA\d+$|^GPU$"
+    r"|^FOR$|^\d+TH$|^GEN$|^PROCESSOR|^ANNIVERSARY$"
+)
+_GPU_PATTERN_MODEL = re.compile(r"^(?!R)\D*\d|TITAN|VEGA|FURY|^V.*")
+# 显卡品牌名 -> 厂商，"GeForce RTX 3060" 与 "NVIDIA GeForce RTX 3060" 解析为同一型号
+_GPU_VENDOR_BRANDS: Dict[str, str] = {"GEFORCE": "NVIDIA", "RADEON": "AMD"}
+
+
+@lru_cache(maxsize=256)
+def _CompilePattern(PatternStr: str) -> Pattern:
+    return re.compile(PatternStr)
 
 
 def IsInt(Str: str) -> bool:
@@ -10,28 +39,114 @@ def IsInt(Str: str) -> bool:
         return False
 
 
-class CPUName:
+def _Normalize(Name: str) -> List[str]:
+    # 规范化，将一些不规则内容去除
+    # 全部大写，去掉(R), (TM)，去掉其他特殊符号，(), * 等
+    # 连续空格产生的空 Token 一并去掉，否则 "RTX  3060" 会多出一个空的 Feature
+    Name = Name.upper().replace("(R)", "").replace("(TM)", "")
+    return [Token for Token in _PATTERN_SPECIAL_CHAR.sub("", Name).split(" ") if Token]
+
+
+def NormalizeName(Name: str) -> str:
+    # 规范化后的型号名，用于模糊匹配
+    return " ".join(_Normalize(Name))
+
+
+def _RemoveContaining(TokenList: List[str], Text: str) -> List[str]:
+    # 去除包含 Text 的项（Text 只含字母数字和 -，与按正则搜索等价）
+    return [Token for Token in TokenList if Text not in Token]
+
+
+@lru_cache(maxsize=PARSE_CACHE_SIZE)
+def _CreateCached(Class: type, Name: str) -> "_DeviceName":
+    Instance = object.__new__(Class)
+    Vendor, Model, Features = Class.Parse(Name)
+    object.__setattr__(Instance, "Name", Name)
+    object.__setattr__(Instance, "Vendor", Vendor)
+    object.__setattr__(Instance, "Model", Model)
+    object.__setattr__(Instance, "Features", Features)
+    object.__setattr__(Instance, "_Hash", hash((Vendor, Model, Features)))
+    return Instance
+
+
+def ClearParseCache() -> None:
+    _CreateCached.cache_clear()
+
+
+class _DeviceName(ABC):
+    # 不可变的解析结果，相同的原始型号名返回同一个对象，hash 只计算一次
+    # 子类实现 Parse，返回 (Vendor, Model, Features)
+    __slots__ = ("Name", "Vendor", "Model", "Features", "_Hash")
+
+    Name: str
+    Vendor: str
+    Model: str
+    Features: FrozenSet[str]
+
+    def __new__(cls, Name: str) -> "_DeviceName":
+        return _CreateCached(cls, Name)
+
+    @staticmethod
+    @abstractmethod
+    def Parse(Name: str) -> Tuple[str, str, FrozenSet[str]]:
+        ...
+
+    @classmethod
+    def ParseMany(cls, Names: Iterable[str]) -> List["_DeviceName"]:
+        # 批量解析，重复的型号名只解析一次
+        Parsed: Dict[str, _DeviceName] = {}
+        Result: List[_DeviceName] = []
+        for Name in Names:
+            Instance = Parsed.get(Name)
+            if Instance is None:
+                Instance = Parsed[Name] = cls(Name)
+            Result.append(Instance)
+        return Result
+
     @staticmethod
     def RemoveInfo(TokenList: List[str], PatternStr: str) -> List[str]:
         # 去除满足特定正则表达式的项
-        Pattern = re.compile(PatternStr)
+        Pattern = _CompilePattern(PatternStr)
+        TokenList[:] = [Token for Token in TokenList if not Pattern.search(Token)]
+        return TokenList
 
-        IndexToDelete: List[int] = []
-        for i, Token in enumerate(TokenList):
-            if Pattern.search(Token):
-                IndexToDelete.append(i)
-        for i in reversed(IndexToDelete):
-            del TokenList[i]
+    def __setattr__(self, Name: str, Value: object) -> None:
+        raise AttributeError(f"{self.__class__.__name__} is immutable")
+
+    def __delattr__(self, Name: str) -> None:
+        raise AttributeError(f"{self.__class__.__name__} is immutable")
+
+    def __reduce__(self):
+        return (self.__class__, (self.Name,))
+
+    def __hash__(self) -> int:
+        return self._Hash
+
+    def __eq__(self, __value: object) -> bool:
+        if self is __value:
+            return True
+        if isinstance(__value, self.__class__):
+            return (
+                self._Hash == __value._Hash
+                and self.Vendor == __value.Vendor
+                and self.Model == __value.Model
+                and self.Features == __value.Features
+            )
+        return False
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({self.Vendor}, {self.Model}, {set(self.Features)})"
 
-        return TokenList
+
+class CPUName(_DeviceName):
+    __slots__ = ()
 
     @staticmethod
     def GetModel(TokenList: List[str]) -> Tuple[List[str], str]:
         Model: str = "Unknown"
         ModelIndex: int = -1
-        Pattern = re.compile(r"\d{2,}")
         for i, Token in enumerate(TokenList):
-            if Pattern.search(Token):
+            if _CPU_PATTERN_MODEL.search(Token):
                 Model = Token
                 ModelIndex = i
                 break
@@ -42,59 +157,34 @@ class CPUName:
             Model = TempList[1]
         return TokenList, Model
 
-    def __init__(self, Name: str) -> None:
-        self.Vendor: str = "Unknown"
-        self.Model: str = "Unknown"
-        self.Features: Set[str] = set()
-
-        # 规范化，将一些不规则内容去除
-        # 全部大写
-        Name = Name.upper()
-        # 去掉(R), (TM)
-        Name = Name.replace("(R)", "").replace("(TM)", "")
-        # 去掉其他特殊符号，(), * 等
-        Name = re.sub(r"[^a-zA-Z0-9- ]+", "", Name)
-        TokenList = Name.split(" ")
+    @staticmethod
+    def Parse(Name: str) -> Tuple[str, str, FrozenSet[str]]:
+        Vendor: str = "Unknown"
 
         # 去掉 Processor, xx-cores, for 13th gen cpu等标识
-        TokenList = CPUName.RemoveInfo(
-            TokenList, r"^CPU$|^FOR$|^\d+TH$|^GEN$|^PROCESSOR|\d+-CORES$"
-        )
+        TokenList = [
+            Token
+            for Token in _Normalize(Name)
+            if not _CPU_PATTERN_NOISE.search(Token)
+        ]
 
         # 取得生产商, 并移除
         if len(TokenList) != 0:
-            self.Vendor = TokenList[0]
-            TokenList = CPUName.RemoveInfo(TokenList, self.Vendor)
+            Vendor = TokenList[0]
+            TokenList = _RemoveContaining(TokenList, Vendor)
 
         # 取得型号, 并移除
-        TokenList, self.Model = CPUName.GetModel(TokenList)
-        if self.Model != "Unknown":
-            TokenList = CPUName.RemoveInfo(TokenList, self.Model)
+        TokenList, Model = CPUName.GetModel(TokenList)
+        if Model != "Unknown":
+            TokenList = _RemoveContaining(TokenList, Model)
 
         # 剩下的 Token 全部视为 Feature
-        self.Features.update(TokenList)
+        return Vendor, Model, frozenset(TokenList)
 
-    def __hash__(self) -> int:
-        if isinstance(self.Features, set):
-            self.Features = frozenset(self.Features)
-        return hash((self.Vendor, self.Model, self.Features))
 
-    def __eq__(self, __value: object) -> bool:
-        if isinstance(__value, self.__class__):
-            return (
-                self.Vendor == __value.Vendor
-                and self.Model == __value.Model
-                and self.Features == __value.Features
-            )
-        return False
+class GPUName(_DeviceName):
+    __slots__ = ()
 
-    def __repr__(self) -> str:
-        return (
-            f"{self.__class__.__name__}({self.Vendor}, {self.Model}, {self.Features})"
-        )
-
-
-class GPUName:
     @staticmethod
     def RemoveSpecialInfo(
         TokenList: List[str], Unit: Literal["GB", "MHZ"]
@@ -113,18 +203,13 @@ class GPUName:
                 continue
 
             # b) 20 GB -> 删除 20 和 GB
+            # 不是 数据 + 单位 的写法（如 GBX）时保留原样
             if Token == Unit:
-                assert i > 1
-                Value = TokenList[i - 1]
-                assert IsInt(Value)
-                # assert int(Value) < 100
-                IndexToDelete.extend([i - 1, i])
+                if i >= 1 and IsInt(TokenList[i - 1]):
+                    IndexToDelete.extend([i - 1, i])
 
             # c) 20GB -> 直接删除
-            else:
-                Value = Token[: Token.find(Unit)]
-                assert IsInt(Value)
-                # assert int(Value) < 100
+            elif IsInt(Token[: Token.find(Unit)]):
                 IndexToDelete.append(i)
 
         for i in reversed(IndexToDelete):
@@ -132,98 +217,57 @@ class GPUName:
 
         return TokenList
 
-    @staticmethod
-    def RemoveInfo(TokenList: List[str], PatternStr: str) -> List[str]:
-        # 去除满足特定正则表达式的项
-        Pattern = re.compile(PatternStr)
-
-        IndexToDelete: List[int] = []
-        for i, Token in enumerate(TokenList):
-            if Pattern.search(Token):
-                IndexToDelete.append(i)
-        for i in reversed(IndexToDelete):
-            del TokenList[i]
-
-        return TokenList
-
     @staticmethod
     def GetModel(TokenList: List[str]) -> str:
-        Pattern = re.compile(r"^(?!R)\D*\d|TITAN|VEGA|FURY|^V.*")
         for Token in TokenList:
-            if Pattern.search(Token):
+            if _GPU_PATTERN_MODEL.search(Token):
                 return Token
         return "Unknown"
 
-    def __init__(self, Name: str) -> None:
-        self.Vendor: str = "Unknown"
-        self.Model: str = "Unknown"
-        self.Features: Set[str] = set()
-
-        # 规范化，将一些不规则内容去除
-        # 全部大写
-        Name = Name.upper()
-        # 去掉(R), (TM)
-        Name = Name.replace("(R)", "").replace("(TM)", "")
-        # 去掉其他特殊符号，(), * 等
-        Name = re.sub(r"[^a-zA-Z0-9- ]+", "", Name)
+    @staticmethod
+    def Parse(Name: str) -> Tuple[str, str, FrozenSet[str]]:
+        Vendor: str = "Unknown"
+        Model: str = "Unknown"
+        Features: List[str] = []
 
-        TokenList = Name.split(" ")
+        TokenList = _Normalize(Name)
 
         # 去掉显存, 频率
         TokenList = GPUName.RemoveSpecialInfo(TokenList, "GB")
         TokenList = GPUName.RemoveSpecialInfo(TokenList, "MHZ")
 
-        # 去掉Laptop标识
-        BeforeLen = len(TokenList)
-        TokenList = GPUName.RemoveInfo(TokenList, r"^MOBILE$|^LAPTOP$|^NOTEBOOK$")
-        IsLaptop: bool = bool(BeforeLen - len(TokenList))
-        if IsLaptop:
-            self.Features.add("LAPTOP")
-
-        # 去掉Max-Q标识
-        BeforeLen = len(TokenList)
-        TokenList = GPUName.RemoveInfo(TokenList, r"^MAX-?Q$")
-        IsMAXQ: bool = bool(BeforeLen - len(TokenList))
-        if IsMAXQ:
-            self.Features.add("MAX-Q")
-
-        # 去掉功耗
-        TokenList = GPUName.RemoveInfo(TokenList, r"^\d+(\.\d+)?W$")
-        # 去掉Desktop, Graphics, GA10x, GPU标识
-        TokenList = GPUName.RemoveInfo(TokenList, r"^DESKTOP$|^GRAPHICS$|^GA\d+$|^GPU$")
-        # 去掉如 for 13th gen Processors/ 50th Anniversary 类型的标识
-        TokenList = GPUName.RemoveInfo(
-            TokenList, r"^FOR$|^\d+TH$|^GEN$|^PROCESSOR|^ANNIVERSARY$"
-        )
+        # 一次遍历去掉 Laptop, Max-Q 及其他无关标识
+        bIsLaptop: bool = False
+        bIsMaxQ: bool = False
+        RemainingTokens: List[str] = []
+        for Token in TokenList:
+            if _GPU_PATTERN_LAPTOP.search(Token):
+                bIsLaptop = True
+            elif _GPU_PATTERN_MAXQ.search(Token):
+                bIsMaxQ = True
+            elif not _GPU_PATTERN_NOISE.search(Token):
+                RemainingTokens.append(Token)
+        TokenList = RemainingTokens
+        if bIsLaptop:
+            Features.append("LAPTOP")
+        if bIsMaxQ:
+            Features.append("MAX-Q")
 
         # 取得生产商, 并移除
         if len(TokenList) != 0:
-            self.Vendor = TokenList[0]
-            TokenList = GPUName.RemoveInfo(TokenList, self.Vendor)
+            Vendor = TokenList[0]
+            TokenList = _RemoveContaining(TokenList, Vendor)
+            # 以品牌名开头时归一到厂商，并去掉厂商名后重复的品牌名
+            Vendor = _GPU_VENDOR_BRANDS.get(Vendor, Vendor)
+            TokenList = [
+                Token for Token in TokenList if _GPU_VENDOR_BRANDS.get(Token) != Vendor
+            ]
 
         # 取得型号, 并移除
-        self.Model = GPUName.GetModel(TokenList)
-        if self.Model != "Unknown":
-            TokenList = GPUName.RemoveInfo(TokenList, self.Model)
+        Model = GPUName.GetModel(TokenList)
+        if Model != "Unknown":
+            TokenList = _RemoveContaining(TokenList, Model)
 
         # 剩下的 Token 全部视为 Feature
-        self.Features.update(TokenList)
-
-    def __hash__(self) -> int:
-        if isinstance(self.Features, set):
-            self.Features = frozenset(self.Features)
-        return hash((self.Vendor, self.Model, self.Features))
-
-    def __eq__(self, __value: object) -> bool:
-        if isinstance(__value, self.__class__):
-            return (
-                self.Vendor == __value.Vendor
-                and self.Model == __value.Model
-                and self.Features == __value.Features
-            )
-        return False
-
-    def __repr__(self) -> str:
-        return (
-            f"{self.__class__.__name__}({self.Vendor}, {self.Model}, {self.Features})"
-        )
+        Features.extend(TokenList)
+        return Vendor, Model, frozenset(Features)
@@ -0,0 +1,216 @@
+import asyncio, threading, time
+from contextlib import asynccontextmanager, contextmanager
+from typing import AsyncIterator, Dict, Iterator, Optional
+
+
+# 服务器限流/过载时返回的状态码（502/504 一般是网关后端过载）
+THROTTLE_STATUS = (429, 502, 503, 504)
+# 重试前最长的等待时间（秒），指数退避和服务器给出的 Retry-After 都不超过它
+MAX_RETRY_WAIT: float = 30.0
+
+
+class RateControlSlot:
+    # 一次请求占用的并发名额，请求结束后记录结果
+    def __init__(self) -> None:
+        self.StatusCode: Optional[int] = None
+        self.RetryAfter: Optional[float] = None
+
+    def SetResult(self, StatusCode: int, RetryAfter: Optional[float] = None) -> None:
+        self.StatusCode = StatusCode
+        self.RetryAfter = RetryAfter
+
+
+class RateController:
+    # 令牌桶限速 + AIMD 并发控制，所有线程/协程共享
+    # 开始时不限速，并发数每个成功请求加 1（每一轮约翻倍，即慢启动），直到第一次遇到限流
+    # 遇到 429/503/超时 时并发数减半；速率第一次减速时取实际吞吐量的一半，之后每次减半，并遵守 Retry-After
+    # 之后延迟和错误率正常时，速率每秒加性增长 RateStep，并发数每一轮增长 1；
+    # 一个统计窗口内没有请求因令牌不足而等待，说明速率已不是瓶颈，恢复为不限速
+    def __init__(
+        self,
+        Rate: Optional[float] = None,
+        MinRate: float = 1.0,
+        RateStep: float = 10.0,
+        Concurrency: float = 8.0,
+        MinConcurrency: float = 1.0,
+        MaxConcurrency: float = 64.0,
+        TargetLatency: float = 2.0,
+        DecreaseInterval: float = 1.0,
+    ) -> None:
+        # None 表示不限速
+        self.Rate: Optional[float] = Rate
+        self.MinRate: float = MinRate
+        self.RateStep: float = RateStep
+        self.Concurrency: float = Concurrency
+        self.MinConcurrency: float = MinConcurrency
+        self.MaxConcurrency: float = MaxConcurrency
+        self.TargetLatency: float = TargetLatency
+        # 同一批失败只减速一次
+        self.DecreaseInterval: float = DecreaseInterval
+
+        self.InFlight: int = 0
+        self.Throttled: int = 0
+        self.Completed: int = 0
+        # 最近一秒左右完成的请求数/秒
+        self.Throughput: Optional[float] = None
+        self._bSlowStart: bool = True
+        self._Tokens: float = 1.0
+        self._LastRefill: float = time.monotonic()
+        self._LastIncrease: float = self._LastRefill
+        self._WindowStart: float = self._LastRefill
+        self._WindowCompleted: int = 0
+        self._bTokenWaited: bool = False
+        self._LastDecrease: float = 0.0
+        self._PausedUntil: float = 0.0
+        self._Lock = threading.Lock()
+
+    def _TryAcquire(self) -> float:
+        # 成功占用名额返回 0，否则返回建议等待的秒数
+        with self._Lock:
+            Now = time.monotonic()
+            if Now < self._PausedUntil:
+                return self._PausedUntil - Now
+            if self.InFlight >= int(self.Concurrency):
+                return 0.01
+
+            if self.Rate is not None:
+                self._Tokens = min(
+                    max(1.0, self.Rate), self._Tokens + (Now - self._LastRefill) * self.Rate
+                )
+                self._LastRefill = Now
+                if self._Tokens < 1.0:
+                    self._bTokenWaited = True
+                    return (1.0 - self._Tokens) / self.Rate
+                self._Tokens -= 1.0
+            self.InFlight += 1
+            return 0.0
+
+    def _UpdateThroughput(self, Now: float) -> None:
+        self._WindowCompleted += 1
+        Elapsed = Now - self._WindowStart
+        if Elapsed >= 1.0:
+            self.Throughput = self._WindowCompleted / Elapsed
+            if (
+                self.Rate is not None
+                and not self._bTokenWaited
+                and self._WindowStart >= max(self._LastDecrease, self._PausedUntil)
+            ):
+                self.Rate = None
+            self._WindowStart = Now
+            self._WindowCompleted = 0
+            self._bTokenWaited = False
+
+    def _Decrease(self, Now: float, Latency: float, Factor: float) -> None:
+        self._bSlowStart = False
+        self._LastDecrease = self._LastIncrease = Now
+        if self.Rate is None:
+            # 还没有完整的统计窗口时按当前并发和延迟估计吞吐量
+            Throughput = self.Throughput or self.Concurrency / max(Latency, 0.001)
+            self.Rate = Throughput * Factor
+            self._Tokens = min(self._Tokens, 1.0)
+            self._LastRefill = Now
+        else:
+            self.Rate *= Factor
+        self.Rate = max(self.MinRate, self.Rate)
+        self.Concurrency = max(self.MinConcurrency, self.Concurrency * Factor)
+
+    def _Release(self, Latency: float, Slot: RateControlSlot) -> None:
+        with self._Lock:
+            self.InFlight -= 1
+            self.Completed += 1
+            Now = time.monotonic()
+            self._UpdateThroughput(Now)
+            if Slot.RetryAfter:
+                self._PausedUntil = max(self._PausedUntil, Now + Slot.RetryAfter)
+
+            bCongested = Slot.StatusCode is None or Slot.StatusCode in THROTTLE_STATUS
+            if bCongested:
+                self.Throttled += 1
+                if Now - self._LastDecrease > self.DecreaseInterval:
+                    self._Decrease(Now, Latency, 0.5)
+            elif Latency > self.TargetLatency:
+                # 延迟变高说明服务器开始吃力，轻微减速
+                if Now - self._LastDecrease > self.DecreaseInterval:
+                    self._Decrease(Now, Latency, 0.9)
+            else:
+                # 慢启动时每个成功请求加 1，之后加 1/当前值，约等于每一轮增长 1
+                self.Concurrency = min(
+                    self.MaxConcurrency,
+                    self.Concurrency + (1.0 if self._bSlowStart else 1.0 / self.Concurrency),
+                )
+                if self.Rate is not None:
+                    # 速率按时间而不是按请求数增长，低速时也能较快恢复
+                    self.Rate += self.RateStep * (Now - self._LastIncrease)
+                self._LastIncrease = Now
+
+    @contextmanager
+    def Acquire(self) -> Iterator[RateControlSlot]:
+        while True:
+            Wait = self._TryAcquire()
+            if Wait == 0.0:
+                break
+            time.sleep(Wait)
+
+        Slot = RateControlSlot()
+        StartTime = time.monotonic()
+        try:
+            yield Slot
+        finally:
+            self._Release(time.monotonic() - StartTime, Slot)
+
+    @asynccontextmanager
+    async def AcquireAsync(self) -> AsyncIterator[RateControlSlot]:
+        while True:
+            Wait = self._TryAcquire()
+            if Wait == 0.0:
+                break
+            await asyncio.sleep(Wait)
+
+        Slot = RateControlSlot()
+        StartTime = time.monotonic()
+        try:
+            yield Slot
+        finally:
+            self._Release(time.monotonic() - StartTime, Slot)
+
+    def GetStats(self) -> Dict[str, float]:
+        with self._Lock:
+            return {
+                "Rate": self.Rate or 0.0,
+                "Throughput": self.Throughput or 0.0,
+                "Concurrency": self.Concurrency,
+                "InFlight": self.InFlight,
+                "Completed": self.Completed,
+                "Throttled": self.Throttled,
+            }
+
+    def __str__(self) -> str:
+        Rate = "unlimited" if self.Rate is None else f"{self.Rate:.1f} req/s"
+        return f"{Rate}, concurrency {int(self.Concurrency)}"
+
+
+def ParseRetryAfter(Value: Optional[str]) -> Optional[float]:
+    # 只处理秒数形式的 Retry-After，HTTP 日期形式按默认退避处理
+    # 过大的值会让线程（或整个事件循环中的请求）长时间停住，截断到 MAX_RETRY_WAIT
+    if not Value:
+        return None
+    try:
+        RetryAfter = max(0.0, float(Value))
+    except ValueError:
+        return None
+    if RetryAfter > MAX_RETRY_WAIT:
+        print(f"Retry-After {Value} clamped to {MAX_RETRY_WAIT:g}s")
+        return MAX_RETRY_WAIT
+    return RetryAfter
+
+
+_Controller: Optional[RateController] = None
+
+
+def SetRateController(Controller: Optional[RateController]) -> None:
+    global _Controller
+    _Controller = Controller
+
+
+def GetRateController() -> Optional[RateController]:
+    return _Controller
@@ -0,0 +1,102 @@
+import os, threading
+import requests
+from requests.adapters import HTTPAdapter
+from typing import Optional
+
+
+# 默认连接池大小，与 Main.GetAllDeviceInfo 中线程池的 max_workers 保持一致
+DEFAULT_POOL_SIZE: int = os.cpu_count() or 8
+
+
+def _GetAcceptEncoding() -> str:
+    # urllib3 只有在安装了 brotli/brotlicffi 时才能解码 br
+    Encodings = ["gzip", "deflate"]
+    try:
+        import brotli  # noqa: F401
+
+        Encodings.append("br")
+    except ImportError:
+        try:
+            import brotlicffi  # noqa: F401
+
+            Encodings.append("br")
+        except ImportError:
+            pass
+    return ", ".join(Encodings)
+
+
+_Lock = threading.Lock()
+_Session: Optional[requests.Session] = None
+_PoolConnections: int = 1
+_PoolMaxSize: int = DEFAULT_POOL_SIZE
+_PoolBlock: bool = True
+# 调用过 ConfigureSession 后，EnsurePoolSize 不再修改连接池配置
+_bPoolConfigured: bool = False
+
+
+def _CreateSession() -> requests.Session:
+    Session = requests.Session()
+    Session.headers.update(
+        {
+            "Accept": "application/json",
+            "Accept-Encoding": _GetAcceptEncoding(),
+            "Connection": "keep-alive",
+        }
+    )
+    # 所有请求都发往同一个 host，pool_maxsize 决定了可复用的长连接数
+    Adapter = HTTPAdapter(
+        pool_connections=_PoolConnections,
+        pool_maxsize=_PoolMaxSize,
+        pool_block=_PoolBlock,
+        max_retries=0,
+    )
+    Session.mount("https://", Adapter)
+    Session.mount("http://", Adapter)
+    return Session
+
+
+def ConfigureSession(
+    PoolMaxSize: int = DEFAULT_POOL_SIZE,
+    PoolConnections: int = 1,
+    bPoolBlock: bool = True,
+) -> None:
+    # 修改连接池配置，旧的 Session 会被关闭，下次 GetSession 时按新配置重建
+    global _PoolConnections, _PoolBlock, _bPoolConfigured
+    with _Lock:
+        _PoolConnections = max(1, PoolConnections)
+        _PoolBlock = bPoolBlock
+        _bPoolConfigured = True
+        _SetPoolMaxSize(PoolMaxSize)
+
+
+def EnsurePoolSize(MinSize: int) -> None:
+    # 连接池至少能容纳 MinSize 条长连接（如线程数），只会扩大；调用方指定过连接池配置时以其为准
+    with _Lock:
+        if not _bPoolConfigured and _PoolMaxSize < MinSize:
+            _SetPoolMaxSize(MinSize)
+
+
+def _SetPoolMaxSize(PoolMaxSize: int) -> None:
+    global _Session, _PoolMaxSize
+    _PoolMaxSize = max(1, PoolMaxSize)
+    if _Session is not None:
+        _Session.close()
+        _Session = None
+
+
+def GetSession() -> requests.Session:
+    # 所有线程共享同一个 Session（连接池本身是线程安全的）
+    global _Session
+    if _Session is None:
+        with _Lock:
+            if _Session is None:
+                _Session = _CreateSession()
+    return _Session
+
+
+def CloseSession() -> None:
+    global _Session
+    with _Lock:
+        if _Session is not None:
+            _Session.close()
+            _Session = None
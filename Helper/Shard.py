@@ -0,0 +1,146 @@
+import json, os, socket, time
+from typing import Dict, List, Optional, Tuple
+
+from Helper.Get3DMarkScore import (
+    CPU_TESTSCENE,
+    GPU_TESTSCENE,
+    GetUpdateTimeKey,
+    TESTSCENE_TYPE,
+    DATA_TYPE,
+)
+from Helper.Dataset import LoadDataset, SaveDataset
+from Helper.Merge import MergeRecord
+
+
+# ids: 按 id 取模分片，每个分片查询一部分设备的型号和全部测试项目
+# scenes: 按测试项目分片，每个分片查询全部设备的型号和一部分测试项目
+SHARD_MODES: Tuple[str, ...] = ("ids", "scenes")
+_FORMAT_VERSION: int = 1
+
+
+def ParseShard(Text: str) -> Tuple[int, int]:
+    # "2/8" -> (2, 8)，分片序号从 0 开始
+    Index, _, Count = Text.partition("/")
+    ShardIndex, ShardCount = int(Index), int(Count)
+    if ShardCount < 1 or not 0 <= ShardIndex < ShardCount:
+        raise ValueError(f"分片序号应在 0~{ShardCount - 1} 之间：{Text}")
+    return ShardIndex, ShardCount
+
+
+def GetShardIds(IdList: List[int], ShardIndex: int, ShardCount: int) -> List[int]:
+    # 按 id 取模而不是切成连续的区间，有设备的 id 集中在前面，取模时各分片的工作量更均匀
+    return [Id for Id in IdList if Id % ShardCount == ShardIndex]
+
+
+def GetShardScenes(
+    TestSceneList: List[TESTSCENE_TYPE], ShardIndex: int, ShardCount: int
+) -> List[TESTSCENE_TYPE]:
+    return TestSceneList[ShardIndex::ShardCount]
+
+
+def GetDefaultShardPath(IsCpu: bool, ShardIndex: int, ShardCount: int) -> str:
+    DEVICE: str = "CPU" if IsCpu else "GPU"
+    return f"{DEVICE}.shard{ShardIndex}of{ShardCount}.json"
+
+
+def GetManifestPath(DataPath: str) -> str:
+    return f"{os.path.splitext(DataPath)[0]}.manifest.json"
+
+
+def SaveShard(
+    Data: DATA_TYPE,
+    DataPath: str,
+    IsCpu: bool,
+    ShardIndex: int,
+    ShardCount: int,
+    ShardBy: str,
+    TestSceneList: List[TESTSCENE_TYPE],
+    AllTestSceneList: List[TESTSCENE_TYPE],
+    MinId: int,
+    MaxId: Optional[int],
+    StartTime: float,
+) -> str:
+    # 分片数据按普通数据文件保存，另写一个 manifest 描述分片的参数，返回 manifest 路径
+    SaveDataset(Data, DataPath)
+    Manifest = {
+        "Version": _FORMAT_VERSION,
+        "Device": "CPU" if IsCpu else "GPU",
+        "ShardIndex": ShardIndex,
+        "ShardCount": ShardCount,
+        "ShardBy": ShardBy,
+        "Scenes": [TestScene.name for TestScene in TestSceneList],
+        "AllScenes": [TestScene.name for TestScene in AllTestSceneList],
+        "MinId": MinId,
+        "MaxId": MaxId,
+        "DataFile": os.path.basename(DataPath),
+        "Devices": len(Data),
+        "Host": socket.gethostname(),
+        "StartTime": int(StartTime),
+        "EndTime": int(time.time()),
+    }
+    ManifestPath = GetManifestPath(DataPath)
+    with open(ManifestPath, "w", encoding="utf-8") as File:
+        json.dump(Manifest, File, indent=2)
+    return ManifestPath
+
+
+def LoadManifest(FilePath: str) -> Dict:
+    # 可以传入 manifest 或分片数据文件的路径
+    ManifestPath = FilePath if FilePath.endswith(".manifest.json") else GetManifestPath(FilePath)
+    with open(ManifestPath, "r", encoding="utf-8") as File:
+        Manifest = json.load(File)
+    Manifest["DataPath"] = os.path.join(os.path.dirname(ManifestPath), Manifest["DataFile"])
+    return Manifest
+
+
+def _CheckManifests(Manifests: List[Dict]) -> None:
+    First = Manifests[0]
+    for Manifest in Manifests[1:]:
+        for Key in ("Device", "ShardCount", "ShardBy", "AllScenes"):
+            if Manifest[Key] != First[Key]:
+                raise ValueError(
+                    f"分片参数不一致：{Key} {First[Key]} != {Manifest[Key]}（{Manifest['DataFile']}）"
+                )
+    Indexes = [Manifest["ShardIndex"] for Manifest in Manifests]
+    if len(set(Indexes)) != len(Indexes):
+        raise ValueError(f"分片重复：{sorted(Indexes)}")
+    Missing = sorted(set(range(First["ShardCount"])) - set(Indexes))
+    if Missing:
+        print(f"缺少分片：{Missing}，合并结果不完整")
+    if len({(Manifest["MinId"], Manifest["MaxId"]) for Manifest in Manifests}) > 1:
+        print("各分片的 id 范围不同，合并结果可能不完整")
+
+
+def MergeShards(FilePaths: List[str]) -> Tuple[DATA_TYPE, bool]:
+    # 与输入顺序无关：按分片序号合并，id 升序，每条记录的列按完整的测试项目顺序排列
+    # 返回 (合并后的数据, IsCpu)
+    Manifests = sorted(
+        (LoadManifest(FilePath) for FilePath in FilePaths),
+        key=lambda Manifest: Manifest["ShardIndex"],
+    )
+    if len(Manifests) == 0:
+        raise ValueError("没有分片")
+    _CheckManifests(Manifests)
+
+    IsCpu: bool = Manifests[0]["Device"] == "CPU"
+    DEVICE: str = Manifests[0]["Device"]
+    SceneEnum = CPU_TESTSCENE if IsCpu else GPU_TESTSCENE
+    AllTestSceneList = [SceneEnum[Name] for Name in Manifests[0]["AllScenes"]]
+
+    Merged: DATA_TYPE = {}
+    for Manifest in Manifests:
+        for Id, Item in LoadDataset(Manifest["DataPath"]).items():
+            Target = Merged.get(Id)
+            if Target is None:
+                Target = Merged[Id] = {}
+            # 各分片的 (设备, 测试项目) 不重叠，nonmissing 即按分片序号取第一个有效值
+            MergeRecord(Target, Item, "nonmissing", Manifest["EndTime"])
+
+    Columns: List[str] = [f"{DEVICE} ID", f"{DEVICE} Name"]
+    Columns += [TestScene.value[2] for TestScene in AllTestSceneList]
+    Columns += [GetUpdateTimeKey(TestScene) for TestScene in AllTestSceneList]
+    Result: DATA_TYPE = {}
+    for Id in sorted(Merged):
+        Item = Merged[Id]
+        Result[Id] = {Column: Item[Column] for Column in Columns if Column in Item}
+    return Result, IsCpu
@@ -0,0 +1,58 @@
+import json, os, tempfile
+from contextlib import contextmanager
+from typing import Iterator
+
+
+# 多个进程（如同一台机器上的多个分片）共享的状态文件：
+# 修改前用 LockFile 加排它锁，重新读取并合并后用 WriteJsonAtomic 写回
+
+
+@contextmanager
+def LockFile(Path: str) -> Iterator[None]:
+    # 对 <Path>.lock 加排它锁，其他进程在此等待；锁文件保留，不影响下次使用
+    with open(f"{Path}.lock", "a+b") as File:
+        if os.name == "nt":
+            import msvcrt
+
+            File.seek(0)
+            # LK_LOCK 最多重试 10 秒，继续等待直到拿到锁
+            while True:
+                try:
+                    msvcrt.locking(File.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    pass
+            try:
+                yield
+            finally:
+                File.seek(0)
+                msvcrt.locking(File.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+
+            fcntl.flock(File.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(File.fileno(), fcntl.LOCK_UN)
+
+
+@contextmanager
+def OpenAtomic(Path: str) -> Iterator:
+    # 写入同目录下本进程独有的临时文件，成功后替换 Path；出错时删除临时文件，不影响原文件
+    Handle, TempPath = tempfile.mkstemp(
+        prefix=f"{os.path.basename(Path)}.", suffix=".tmp", dir=os.path.dirname(Path) or "."
+    )
+    try:
+        with os.fdopen(Handle, "w", encoding="utf-8") as File:
+            yield File
+        os.replace(TempPath, Path)
+    except BaseException:
+        if os.path.exists(TempPath):
+            os.remove(TempPath)
+        raise
+
+
+def WriteJsonAtomic(Data: object, Path: str) -> None:
+    with OpenAtomic(Path) as File:
+        json.dump(Data, File)
@@ -1,33 +1,123 @@
-import json, time, os, questionary
-import pandas as pd
+import time, os, sys, argparse
 
 from copy import deepcopy
-from typing import Dict, Tuple, List, Union
-from concurrent.futures import (
-    ThreadPoolExecutor,
-    Future,
-    as_completed,
-)
-from tqdm import tqdm, trange
+from typing import Dict, Iterator, Tuple, List, Optional, Union
 
 
-from Helper.File import ChoseAFileToSave, ChoseFilesToOpen
-from Helper.ProcessDeviceName import CPUName, GPUName
+# pandas / questionary / tkinter / tqdm 只在用到时导入，命令行模式下启动更快
+from Helper.ProcessDeviceName import CPUName, GPUName, SPECIAL_CHAR_PATTERN
+from Helper.Cache import ResponseCache
+from Helper.Session import ConfigureSession
+from Helper.RateControl import RateController, GetRateController, SetRateController
+from Helper.Metrics import CrawlMetrics, GetMetrics, SetMetrics
+from Helper.Hedge import (
+    Hedger,
+    GetHedger,
+    SetHedger,
+    DEFAULT_HEDGE_QUANTILE,
+    DEFAULT_HEDGE_BUDGET,
+)
+from Helper.GapIndex import GapIndex, DEFAULT_GAP_INDEX_PATH, DEFAULT_REVERIFY_INTERVAL
+from Helper.Availability import (
+    AvailabilityStore,
+    DEFAULT_AVAILABILITY_PATH,
+    SKIPPED_SCORE,
+    DEFAULT_RECHECK_INTERVAL,
+)
+from Helper.IdDiscovery import (
+    DiscoverMaxId,
+    GetDenseRanges,
+    FormatRanges,
+    DEFAULT_MISS_RUN,
+)
 from Helper.Get3DMarkScore import (
-    GetNameFromId,
-    GetMedianScoreFromId,
+    NewDeviceItem,
     CPU_TESTSCENE,
     GPU_TESTSCENE,
     TESTSCENE_TYPE,
+    SetCache,
+    GetCache,
+    SetScore,
+    SetBaseUrl,
+    SetMaxAttempts,
+    DEFAULT_MAX_ATTEMPTS,
+    UPDATE_TIME_PREFIX,
+    DATA_TYPE,
+)
+from Helper.Dataset import (
+    LoadDataset,
+    SaveDataset,
+    SaveJsonRecords,
+    ConvertDataset,
+    IsArrowFile,
+    DATASET_FILE_TYPES,
+)
+from Helper.Merge import MergeDatasets, MERGE_POLICIES
+from Helper.Export import ExportDataFrame, EXPORT_FILE_TYPES, EXPORT_FORMATS
+from Helper.Group import BuildDedupDataFrame
+from Helper.Lookup import (
+    LookupService,
+    StartLookupServer,
+    DEFAULT_LOOKUP_PORT,
+    DEFAULT_RELOAD_INTERVAL,
+)
+from Helper.Incremental import GetNewIds, GetStaleIds, DEFAULT_MAX_AGE
+from Helper.Journal import CrawlJournal, ReplayJournal, GetJournalPath
+from Helper.Crawler import IterDeviceScores
+from Helper.DeadLetter import (
+    DeadLetters,
+    DeadLetterFile,
+    LoadDeadLetters,
+    GetDeadLetterPath,
+    DEFAULT_RETRY_PASSES,
+    DEFAULT_RETRY_DELAY,
+    DEFERRED_MAX_ATTEMPTS,
+)
+from Helper.History import HistoryStore, DEFAULT_HISTORY_PATH
+from Helper.Shard import (
+    ParseShard,
+    GetShardIds,
+    GetShardScenes,
+    GetDefaultShardPath,
+    SaveShard,
+    MergeShards,
+    SHARD_MODES,
 )
 
 
-DATA_TYPE = Dict[int, Dict[str, Union[int, str]]]
-
-
-def GetAllDeviceInfo(
-    IsCpu: bool, TestSceneList: List[TESTSCENE_TYPE], *Args: int
-) -> DATA_TYPE:
+def IterAllDeviceInfo(
+    IsCpu: bool,
+    TestSceneList: List[TESTSCENE_TYPE],
+    *Args: int,
+    MaxWorkers: int = os.cpu_count(),
+    bDiscoverIds: bool = False,
+    MissRun: int = DEFAULT_MISS_RUN,
+    IdList: Optional[List[int]] = None,
+    BaseData: Optional[DATA_TYPE] = None,
+    StaleIds: Optional[Dict[TESTSCENE_TYPE, List[int]]] = None,
+    JournalPath: Optional[str] = None,
+    bResume: bool = False,
+    bRateControl: bool = True,
+    GapIndexPath: Optional[str] = None,
+    GapReverifyInterval: Optional[float] = DEFAULT_REVERIFY_INTERVAL,
+    AvailabilityPath: Optional[str] = None,
+    AvailabilityRecheckInterval: float = DEFAULT_RECHECK_INTERVAL,
+    Shard: Optional[Tuple[int, int]] = None,
+    RetryPasses: int = DEFAULT_RETRY_PASSES,
+    RetryDelay: float = DEFAULT_RETRY_DELAY,
+    DeadLetterPath: Optional[str] = None,
+    bReplaceDeadLetter: bool = False,
+) -> Iterator[Tuple[int, Dict[str, Union[int, str]]]]:
+    # 每个设备的请求全部完成后立即产出 (id, 记录)，BaseData 中的设备也会产出
+    # IdList: 只查询这些 id 的型号（默认为 MinId~MaxId）
+    # BaseData: 已有数据，新数据合并到其中
+    # StaleIds: 每个测试项目中，除新设备外还需要重新请求分数的已有设备
+    # JournalPath: 每完成一个请求就追加写入日志；bResume 时先回放日志，只执行剩余的请求
+    # GapIndexPath: 已确认没有设备的 id 索引，跳过这些 id，为 None 时不使用
+    # AvailabilityPath: 多次没有分数的 (设备, 测试项目) 记录，只按较慢的周期重新请求，为 None 时不使用
+    # Shard: (分片序号, 分片数)，只查询 id % 分片数 == 分片序号 的设备
+    # RetryPasses / RetryDelay: 失败的请求在主循环结束后延迟重试的轮数和首轮等待时间，为 0 时不延迟重试
+    # DeadLetterPath: 重试后仍然失败的请求写入该文件，可以用 replay 重新请求，为 None 时不使用
     IdToDeviceInfo: DATA_TYPE
     DEVICE: str = "CPU" if IsCpu else "GPU"
     MinId: int = 1
@@ -36,91 +126,211 @@ def GetAllDeviceInfo(
         MinId = Args[0]
     if len(Args) > 1:
         MaxId = Args[1]
+    elif bDiscoverIds and IdList is None:
+        # 未指定上界时自动探测
+        MaxId = DiscoverMaxId(IsCpu, MinId, MissRun=MissRun, MaxWorkers=MaxWorkers)
+    if IdList is None:
+        IdList = list(range(MinId, MaxId + 1))
+    if Shard:
+        IdList = GetShardIds(IdList, *Shard)
 
-    with ThreadPoolExecutor(max_workers=os.cpu_count()) as ThreadPool:
-        # 从id获取型号
-        print("------------------------------------------")
-        print(f"Get {DEVICE} Name From ID ({MinId} To {MaxId})")
-        Threads: List[Future] = []
-        Threads.extend(
-            ThreadPool.submit(GetNameFromId, i, IsCpu)
-            for i in trange(MinId, MaxId + 1, desc="Tasks Submitting...", unit="tasks")
-        )
-
-        IdToDeviceInfo = {}
-        with tqdm(
-            as_completed(Threads),
-            total=MaxId - MinId + 1,
-            desc="Tasks Executing...",
-            unit="tasks",
-        ) as ProgressBar:
-            for Thread in ProgressBar:
-                try:
-                    Result: Tuple[int, str] = Thread.result()
-                    if Result[1] != "":
-                        Id: int = Result[0]
-                        Name: str = Result[1]
-
-                        Item = {
-                            f"{DEVICE} ID": Id,
-                            f"{DEVICE} Name": Name,
-                        }
-                        for TestScene in TestSceneList:
-                            Item[TestScene.value[2]] = -1
-
-                        IdToDeviceInfo[Id] = Item
-
-                        ProgressBar.set_description_str(
-                            f"Tasks Executing... Current {DEVICE}:{Name:^35}"
-                        )
-                except Exception as e:
-                    print(f"====== An Exception Raised! ======\n{e}")
-
-        def GetScore(TestScene: TESTSCENE_TYPE) -> None:
-            Threads.clear()
-            Threads.extend(
-                ThreadPool.submit(GetMedianScoreFromId, TestScene, i)
-                for i in tqdm(
-                    IdToDeviceInfo.keys(), desc="Tasks Submitting...", unit="tasks"
-                )
-            )
+    if bRateControl and GetRateController() is None:
+        # 所有线程共享的限速器，并发上限为线程数
+        SetRateController(
+            RateController(Concurrency=MaxWorkers, MaxConcurrency=MaxWorkers)
+        )
+
+    IdToDeviceInfo = deepcopy(BaseData) if BaseData else {}
+    Gaps: Optional[GapIndex] = (
+        GapIndex(GapIndexPath, GapReverifyInterval) if GapIndexPath else None
+    )
+    if Gaps:
+        # 已有数据中的设备用于确定已知最大 id
+        for Id, Item in IdToDeviceInfo.items():
+            if Item.get(f"{DEVICE} Name"):
+                Gaps.Record(IsCpu, Id, Item[f"{DEVICE} Name"])
+        IdCount = len(IdList)
+        IdList = Gaps.FilterIds(IsCpu, IdList)
+        print(f"Skip {IdCount - len(IdList)} known empty {DEVICE} IDs ({GapIndexPath})")
+    # 除新设备外需要请求分数的 (测试项目, id)
+    ExtraScoreIds: Dict[TESTSCENE_TYPE, List[int]] = {
+        TestScene: list((StaleIds or {}).get(TestScene, []))
+        for TestScene in TestSceneList
+    }
 
-            with tqdm(
-                as_completed(Threads),
-                total=len(Threads),
-                desc="Tasks Executing...",
-                unit="tasks",
-            ) as ProgressBar:
-                for Thread in ProgressBar:
-                    try:
-                        Result: Tuple[int, int] = Thread.result()
-                        Id: int = Result[0]
-                        MedianScore: int = Result[1]
-
-                        IdToDeviceInfo[Id][TestScene.value[2]] = MedianScore
-
-                        CurrentDeviceName = IdToDeviceInfo[Result[0]][f"{DEVICE} Name"]
-                        ProgressBar.set_description_str(
-                            f"Tasks Executing... Current {DEVICE}:{CurrentDeviceName:^35}, Current Score:{MedianScore:^10}"
-                        )
-                    except Exception as e:
-                        print(f"====== An Exception Raised! ======\n{e}")
-
-        # 从id获取分数
+    if JournalPath and bResume and os.path.exists(JournalPath):
+        # 回放日志：已查过的 id 不再查型号，已取到的分数不再请求
+        State = ReplayJournal(JournalPath)
+        if State.IsCpu != IsCpu:
+            raise ValueError(f"{JournalPath} 不是 {DEVICE} 的日志")
+        IdList = [Id for Id in IdList if Id not in State.Names]
+        for Id, Name in State.Names.items():
+            if Name != "" and Id not in IdToDeviceInfo:
+                IdToDeviceInfo[Id] = NewDeviceItem(IsCpu, Id, Name, TestSceneList)
+                for TestScene in TestSceneList:
+                    ExtraScoreIds[TestScene].append(Id)
         for TestScene in TestSceneList:
-            print("------------------------------------------")
-            print(f"Get {TestScene.value[2]}")
-            GetScore(TestScene)
+            for Id in ExtraScoreIds[TestScene]:
+                if (Id, TestScene.name) in State.Scores:
+                    SetScore(
+                        IdToDeviceInfo[Id], TestScene, *State.Scores[(Id, TestScene.name)]
+                    )
+            ExtraScoreIds[TestScene] = [
+                Id
+                for Id in ExtraScoreIds[TestScene]
+                if (Id, TestScene.name) not in State.Scores
+            ]
+        print(
+            f"Resume from {JournalPath}: {len(State.Names)} names, {len(State.Scores)} scores"
+        )
+
+    Availability: Optional[AvailabilityStore] = (
+        AvailabilityStore(AvailabilityPath, RecheckInterval=AvailabilityRecheckInterval)
+        if AvailabilityPath
+        else None
+    )
+    Journal: Optional[CrawlJournal] = (
+        CrawlJournal(JournalPath, IsCpu, bResume) if JournalPath else None
+    )
+    DeadLetter: Optional[DeadLetterFile] = (
+        DeadLetterFile(DeadLetterPath, IsCpu, TestSceneList, bReplaceDeadLetter)
+        if DeadLetterPath
+        else None
+    )
+    # 启用延迟重试时减少立即重试的次数，失败的请求不再长时间占用线程
+    SetMaxAttempts(DEFERRED_MAX_ATTEMPTS if RetryPasses > 0 else DEFAULT_MAX_ATTEMPTS)
+
+    print("------------------------------------------")
+    print(f"Get {DEVICE} Name And Scores From ID ({len(IdList)} IDs)")
+    try:
+        yield from IterDeviceScores(
+            IsCpu,
+            TestSceneList,
+            IdList,
+            MaxWorkers,
+            Items=IdToDeviceInfo,
+            ExtraScoreIds=ExtraScoreIds,
+            Journal=Journal,
+            Gaps=Gaps,
+            Availability=Availability,
+            RetryPasses=RetryPasses,
+            RetryDelay=RetryDelay,
+            DeadLetter=DeadLetter,
+        )
+    except KeyboardInterrupt:
+        if Journal:
+            print(f"\n已中断，进度保存在 {JournalPath}，可选择恢复继续")
+        raise
+    finally:
+        if Journal:
+            Journal.Close()
+        if Gaps:
+            Gaps.Save()
+        if Availability:
+            Availability.Save()
+        if DeadLetter:
+            DeadLetter.Save()
+        SetMaxAttempts(DEFAULT_MAX_ATTEMPTS)
 
+
+def GetAllDeviceInfo(IsCpu: bool, TestSceneList: List[TESTSCENE_TYPE], *Args: int, **Kwargs) -> DATA_TYPE:
+    # 参数同 IterAllDeviceInfo，收集所有记录
+    DEVICE: str = "CPU" if IsCpu else "GPU"
+    IdToDeviceInfo: DATA_TYPE = dict(IterAllDeviceInfo(IsCpu, TestSceneList, *Args, **Kwargs))
+    print(f"Dense {DEVICE} ID ranges: {FormatRanges(GetDenseRanges(IdToDeviceInfo))}")
     return IdToDeviceInfo
 
 
-# 将dict转为dataframe，导出excel
-def ProcessData(Data: DATA_TYPE, IsCpu: bool) -> None:
-    if len(Data) == 0:
-        return
+def IncrementalUpdate(
+    OldData: DATA_TYPE,
+    IsCpu: bool,
+    TestSceneList: List[TESTSCENE_TYPE],
+    *Args: int,
+    MaxAge: float = DEFAULT_MAX_AGE,
+    FallbackTime: Optional[float] = None,
+    bReprobeGaps: bool = True,
+    MaxWorkers: int = os.cpu_count(),
+    bDiscoverIds: bool = False,
+    GapIndexPath: Optional[str] = None,
+    GapReverifyInterval: Optional[float] = DEFAULT_REVERIFY_INTERVAL,
+    AvailabilityPath: Optional[str] = None,
+    AvailabilityRecheckInterval: float = DEFAULT_RECHECK_INTERVAL,
+    RetryPasses: int = DEFAULT_RETRY_PASSES,
+    RetryDelay: float = DEFAULT_RETRY_DELAY,
+    DeadLetterPath: Optional[str] = None,
+) -> DATA_TYPE:
+    # 只查询新 id 的型号，只刷新缺失或过期的分数，结果与旧数据合并
+    MinId: int = 1
+    MaxId: int = max(max(OldData.keys(), default=0), 4000 if IsCpu else 2000)
+    if len(Args) > 0:
+        MinId = Args[0]
+    if len(Args) > 1:
+        MaxId = Args[1]
+    elif bDiscoverIds:
+        MaxId = max(
+            max(OldData.keys(), default=0),
+            DiscoverMaxId(IsCpu, MinId, MaxWorkers=MaxWorkers),
+        )
+
+    NewIdList = GetNewIds(OldData, MinId, MaxId, bReprobeGaps)
+    StaleIds = GetStaleIds(OldData, TestSceneList, MaxAge, FallbackTime)
+    print(f"New IDs to probe: {len(NewIdList)}")
+    for TestScene in TestSceneList:
+        print(f"Stale {TestScene.value[2]}: {len(StaleIds[TestScene])}")
+
+    return GetAllDeviceInfo(
+        IsCpu,
+        TestSceneList,
+        MaxWorkers=MaxWorkers,
+        IdList=NewIdList,
+        BaseData=OldData,
+        StaleIds=StaleIds,
+        GapIndexPath=GapIndexPath,
+        GapReverifyInterval=GapReverifyInterval,
+        AvailabilityPath=AvailabilityPath,
+        AvailabilityRecheckInterval=AvailabilityRecheckInterval,
+        RetryPasses=RetryPasses,
+        RetryDelay=RetryDelay,
+        DeadLetterPath=DeadLetterPath,
+    )
+
+
+def ReplayDeadLetters(Letters: DeadLetters, BaseData: DATA_TYPE, **Kwargs) -> DATA_TYPE:
+    # 重新请求死信文件中的请求：查询型号失败的 id，以及不在 BaseData 中的设备，重新查询型号和全部测试项目；
+    # 其余设备只重新请求失败的测试项目。其他参数同 IterAllDeviceInfo
+    NameIds: Dict[int, None] = dict.fromkeys(Letters.NameIds)
+    StaleIds: Dict[TESTSCENE_TYPE, List[int]] = {}
+    for TestScene, Ids in Letters.ScoreIds.items():
+        for Id in Ids:
+            if Id in BaseData:
+                StaleIds.setdefault(TestScene, []).append(Id)
+            else:
+                NameIds[Id] = None
+    print(
+        f"Replay {len(NameIds)} devices and {sum(len(Ids) for Ids in StaleIds.values())} scores"
+    )
+    return GetAllDeviceInfo(
+        Letters.IsCpu,
+        Letters.TestSceneList,
+        IdList=sorted(NameIds),
+        BaseData=BaseData,
+        StaleIds=StaleIds,
+        **Kwargs,
+    )
+
+
+SCORE_DTYPE: str = "int32"
+
 
-    Df = pd.DataFrame(Data.values())
+# 将dict转为dataframe（已经是 DataFrame 时直接使用，如 MergeDatasets 的结果）
+def BuildDataFrame(Data, IsCpu: bool):
+    import pandas as pd
+
+    Df = Data if isinstance(Data, pd.DataFrame) else pd.DataFrame.from_records(list(Data.values()))
+    # 获取时间只用于增量更新，不导出
+    Df = Df.drop(
+        columns=[Column for Column in Df.columns if Column.startswith(UPDATE_TIME_PREFIX)]
+    )
 
     COL_NAME = "CPU Name" if IsCpu else "GPU Name"
     COL_NAME_GUID = f"{COL_NAME} GUID"
@@ -134,44 +344,145 @@ def ProcessData(Data: DATA_TYPE, IsCpu: bool) -> None:
     GUID_CLASS = CPUName if IsCpu else GPUName
 
     # 剔除名字为空
-    Df = Df[Df[COL_NAME] != ""]
-    # 数据转为int
-    Df[COL_ID] = Df[COL_ID].astype(int)
-
-    Df[COL_MAINSCORE] = Df[COL_MAINSCORE].astype(int)
+    Df = Df[Df[COL_NAME].fillna("") != ""]
+    # 数据转为 int32，合并的数据中缺少的测试项目记为 -1
+    Df = Df.astype({COL_ID: SCORE_DTYPE})
+    Df[COL_SCORES] = Df[COL_SCORES].fillna(-1).astype(SCORE_DTYPE)
     # 剔除分数过低数据
     Df = Df[Df[COL_MAINSCORE] >= SCORE_LIMIT]
-    # 根据Name生成GUID
-    Df[COL_NAME_GUID] = Df[COL_NAME].apply(GUID_CLASS)
+
+    # 向量化规范化型号名后去重，每个不同的型号只解析一次，再按编码映射回每一行
+    NormalizedNames = (
+        Df[COL_NAME]
+        .str.upper()
+        .str.replace("(R)", "", regex=False)
+        .str.replace("(TM)", "", regex=False)
+        .str.replace(SPECIAL_CHAR_PATTERN, "", regex=True)
+    )
+    Codes, UniqueNames = pd.factorize(NormalizedNames)
+    Parsed = GUID_CLASS.ParseMany(UniqueNames)
+
+    def ToColumn(Values: List[str]) -> pd.Categorical:
+        # 每个不同型号对应的值 -> 每一行的值，结果为 category 类型
+        ValueCodes, UniqueValues = pd.factorize(pd.Index(Values))
+        return pd.Categorical.from_codes(ValueCodes[Codes], categories=UniqueValues)
+
+    Df[COL_NAME_GUID] = ToColumn([repr(Obj) for Obj in Parsed])
     # 新增 Vendor，Model 列
-    VendorSeries = Df[COL_NAME_GUID].apply(lambda Obj: Obj.Vendor)
-    Df.insert(Df.columns.get_loc(COL_NAME), COL_VENDOR, VendorSeries)
-    ModelSeries = Df[COL_NAME_GUID].apply(lambda Obj: Obj.Model)
-    Df.insert(Df.columns.get_loc(COL_NAME), COL_MODEL, ModelSeries)
+    Df.insert(
+        Df.columns.get_loc(COL_NAME), COL_VENDOR, ToColumn([Obj.Vendor for Obj in Parsed])
+    )
+    Df.insert(
+        Df.columns.get_loc(COL_NAME), COL_MODEL, ToColumn([Obj.Model for Obj in Parsed])
+    )
     # 根据 Score 排序
-    Df.sort_values(COL_MAINSCORE, ascending=False, inplace=True)
+    Df.sort_values(COL_MAINSCORE, ascending=False, inplace=True, kind="stable")
     Df.reset_index(drop=True, inplace=True)
+    return Df
+
 
-    # 将dataframe写入excel
-    with pd.ExcelWriter(
-        ChoseAFileToSave(
-            InitialFile=f"3DMark_{'CPU' if IsCpu else 'GPU'}ScoreData.xlsx"
-        ),
-        engine="openpyxl",
-    ) as w:
-        Df.to_excel(w, sheet_name="Sheet1", index=False)
+# 将dict转为dataframe，导出excel
+def ProcessData(
+    Data,
+    IsCpu: bool,
+    OutputPath: Optional[str] = None,
+    Format: Optional[str] = None,
+    bPerSceneSheets: bool = False,
+    bDedup: bool = False,
+) -> None:
+    # Data 为 dict 或 MergeDatasets 得到的 DataFrame；OutputPath 为空时弹出保存对话框；Format 为空时按扩展名选择导出格式
+    # bDedup: 额外导出同型号多个 id 合并后的表
+    if len(Data) == 0:
+        return
+
+    Df = BuildDataFrame(Data, IsCpu)
+    DedupDf = BuildDedupDataFrame(Df, IsCpu) if bDedup else None
+
+    # 将dataframe导出（xlsx/csv/parquet/feather）
+    if not OutputPath:
+        from Helper.File import ChoseAFileToSave
+
+        OutputPath = ChoseAFileToSave(
+            FileTypes=EXPORT_FILE_TYPES,
+            InitialFile=f"3DMark_{'CPU' if IsCpu else 'GPU'}ScoreData.xlsx",
+        )
+    ExportDataFrame(Df, OutputPath, Format, bPerSceneSheets, DedupDf)
 
     print(Df)
+    if DedupDf is not None:
+        print(f"{len(Df)} rows -> {len(DedupDf)} rows after merging variant IDs")
+
+
+def AskStateFiles() -> Dict[str, Optional[str]]:
+    # 跨次爬取保存的状态文件，默认不使用；返回爬取函数的参数
+    import questionary
+
+    bGapIndex: bool = questionary.confirm(
+        message=f"跳过之前已确认没有设备的 id（记录在 {DEFAULT_GAP_INDEX_PATH}，{DEFAULT_REVERIFY_INTERVAL / 86400:g} 天后重新确认）？",
+        default=False,
+    ).ask()
+    bAvailability: bool = questionary.confirm(
+        message=f"跳过之前连续多次没有分数的 (设备, 测试项目)（记录在 {DEFAULT_AVAILABILITY_PATH}，跳过的分数记为 {SKIPPED_SCORE}）？",
+        default=False,
+    ).ask()
+    return {
+        "GapIndexPath": DEFAULT_GAP_INDEX_PATH if bGapIndex else None,
+        "AvailabilityPath": DEFAULT_AVAILABILITY_PATH if bAvailability else None,
+    }
+
+
+def AskTestSceneList(
+    IsCpu: bool, CheckedScenes: Optional[List[TESTSCENE_TYPE]] = None
+) -> List[TESTSCENE_TYPE]:
+    import questionary
+
+    TestSceneList: List[TESTSCENE_TYPE] = questionary.checkbox(
+        message="选择测试项目（可多选）：\n",
+        choices=[
+            questionary.Choice(
+                title=Test.value[2],
+                value=Test,
+                checked=Test in CheckedScenes if CheckedScenes else Index == 0,
+            )
+            for Index, Test in enumerate(CPU_TESTSCENE if IsCpu else GPU_TESTSCENE)
+        ],
+    ).ask()
+
+    if len(TestSceneList) != 0:
+        print("所选测试项目：")
+        for TestScene in TestSceneList:
+            print(TestScene.value[2])
+    return TestSceneList
+
+
+def SaveData(Data: DATA_TYPE, IsCpu: bool, TestSceneList: List[TESTSCENE_TYPE]) -> str:
+    from Helper.File import ChoseAFileToSave
+
+    InitialJsonFile = f"{'CPU' if IsCpu else 'GPU'}_{'_'.join([TestScene.name for TestScene in TestSceneList])}.json"
+    SavePath = ChoseAFileToSave(
+        FileTypes=DATASET_FILE_TYPES,
+        DefaultExtension=".json",
+        InitialFile=InitialJsonFile,
+        bForce=False,
+    )
+    if SavePath:
+        SaveDataset(Data, SavePath)
+    return SavePath
 
 
 def Main() -> None:
+    import questionary
+    from Helper.File import ChoseAFileToOpen, ChoseFilesToOpen
+
     Mode = questionary.select(
         message="选择模式：\n"
         + "1) 全量更新，从3dmark爬取数据，保存到本地（json格式），然后处理数据导出Excel\n"
-        + "2) 从本地的json文件中读取数据，处理数据导出Excel\n",
+        + "2) 从本地的数据文件（json/arrow）中读取数据，处理数据导出Excel\n"
+        + "3) 增量更新，读取之前的json文件，只爬取新设备和过期/缺失的分数，合并后导出\n",
         choices=[
             "1) 全量更新",
             "2) 处理本地数据",
+            "3) 增量更新",
         ],
         show_selected=True,
     ).ask()
@@ -186,56 +497,125 @@ def Main() -> None:
         ).ask()
         IsCpu: bool = "CPU" in Device
 
-        TestSceneList: List[TESTSCENE_TYPE] = questionary.checkbox(
-            message="选择测试项目（可多选）：\n",
-            choices=[
-                questionary.Choice(title=Test.value[2], value=Test, checked=Index == 0)
-                for Index, Test in enumerate(CPU_TESTSCENE if IsCpu else GPU_TESTSCENE)
-            ],
-        ).ask()
-
+        TestSceneList: List[TESTSCENE_TYPE] = AskTestSceneList(IsCpu)
         if len(TestSceneList) == 0:
             print(f"没有选择任何测试项目")
             return
 
-        print("所选测试项目：")
-        for TestScene in TestSceneList:
-            print(TestScene.value[2])
+        Engine: str = questionary.select(
+            message="选择爬取引擎：\n",
+            choices=["1) 线程池", "2) asyncio（需要 httpx）"],
+            show_selected=True,
+        ).ask()
+
+        CacheMode: str = questionary.select(
+            message="本地响应缓存：\n",
+            choices=["1) 不使用缓存", "2) 使用缓存", "3) 仅使用缓存（离线）"],
+            show_selected=True,
+        ).ask()
+        if "1)" not in CacheMode:
+            SetCache(ResponseCache(bOffline="3)" in CacheMode))
+
+        bDiscoverIds: bool = questionary.confirm(
+            message="自动探测ID范围（否则使用固定的 1~4000 / 1~2000）？",
+            default=True,
+        ).ask()
+        StateFiles = AskStateFiles()
 
         StartTime = time.time()
-        Data = GetAllDeviceInfo(IsCpu, TestSceneList)
+        if "asyncio" in Engine:
+            from Helper.AsyncCrawler import GetAllDeviceInfoAsync
+
+            Data = GetAllDeviceInfoAsync(
+                IsCpu, TestSceneList, bDiscoverIds=bDiscoverIds, **StateFiles
+            )
+        else:
+            # 线程池引擎会把进度写入日志，中断后可以恢复
+            JournalPath: str = GetJournalPath(IsCpu, TestSceneList)
+            bResume: bool = os.path.exists(JournalPath) and questionary.confirm(
+                message=f"发现未完成的日志 {JournalPath}，是否从中恢复？",
+                default=True,
+            ).ask()
+            Data = GetAllDeviceInfo(
+                IsCpu,
+                TestSceneList,
+                bDiscoverIds=bDiscoverIds,
+                JournalPath=JournalPath,
+                bResume=bResume,
+                **StateFiles,
+            )
         print(f"\nTotal time:{time.time() - StartTime:.2f}s")
 
-        InitialJsonFile = f"{'CPU' if IsCpu else 'GPU'}_{'_'.join([TestScene.name for TestScene in TestSceneList])}.json"
-        SavePath = ChoseAFileToSave(
-            FileTypes=[("Json File", ".json")],
-            DefaultExtension=".json",
-            InitialFile=InitialJsonFile,
-            bForce=False,
-        )
-        if SavePath:
-            with open(SavePath, "w", encoding="utf-8") as File:
-                json.dump(Data, File)
+        SavePath: str = SaveData(Data, IsCpu, TestSceneList)
+        # 数据已完整保存，日志不再需要
+        if SavePath and "asyncio" not in Engine and os.path.exists(JournalPath):
+            os.remove(JournalPath)
 
     elif "2)" in Mode:
         # 将多个文件读入
-        DataList: List[DATA_TYPE] = []
-        Files: Tuple[str] = ChoseFilesToOpen(
-            FileTypes=[("Json File", ".json")], bForce=False
-        )
+        Files: Tuple[str] = ChoseFilesToOpen(FileTypes=DATASET_FILE_TYPES, bForce=False)
         if not Files:
             return
-        for FilePath in Files:
-            with open(FilePath, "r", encoding="utf-8") as File:
-                DataList.append(json.load(File))
 
-        # 将数据合并到一个dict中
-        Data = dict()
-        for TempData in DataList:
-            Data.update(TempData)
+        Policy: str = "newest"
+        if len(Files) > 1:
+            Policy = questionary.select(
+                message="同一设备同一测试项目在多个文件中都有分数时：\n",
+                choices=[
+                    questionary.Choice("1) 取最新获取的分数", "newest"),
+                    questionary.Choice("2) 取最大的分数", "max"),
+                    questionary.Choice("3) 只填补缺失的分数（先选的文件优先）", "nonmissing"),
+                ],
+                show_selected=True,
+            ).ask()
+
+        # 按 (设备, 测试项目) 合并到一个 DataFrame 中
+        Data = MergeDatasets(Files, Policy)
+        if len(Data) == 0:
+            return
+
+        IsCpu = "CPU Name" in Data.columns
+
+    elif "3)" in Mode:
+        FilePath: str = ChoseAFileToOpen(
+            FileTypes=DATASET_FILE_TYPES, bForce=False
+        )
+        if not FilePath:
+            return
+        OldData: DATA_TYPE = LoadDataset(FilePath)
+        if len(OldData) == 0:
+            print("旧数据为空，请使用全量更新")
+            return
+        IsCpu = "CPU Name" in next(iter(OldData.values()))
+
+        # 默认勾选旧数据中已有的测试项目
+        TestSceneList: List[TESTSCENE_TYPE] = AskTestSceneList(
+            IsCpu, GetTestScenesInData(OldData, IsCpu)
+        )
+        if len(TestSceneList) == 0:
+            print(f"没有选择任何测试项目")
+            return
+
+        MaxAgeDays: str = questionary.text(
+            message="分数超过多少天视为过期？",
+            default=f"{DEFAULT_MAX_AGE / 86400:g}",
+            validate=lambda Text: Text.replace(".", "", 1).isdigit(),
+        ).ask()
+        StateFiles = AskStateFiles()
+
+        StartTime = time.time()
+        Data = IncrementalUpdate(
+            OldData,
+            IsCpu,
+            TestSceneList,
+            MaxAge=float(MaxAgeDays) * 86400,
+            # 旧数据没有记录获取时间时，以文件修改时间为准
+            FallbackTime=os.path.getmtime(FilePath),
+            **StateFiles,
+        )
+        print(f"\nTotal time:{time.time() - StartTime:.2f}s")
 
-        Value = next(iter(Data.values()))
-        IsCpu = "CPU Name" in Value
+        SaveData(Data, IsCpu, TestSceneList)
 
     else:
         print("输入错误！\nInvalid input!\n")
@@ -244,5 +624,599 @@ def Main() -> None:
     ProcessData(Data, IsCpu)
 
 
+def GetTestSceneList(IsCpu: bool, SceneNames: Optional[List[str]]) -> List[TESTSCENE_TYPE]:
+    # 按 CPU_TESTSCENE / GPU_TESTSCENE 的成员名选择测试项目，默认只选第一个
+    SceneEnum = CPU_TESTSCENE if IsCpu else GPU_TESTSCENE
+    if not SceneNames:
+        return [next(iter(SceneEnum))]
+    if SceneNames == ["all"]:
+        return list(SceneEnum)
+    UnknownNames = [Name for Name in SceneNames if Name not in SceneEnum.__members__]
+    if UnknownNames:
+        raise SystemExit(
+            f"未知的测试项目：{', '.join(UnknownNames)}\n可选：{', '.join(SceneEnum.__members__)}"
+        )
+    return [SceneEnum[Name] for Name in SceneNames]
+
+
+def GetTestScenesInData(Data: DATA_TYPE, IsCpu: bool) -> List[TESTSCENE_TYPE]:
+    # 数据中已有的测试项目，按 CPU_TESTSCENE / GPU_TESTSCENE 中的顺序
+    Columns = set().union(*(Item.keys() for Item in Data.values()))
+    return [
+        TestScene
+        for TestScene in (CPU_TESTSCENE if IsCpu else GPU_TESTSCENE)
+        if TestScene.value[2] in Columns
+    ]
+
+
+def GetDefaultOutputPath(IsCpu: bool) -> str:
+    # 没有指定任何输出时的数据文件，带时间戳，不会覆盖之前的结果
+    return f"{'CPU' if IsCpu else 'GPU'}_{time.strftime('%Y%m%d-%H%M%S')}.json"
+
+
+def ParseArgs(Argv: List[str]) -> argparse.Namespace:
+    Parser = argparse.ArgumentParser(
+        prog="Main.py", description="3DMark 跑分爬取工具（不带参数运行时进入交互模式）"
+    )
+    SubParsers = Parser.add_subparsers(dest="Command", required=True)
+
+    def AddCrawlArguments(SubParser: argparse.ArgumentParser) -> None:
+        SubParser.add_argument(
+            "--scenes",
+            nargs="+",
+            dest="Scenes",
+            metavar="SCENE",
+            help="CPU_TESTSCENE/GPU_TESTSCENE 成员名，如 TimeSpy PortRoyal；all 表示全部（crawl 默认为第一个，update 默认为数据中已有的测试项目）",
+        )
+        SubParser.add_argument("--min-id", dest="MinId", type=int, default=1)
+        SubParser.add_argument("--max-id", dest="MaxId", type=int)
+        SubParser.add_argument(
+            "--discover", dest="bDiscoverIds", action="store_true", help="自动探测ID上界"
+        )
+        SubParser.add_argument(
+            "--workers",
+            dest="Workers",
+            type=int,
+            help="线程数，asyncio 引擎中为并发数（默认：线程池为 CPU 核数，asyncio 为 256）",
+        )
+        SubParser.add_argument(
+            "--pool-size",
+            dest="PoolSize",
+            type=int,
+            help="HTTP 连接池大小（线程池引擎），默认不小于线程数",
+        )
+        SubParser.add_argument(
+            "--cache",
+            dest="Cache",
+            choices=["off", "on", "offline"],
+            default="off",
+            help="本地响应缓存（offline 为只读缓存，不访问网络）",
+        )
+        SubParser.add_argument("--cache-path", dest="CachePath", default=None)
+        SubParser.add_argument(
+            "--no-rate-control", dest="bRateControl", action="store_false"
+        )
+        SubParser.add_argument(
+            "--base-url", dest="BaseUrl", help="接口地址，默认 https://www.3dmark.com"
+        )
+        SubParser.add_argument(
+            "--gap-index",
+            dest="GapIndex",
+            nargs="?",
+            const=DEFAULT_GAP_INDEX_PATH,
+            metavar="PATH",
+            help=f"使用已确认没有设备的 id 索引，查询型号时跳过这些 id（默认不使用，不指定路径时为 {DEFAULT_GAP_INDEX_PATH}）",
+        )
+        SubParser.add_argument(
+            "--no-gap-index", dest="GapIndex", action="store_const", const=None
+        )
+        SubParser.add_argument(
+            "--gap-reverify-days",
+            dest="GapReverifyDays",
+            type=float,
+            default=DEFAULT_REVERIFY_INTERVAL / 86400,
+            help="空 id 超过多少天后重新确认",
+        )
+        SubParser.add_argument(
+            "--availability",
+            dest="Availability",
+            nargs="?",
+            const=DEFAULT_AVAILABILITY_PATH,
+            metavar="PATH",
+            help=f"记录多次没有分数的 (设备, 测试项目)，这些组合按较慢的周期重新请求，跳过的分数记为 {SKIPPED_SCORE}（默认不使用，不指定路径时为 {DEFAULT_AVAILABILITY_PATH}）",
+        )
+        SubParser.add_argument(
+            "--no-availability", dest="Availability", action="store_const", const=None
+        )
+        SubParser.add_argument(
+            "--availability-recheck-days",
+            dest="AvailabilityRecheckDays",
+            type=float,
+            default=DEFAULT_RECHECK_INTERVAL / 86400,
+        )
+        SubParser.add_argument(
+            "--retry-passes",
+            dest="RetryPasses",
+            type=int,
+            default=DEFAULT_RETRY_PASSES,
+            help="失败的请求在主循环结束后延迟重试的轮数，0 为不延迟重试",
+        )
+        SubParser.add_argument(
+            "--retry-delay",
+            dest="RetryDelay",
+            type=float,
+            default=DEFAULT_RETRY_DELAY,
+            help="第一轮延迟重试前等待的秒数，之后每轮翻倍",
+        )
+        SubParser.add_argument(
+            "--dead-letter",
+            dest="DeadLetter",
+            metavar="PATH",
+            help="重试后仍然失败的请求追加写入该文件（默认 CPU/GPU.deadletter.jsonl），之后用 replay 重新请求",
+        )
+        SubParser.add_argument(
+            "--no-dead-letter", dest="DeadLetter", action="store_const", const=""
+        )
+        SubParser.add_argument(
+            "--hedge",
+            dest="bHedge",
+            action="store_true",
+            help="对冲查询分数的请求：超过最近延迟的分位数仍未返回时再发一个相同的请求（线程池引擎）",
+        )
+        SubParser.add_argument(
+            "--hedge-quantile", dest="HedgeQuantile", type=float, default=DEFAULT_HEDGE_QUANTILE
+        )
+        SubParser.add_argument(
+            "--hedge-budget",
+            dest="HedgeBudget",
+            type=float,
+            default=DEFAULT_HEDGE_BUDGET,
+            help="对冲请求数占请求总数的上限",
+        )
+        SubParser.add_argument(
+            "--history",
+            dest="History",
+            metavar="PATH",
+            help=f"把结果作为一个快照写入历史数据库（如 {DEFAULT_HISTORY_PATH}）",
+        )
+        SubParser.add_argument(
+            "--metrics",
+            dest="Metrics",
+            metavar="PATH",
+            help="结束时写出请求统计（json 汇总，同名 .prom 为 Prometheus 文本格式）",
+        )
+        SubParser.add_argument(
+            "--profile", dest="Profile", metavar="PATH", help="写出 cProfile 结果（pstats 格式）"
+        )
+        SubParser.add_argument(
+            "--output",
+            "-o",
+            dest="Output",
+            help="数据输出路径（.json 或 .arrow）；没有指定任何输出时为带时间戳的 CPU/GPU_<时间>.json",
+        )
+        AddExportArguments(SubParser, bRequired=False)
+
+    def AddExportArguments(SubParser: argparse.ArgumentParser, bRequired: bool) -> None:
+        SubParser.add_argument(
+            "--excel",
+            "--export",
+            dest="Excel",
+            required=bRequired,
+            help="导出路径，按扩展名选择格式（xlsx/csv/parquet/feather）",
+        )
+        SubParser.add_argument(
+            "--format", dest="Format", choices=EXPORT_FORMATS, help="覆盖按扩展名判断的导出格式"
+        )
+        SubParser.add_argument(
+            "--per-scene-sheets",
+            dest="bPerSceneSheets",
+            action="store_true",
+            help="xlsx 中每个测试项目额外输出一张表",
+        )
+        SubParser.add_argument(
+            "--dedup",
+            dest="bDedup",
+            action="store_true",
+            help="额外导出同型号合并后的表（各 id 分数取中位数），xlsx 中为 Dedup 表，其他格式为 .dedup 文件",
+        )
+
+    Crawl = SubParsers.add_parser("crawl", help="全量爬取")
+    Crawl.add_argument("--device", dest="Device", choices=["cpu", "gpu"], required=True)
+    Crawl.add_argument(
+        "--engine", dest="Engine", choices=["thread", "async"], default="thread"
+    )
+    Crawl.add_argument("--journal", dest="Journal", help="进度日志路径（线程池引擎）")
+    Crawl.add_argument(
+        "--resume", dest="bResume", action="store_true", help="从进度日志恢复"
+    )
+    Crawl.add_argument(
+        "--shard",
+        dest="Shard",
+        type=ParseShard,
+        metavar="I/N",
+        help="只爬取 N 个分片中的第 I 个（从 0 开始），结果与 manifest 一起保存，之后用 merge-shards 合并",
+    )
+    Crawl.add_argument(
+        "--shard-by", dest="ShardBy", choices=SHARD_MODES, default="ids", help="按 id 或测试项目分片"
+    )
+    AddCrawlArguments(Crawl)
+
+    Update = SubParsers.add_parser("update", help="增量更新")
+    Update.add_argument("--input", "-i", dest="Input", required=True)
+    Update.add_argument(
+        "--max-age-days", dest="MaxAgeDays", type=float, default=DEFAULT_MAX_AGE / 86400
+    )
+    Update.add_argument(
+        "--no-reprobe-gaps",
+        dest="bReprobeGaps",
+        action="store_false",
+        help="不重新查询已知范围内的空缺ID",
+    )
+    AddCrawlArguments(Update)
+
+    Replay = SubParsers.add_parser("replay", help="重新请求死信文件中失败的请求")
+    Replay.add_argument(
+        "--input",
+        "-i",
+        dest="Input",
+        required=True,
+        help="死信文件，仍然失败的请求写回该文件，全部成功时删除",
+    )
+    Replay.add_argument("--data", dest="Data", help="已有数据，结果合并到其中")
+    AddCrawlArguments(Replay)
+
+    Convert = SubParsers.add_parser("convert", help="json 与 Arrow 列式数据文件互相转换")
+    Convert.add_argument("--input", "-i", dest="Input", required=True)
+    Convert.add_argument(
+        "--output", "-o", dest="Output", required=True, help="按扩展名选择格式（.json/.arrow）"
+    )
+
+    Process = SubParsers.add_parser("process", help="处理本地数据")
+    Process.add_argument("--input", "-i", dest="Input", nargs="+", required=True)
+    Process.add_argument(
+        "--merge-policy",
+        dest="MergePolicy",
+        choices=MERGE_POLICIES,
+        default="newest",
+        help="多个文件中同一设备同一测试项目的取值方式",
+    )
+    AddExportArguments(Process, bRequired=True)
+
+    MergeShardsParser = SubParsers.add_parser("merge-shards", help="合并分片爬取的结果")
+    MergeShardsParser.add_argument(
+        "--input", "-i", dest="Input", nargs="+", required=True, help="分片数据文件或 manifest"
+    )
+    MergeShardsParser.add_argument(
+        "--output", "-o", dest="Output", help="数据输出路径（.json 或 .arrow）"
+    )
+    AddExportArguments(MergeShardsParser, bRequired=False)
+
+    History = SubParsers.add_parser("history", help="导入或查询历史快照")
+    History.add_argument("--db", dest="Db", default=DEFAULT_HISTORY_PATH)
+    History.add_argument(
+        "--import",
+        dest="Import",
+        nargs="+",
+        metavar="FILE",
+        help="把已有的数据文件导入为快照，快照时间为文件修改时间",
+    )
+    History.add_argument("--device", dest="Device", choices=["cpu", "gpu"])
+    History.add_argument("--list", dest="bList", action="store_true", help="列出所有快照")
+    History.add_argument(
+        "--latest", dest="bLatest", action="store_true", help="最新快照中的所有设备"
+    )
+    History.add_argument("--id", dest="Ids", type=int, nargs="+")
+    History.add_argument("--name", dest="Name", help="型号名，支持 SQL LIKE 通配符，如 %%4090%%")
+    History.add_argument("--scenes", nargs="+", dest="Scenes", metavar="SCENE")
+    History.add_argument("--since-days", dest="SinceDays", type=float)
+    History.add_argument("--export", "--excel", dest="Excel", help="查询结果的导出路径")
+
+    Serve = SubParsers.add_parser("serve", help="本地 HTTP/JSON 查询服务")
+    Serve.add_argument(
+        "--data",
+        dest="Data",
+        nargs="+",
+        required=True,
+        metavar="PATTERN",
+        help="数据文件路径或通配符（如 'GPU_*.json'），使用匹配到的最新文件，文件更新时自动重新加载",
+    )
+    Serve.add_argument("--host", dest="Host", default="127.0.0.1")
+    Serve.add_argument("--port", dest="Port", type=int, default=DEFAULT_LOOKUP_PORT)
+    Serve.add_argument(
+        "--reload-interval",
+        dest="ReloadInterval",
+        type=float,
+        default=DEFAULT_RELOAD_INTERVAL,
+        help="检查数据文件更新的间隔（秒）",
+    )
+
+    return Parser.parse_args(Argv)
+
+
+def RunHistoryCommand(Args: argparse.Namespace) -> None:
+    with HistoryStore(Args.Db) as Store:
+        for FilePath in Args.Import or []:
+            Data = LoadDataset(FilePath)
+            if len(Data) == 0:
+                continue
+            IsCpu = "CPU Name" in next(iter(Data.values()))
+            Snapshot = Store.AddSnapshot(
+                Data, IsCpu, os.path.getmtime(FilePath), os.path.basename(FilePath)
+            )
+            print(f"Imported {FilePath} as snapshot {Snapshot}")
+
+        if Args.bList:
+            Df = Store.ListSnapshots()
+        elif Args.Device:
+            IsCpu = Args.Device == "cpu"
+            TestSceneList = GetTestSceneList(IsCpu, Args.Scenes) if Args.Scenes else None
+            if Args.bLatest:
+                Df = Store.GetLatestSnapshot(IsCpu, TestSceneList)
+            else:
+                Df = Store.GetTimeSeries(
+                    IsCpu,
+                    Ids=Args.Ids,
+                    NamePattern=Args.Name,
+                    TestSceneList=TestSceneList,
+                    Since=time.time() - Args.SinceDays * 86400 if Args.SinceDays else None,
+                )
+        else:
+            return
+
+    if Args.Excel:
+        ExportDataFrame(Df, Args.Excel)
+    else:
+        print(Df.to_string(index=False))
+
+
+def GetDeadLetterPathArg(Args: argparse.Namespace, IsCpu: bool) -> Optional[str]:
+    # 未指定时使用默认路径，--no-dead-letter 时为 None
+    if Args.DeadLetter is None:
+        return GetDeadLetterPath(IsCpu)
+    return Args.DeadLetter or None
+
+
+def RunServeCommand(Args: argparse.Namespace) -> None:
+    Service = LookupService(Args.Data, Args.ReloadInterval)
+    if not Service.Indexes:
+        raise SystemExit(f"没有找到数据文件：{' '.join(Args.Data)}")
+    Server, BaseUrl = StartLookupServer(Service, Args.Host, Args.Port)
+    Service.StartWatching()
+    print(f"Lookup service listening on {BaseUrl}")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        Service.StopWatching()
+        Server.shutdown()
+
+
+def RunCommand(Args: argparse.Namespace) -> None:
+    if Args.Command == "convert":
+        ConvertDataset(Args.Input, Args.Output)
+        return
+
+    if Args.Command == "process":
+        Data = MergeDatasets(Args.Input, Args.MergePolicy)
+        if len(Data) == 0:
+            return
+        ProcessData(
+            Data,
+            "CPU Name" in Data.columns,
+            Args.Excel,
+            Args.Format,
+            Args.bPerSceneSheets,
+            Args.bDedup,
+        )
+        return
+
+    if Args.Command == "history":
+        RunHistoryCommand(Args)
+        return
+
+    if Args.Command == "serve":
+        RunServeCommand(Args)
+        return
+
+    if Args.Command == "merge-shards":
+        Data, IsCpu = MergeShards(Args.Input)
+        print(f"Merged {len(Args.Input)} shards: {len(Data)} devices")
+        if Args.Output:
+            SaveDataset(Data, Args.Output)
+        if Args.Excel:
+            ProcessData(
+                Data, IsCpu, Args.Excel, Args.Format, Args.bPerSceneSheets, Args.bDedup
+            )
+        return
+
+    if Args.BaseUrl:
+        SetBaseUrl(Args.BaseUrl)
+    if Args.PoolSize:
+        ConfigureSession(PoolMaxSize=Args.PoolSize)
+    if Args.Cache != "off":
+        CacheArgs = {"Path": Args.CachePath} if Args.CachePath else {}
+        SetCache(ResponseCache(bOffline=Args.Cache == "offline", **CacheArgs))
+    IdRange = (Args.MinId, Args.MaxId) if Args.MaxId else (Args.MinId,)
+    if Args.Metrics:
+        SetMetrics(CrawlMetrics())
+    # 未指定 --workers 时 asyncio 引擎使用自己的默认并发数，其他情况为 CPU 核数
+    bAsync: bool = Args.Command == "crawl" and Args.Engine == "async"
+    if not bAsync:
+        Args.Workers = Args.Workers or os.cpu_count()
+    if Args.bHedge and not bAsync:
+        SetHedger(Hedger(Args.HedgeQuantile, Args.HedgeBudget, Args.Workers))
+    if Args.Profile:
+        import cProfile
+
+        Profiler = cProfile.Profile()
+        Profiler.enable()
+
+    StartTime = time.time()
+    if Args.Command == "crawl" and not (Args.Output or Args.Excel or Args.History or Args.Shard):
+        # 没有指定任何输出时保存到带时间戳的 json，爬取结果不会丢失
+        Args.Output = GetDefaultOutputPath(Args.Device == "cpu")
+        print(f"No output specified, data will be saved to {Args.Output}")
+    # crawl 只输出 json 文件时不需要完整的数据
+    bStreamOutput: bool = (
+        Args.Command == "crawl"
+        and not bAsync
+        and bool(Args.Output)
+        and not IsArrowFile(Args.Output)
+        and not (Args.Excel or Args.History or Args.Shard)
+    )
+    if Args.Command == "crawl":
+        IsCpu = Args.Device == "cpu"
+        AllTestSceneList = TestSceneList = GetTestSceneList(IsCpu, Args.Scenes)
+        # 按 id 分片时交给爬取函数过滤 id，按测试项目分片时在这里挑出本分片的测试项目
+        IdShard = Args.Shard if Args.Shard and Args.ShardBy == "ids" else None
+        if Args.Shard and Args.ShardBy == "scenes":
+            TestSceneList = GetShardScenes(TestSceneList, *Args.Shard)
+            print(f"Shard {Args.Shard[0]}/{Args.Shard[1]}: {[TestScene.name for TestScene in TestSceneList]}")
+        if Args.Engine == "async":
+            from Helper.AsyncCrawler import GetAllDeviceInfoAsync
+
+            Data = GetAllDeviceInfoAsync(
+                IsCpu,
+                TestSceneList,
+                *IdRange,
+                Concurrency=Args.Workers,
+                bDiscoverIds=Args.bDiscoverIds,
+                bRateControl=Args.bRateControl,
+                GapIndexPath=Args.GapIndex,
+                GapReverifyInterval=Args.GapReverifyDays * 86400,
+                AvailabilityPath=Args.Availability,
+                AvailabilityRecheckInterval=Args.AvailabilityRecheckDays * 86400,
+                Shard=IdShard,
+                RetryPasses=Args.RetryPasses,
+                RetryDelay=Args.RetryDelay,
+                DeadLetterPath=GetDeadLetterPathArg(Args, IsCpu),
+            )
+        else:
+            CrawlArgs = dict(
+                MaxWorkers=Args.Workers,
+                bDiscoverIds=Args.bDiscoverIds,
+                JournalPath=Args.Journal,
+                bResume=Args.bResume,
+                bRateControl=Args.bRateControl,
+                GapIndexPath=Args.GapIndex,
+                GapReverifyInterval=Args.GapReverifyDays * 86400,
+                AvailabilityPath=Args.Availability,
+                AvailabilityRecheckInterval=Args.AvailabilityRecheckDays * 86400,
+                Shard=IdShard,
+                RetryPasses=Args.RetryPasses,
+                RetryDelay=Args.RetryDelay,
+                DeadLetterPath=GetDeadLetterPathArg(Args, IsCpu),
+            )
+            if bStreamOutput:
+                # 只输出 json 时边爬取边写入，内存中只保留在途的设备
+                Count = SaveJsonRecords(
+                    IterAllDeviceInfo(IsCpu, TestSceneList, *IdRange, **CrawlArgs), Args.Output
+                )
+                print(f"{Count} {'CPU' if IsCpu else 'GPU'} records streamed to {Args.Output}")
+            else:
+                Data = GetAllDeviceInfo(IsCpu, TestSceneList, *IdRange, **CrawlArgs)
+    elif Args.Command == "replay":
+        Letters = LoadDeadLetters(Args.Input)
+        IsCpu = Letters.IsCpu
+        Data = ReplayDeadLetters(
+            Letters,
+            LoadDataset(Args.Data) if Args.Data else {},
+            MaxWorkers=Args.Workers,
+            bRateControl=Args.bRateControl,
+            GapIndexPath=Args.GapIndex,
+            GapReverifyInterval=Args.GapReverifyDays * 86400,
+            AvailabilityPath=Args.Availability,
+            AvailabilityRecheckInterval=Args.AvailabilityRecheckDays * 86400,
+            RetryPasses=Args.RetryPasses,
+            RetryDelay=Args.RetryDelay,
+            DeadLetterPath=Args.Input,
+            bReplaceDeadLetter=True,
+        )
+    else:
+        OldData = LoadDataset(Args.Input)
+        if len(OldData) == 0:
+            print(f"{Args.Input} 为空，请使用 crawl")
+            return
+        IsCpu = "CPU Name" in next(iter(OldData.values()))
+        # 未指定 --scenes 时更新旧数据中已有的所有测试项目
+        TestSceneList = (
+            GetTestSceneList(IsCpu, Args.Scenes)
+            if Args.Scenes
+            else GetTestScenesInData(OldData, IsCpu) or GetTestSceneList(IsCpu, None)
+        )
+        print(f"Scenes: {[TestScene.name for TestScene in TestSceneList]}")
+        Data = IncrementalUpdate(
+            OldData,
+            IsCpu,
+            TestSceneList,
+            *IdRange,
+            MaxAge=Args.MaxAgeDays * 86400,
+            FallbackTime=os.path.getmtime(Args.Input),
+            bReprobeGaps=Args.bReprobeGaps,
+            MaxWorkers=Args.Workers,
+            bDiscoverIds=Args.bDiscoverIds,
+            GapIndexPath=Args.GapIndex,
+            GapReverifyInterval=Args.GapReverifyDays * 86400,
+            AvailabilityPath=Args.Availability,
+            AvailabilityRecheckInterval=Args.AvailabilityRecheckDays * 86400,
+            RetryPasses=Args.RetryPasses,
+            RetryDelay=Args.RetryDelay,
+            DeadLetterPath=GetDeadLetterPathArg(Args, IsCpu),
+        )
+    print(f"\nTotal time:{time.time() - StartTime:.2f}s")
+    if GetHedger() is not None:
+        print(GetHedger().FormatSummary(Args.Workers))
+        GetHedger().Close()
+    if Args.Profile:
+        Profiler.disable()
+        Profiler.dump_stats(Args.Profile)
+        print(f"Profile saved to {Args.Profile}")
+    if GetMetrics() is not None:
+        PromPath = GetMetrics().Save(Args.Metrics)
+        print(f"Metrics saved to {Args.Metrics} and {PromPath}")
+
+    if bStreamOutput:
+        return
+
+    if Args.History:
+        with HistoryStore(Args.History) as Store:
+            Snapshot = Store.AddSnapshot(Data, IsCpu, Source=Args.Command)
+        print(f"Snapshot {Snapshot} saved to {Args.History}")
+
+    if Args.Command == "crawl" and Args.Shard:
+        OutputPath = Args.Output or GetDefaultShardPath(IsCpu, *Args.Shard)
+        ManifestPath = SaveShard(
+            Data,
+            OutputPath,
+            IsCpu,
+            *Args.Shard,
+            Args.ShardBy,
+            TestSceneList,
+            AllTestSceneList,
+            Args.MinId,
+            Args.MaxId,
+            StartTime,
+        )
+        print(f"Shard saved to {OutputPath} ({ManifestPath})")
+    elif Args.Output or not (Args.Excel or Args.History):
+        # update / replay 没有指定任何输出时同样保存到带时间戳的 json
+        OutputPath = Args.Output or GetDefaultOutputPath(IsCpu)
+        SaveDataset(Data, OutputPath)
+        if not Args.Output:
+            print(f"Data saved to {OutputPath}")
+    if Args.Excel:
+        ProcessData(
+            Data, IsCpu, Args.Excel, Args.Format, Args.bPerSceneSheets, Args.bDedup
+        )
+
+
 if __name__ == "__main__":
-    Main()
+    try:
+        if len(sys.argv) > 1:
+            RunCommand(ParseArgs(sys.argv[1:]))
+        else:
+            Main()
+    finally:
+        # 响应缓存分批提交，退出前提交剩余的写入
+        if GetCache() is not None:
+            GetCache().Close()